@@ -0,0 +1,53 @@
+# Conditional requests on single documents.
+# Items and users carry a revision bumped on every write. The strong ETag of a
+# document is derived from its id and revision only, so it is known before the
+# body is built: If-None-Match answers 304 without serializing anything and
+# If-Match turns a write into a compare-and-set on the revision. ETags are
+# scoped to the request URL, so ?fields= variants need no tag of their own.
+
+from collections.abc import Iterator
+
+from fastapi import HTTPException, Request, Response
+from odmantic import ObjectId
+
+
+def etag(id: ObjectId, revision: int) -> str:
+    return f'"{id}-{revision}"'
+
+
+def _tags(header: str) -> Iterator[str]:
+    for tag in header.split(","):
+        yield tag.strip()
+
+
+def not_modified(request: Request, tag: str) -> Response | None:
+    """
+    A 304 response if the client's If-None-Match already holds ``tag``.
+
+    If-None-Match uses the weak comparison, so ``W/`` prefixes are ignored.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    if any(
+        candidate == "*" or candidate.removeprefix("W/") == tag
+        for candidate in _tags(header)
+    ):
+        return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+
+def check_if_match(request: Request, tag: str) -> bool:
+    """
+    Raise a 412 if the request has an If-Match that ``tag`` does not satisfy.
+
+    Returns whether the request is conditional, in which case the write must
+    also check that the revision did not change in between.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return False
+    # If-Match uses the strong comparison: weak tags never match
+    if not any(candidate in ("*", tag) for candidate in _tags(header)):
+        raise HTTPException(status_code=412, detail="Precondition Failed")
+    return True
@@ -11,10 +11,13 @@ from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from odmantic import AIOEngine, ObjectId
 
+from app import crud
 from app.core import security
+from app.core.cache import auth_user_cache, user_cache
 from app.core.config import settings
-from app.core.db import engine
-from app.models import TokenPayload, User
+from app.core.db import db
+from app.core.revocation import token_versions
+from app.models import AuthUser, TokenPayload, UserProfile
 from datetime import datetime, timezone
 
 # Configure logging
@@ -27,20 +30,16 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 async def get_db() -> AIOEngine:
-    return engine
+    return db.engine
 
 
 EngineDep = Annotated[AIOEngine, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-async def get_current_user(engine: EngineDep, token: TokenDep) -> User:
-    payload = None
+def decode_token(token: str) -> TokenPayload:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
+        return security.decode_access_token(token)
     except (InvalidTokenError, ValidationError) as e:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -58,7 +57,15 @@ async def get_current_user(engine: EngineDep, token: TokenDep) -> User:
             detail="Signature has expired",
         )
 
-    user = await engine.find_one(User, User.id == ObjectId(token_data.sub))
+
+async def load_user(engine: AIOEngine, user_id: ObjectId) -> UserProfile:
+    user = user_cache.get(user_id)
+    if user is None:
+        # Not cached if the user is written while it is read
+        generation = user_cache.generation()
+        user = await crud.get_user_profile(engine, user_id)
+        if user:
+            user_cache.set(user_id, user, generation=generation)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -66,10 +73,58 @@ async def get_current_user(engine: EngineDep, token: TokenDep) -> User:
     return user
 
 
-CurrentUser = Annotated[User, Depends(get_current_user)]
+async def get_current_user(engine: EngineDep, token: TokenDep) -> UserProfile:
+    """
+    The current user's profile, possibly cached. Routes that write the user
+    load the document itself with crud.get_user_by_id.
+    """
+    token_data = decode_token(token)
+    return await load_user(engine, ObjectId(token_data.sub))
+
+
+CurrentUser = Annotated[UserProfile, Depends(get_current_user)]
+
+
+async def get_current_auth_user(engine: EngineDep, token: TokenDep) -> AuthUser:
+    """
+    Authorization data of the current user.
+
+    With AUTH_STATELESS, tokens carrying claims are authorized from the claims
+    and the in-memory token version table, without reading the user document.
+    """
+    token_data = decode_token(token)
+    user_id = ObjectId(token_data.sub)
+    if settings.AUTH_STATELESS and token_data.ver is not None:
+        version = await token_versions.current_version(
+            engine, user_id, token_data.ver
+        )
+        if version is None or version != token_data.ver:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        if not token_data.act:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        return AuthUser(
+            id=user_id, is_active=True, is_superuser=bool(token_data.su)
+        )
+    auth_user = auth_user_cache.get(user_id)
+    if auth_user is None:
+        generation = auth_user_cache.generation()
+        auth_user = await crud.get_auth_user(engine, user_id)
+        if auth_user:
+            auth_user_cache.set(user_id, auth_user, generation=generation)
+    if not auth_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not auth_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return auth_user
+
+
+CurrentAuthUser = Annotated[AuthUser, Depends(get_current_auth_user)]
 
 
-async def get_current_active_superuser(current_user: CurrentUser) -> User:
+async def get_current_active_superuser(current_user: CurrentAuthUser) -> AuthUser:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
@@ -0,0 +1,196 @@
+# Live item events pushed to clients as Server-Sent Events.
+# The change stream reader of each worker (app.core.invalidation) feeds one
+# hub, which fans every item change out to the connections of the item's
+# owner and of superusers. Each connection has a bounded queue coalescing
+# pending changes per item, so a slow client holds at most
+# LIVE_EVENTS_QUEUE_SIZE items; past that its queue is dropped and it is told
+# to resync (reload the list) instead.
+#
+# A connection outlives the request that authorized it: the token is checked
+# again at every heartbeat, and the stream ends once it no longer grants the
+# same access (expired or revoked token, deactivated user, privileges changed).
+#
+# The owner of a deleted item is only known from the change's pre-image, read
+# with LIVE_EVENTS_PRE_IMAGES. Without it deletions reach superusers only, and
+# owners learn of them when they reload the list.
+
+import asyncio
+from collections import OrderedDict, defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from odmantic import ObjectId
+
+from app.api.raw import public_doc
+from app.api.responses import dumps
+from app.core.config import settings
+from app.core.invalidation import ChangeEvent, invalidation_bus
+from app.models import AuthUser
+
+ItemEventType = Literal["created", "updated", "deleted"]
+
+EVENT_TYPES: dict[str, ItemEventType] = {
+    "insert": "created",
+    "update": "updated",
+    "replace": "updated",
+    "delete": "deleted",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ItemEvent:
+    type: ItemEventType
+    id: ObjectId
+    # Current document, None for deletions
+    document: Mapping[str, Any] | None = None
+
+
+class Subscription:
+    def __init__(self, user: AuthUser, maxsize: int) -> None:
+        self.user = user
+        self.maxsize = maxsize
+        self._pending: OrderedDict[ObjectId, ItemEvent] = OrderedDict()
+        self._resync = False
+        self._ready = asyncio.Event()
+
+    def put(self, event: ItemEvent) -> None:
+        previous = self._pending.pop(event.id, None)
+        if previous is not None and previous.type == "created":
+            if event.type == "deleted":
+                # Never delivered, the client does not need to hear of it
+                return
+            event = ItemEvent("created", event.id, event.document)
+        elif previous is None and len(self._pending) >= self.maxsize:
+            self.resync()
+        self._pending[event.id] = event
+        self._ready.set()
+
+    def resync(self) -> None:
+        self._pending.clear()
+        self._resync = True
+        self._ready.set()
+
+    async def get(self) -> tuple[bool, list[ItemEvent]]:
+        """Wait for changes: whether to resync first, then the pending events."""
+        await self._ready.wait()
+        self._ready.clear()
+        resync, self._resync = self._resync, False
+        events = list(self._pending.values())
+        self._pending.clear()
+        return resync, events
+
+
+class ItemEventHub:
+    def __init__(self) -> None:
+        self._owners: defaultdict[ObjectId, set[Subscription]] = defaultdict(set)
+        self._superusers: set[Subscription] = set()
+
+    def __len__(self) -> int:
+        return len(self._superusers) + sum(map(len, self._owners.values()))
+
+    def connect(self, user: AuthUser, maxsize: int) -> Subscription:
+        subscription = Subscription(user, maxsize)
+        if user.is_superuser:
+            self._superusers.add(subscription)
+        else:
+            self._owners[user.id].add(subscription)
+        return subscription
+
+    def disconnect(self, subscription: Subscription) -> None:
+        self._superusers.discard(subscription)
+        owned = self._owners.get(subscription.user.id)
+        if owned is not None:
+            owned.discard(subscription)
+            if not owned:
+                del self._owners[subscription.user.id]
+
+    def _subscriptions(self, owner_id: Any) -> Iterable[Subscription]:
+        yield from self._superusers
+        yield from self._owners.get(owner_id, ())
+
+    def on_change(self, change: ChangeEvent) -> None:
+        event_type = EVENT_TYPES[change.operation]
+        before_owner = change.before.get("owner_id") if change.before else None
+        if event_type == "deleted":
+            # Without pre-images (LIVE_EVENTS_PRE_IMAGES) the owner of a
+            # deleted item is unknown and only superusers hear of it
+            for subscription in self._subscriptions(before_owner):
+                subscription.put(ItemEvent("deleted", change.id))
+            return
+        if change.document is None:
+            # Deleted before the update was looked up, the delete follows
+            return
+        owner_id = change.document.get("owner_id")
+        event = ItemEvent(event_type, change.id, change.document)
+        for subscription in self._subscriptions(owner_id):
+            subscription.put(event)
+        if before_owner is not None and before_owner != owner_id:
+            for subscription in self._owners.get(before_owner, ()):
+                subscription.put(ItemEvent("deleted", change.id))
+
+    def resync_all(self) -> None:
+        for subscription in self._superusers:
+            subscription.resync()
+        for owned in self._owners.values():
+            for subscription in owned:
+                subscription.resync()
+
+
+def _sse(event: str, data: Mapping[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+async def event_stream(
+    hub: ItemEventHub,
+    user: AuthUser,
+    fields: Iterable[str],
+    *,
+    maxsize: int,
+    heartbeat: float,
+    authorized: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+    """
+    SSE messages for the changes a user can see, until the client goes away
+    or ``authorized``, awaited every ``heartbeat`` seconds, returns False.
+    """
+    fields = tuple(fields)
+    loop = asyncio.get_running_loop()
+    # Subscribing once the response is being sent, so that the subscription
+    # is always released by the finally clause
+    subscription = hub.connect(user, maxsize)
+    checked_at = loop.time()
+    try:
+        while True:
+            try:
+                resync, events = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                resync, events = False, None
+            if loop.time() - checked_at >= heartbeat:
+                if not await authorized():
+                    return
+                checked_at = loop.time()
+            if events is None:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            messages = [_sse("resync", {})] if resync else []
+            for event in events:
+                data: dict[str, Any] = {"id": event.id}
+                if event.document is not None:
+                    data["item"] = public_doc(event.document, fields)
+                messages.append(_sse(event.type, data))
+            yield "".join(messages)
+    finally:
+        hub.disconnect(subscription)
+
+
+item_events = ItemEventHub()
+if settings.LIVE_EVENTS_ENABLED:
+    invalidation_bus.subscribe(
+        "item",
+        item_events.on_change,
+        on_reset=item_events.resync_all,
+        documents=True,
+        pre_images=settings.LIVE_EVENTS_PRE_IMAGES,
+    )
@@ -0,0 +1,161 @@
+# Pagination helpers shared by the list endpoints.
+# Pages are ordered by _id and the cursor is the _id of the last document of a
+# page, so the next page is an index range scan instead of a skip.
+
+import asyncio
+import base64
+import binascii
+from dataclasses import dataclass
+from typing import Annotated, Any, Literal
+
+from fastapi import HTTPException, Query
+from odmantic import AIOEngine, Model, ObjectId
+from bson.errors import InvalidId
+
+from app.core.cache import count_cache
+from app.core.config import settings
+
+CountMode = Literal["exact", "none", "estimated", "cached"]
+# Query parameters of the list endpoints. An unbounded or non-positive limit
+# would disable the page size limit in Mongo (limit(0) means no limit)
+PageSkip = Annotated[int, Query(ge=0)]
+PageLimit = Annotated[int, Query(ge=1, le=settings.LIST_MAX_LIMIT)]
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(last_id.binary).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def apply_cursor(query: dict[str, Any], after: str | None) -> dict[str, Any]:
+    """Restrict a list query to the documents that come after the cursor."""
+    if after is None:
+        return query
+    return {**query, "_id": {"$gt": decode_cursor(after)}}
+
+
+def next_cursor(docs: list[Any], limit: int) -> str | None:
+    """
+    Cursor of the page that follows ``docs``, or None if it was the last one.
+
+    ``docs`` must have been fetched with ``limit + 1`` so that a full last page
+    is not mistaken for a page with more results after it; the extra document
+    is removed in place.
+    """
+    if len(docs) <= limit:
+        return None
+    del docs[limit:]
+    last = docs[-1]
+    return encode_cursor(last["_id"] if isinstance(last, dict) else last.id)
+
+
+async def count_documents(
+    engine: AIOEngine, model: type[Model], query: dict[str, Any], mode: CountMode
+) -> tuple[int | None, CountMode]:
+    """
+    Total number of documents matching a list query, computed as ``mode`` asks.
+
+    Returns the count with the mode that was actually used: ``estimated`` falls
+    back to ``exact`` for filtered queries, since the collection metadata only
+    knows the size of the whole collection.
+    """
+    if mode == "none":
+        return None, mode
+    if mode == "estimated":
+        if not query:
+            collection = engine.get_collection(model)
+            return await collection.estimated_document_count(), mode
+        mode = "exact"
+    if mode == "cached":
+        key = (model.__collection__, repr(sorted(query.items())))
+        count = count_cache.get(key)
+        if count is None:
+            count = await engine.count(model, query)
+            count_cache.set(key, count)
+        return count, mode
+    return await engine.count(model, query), mode
+
+
+@dataclass
+class Page:
+    docs: list[dict[str, Any]]
+    count: int | None
+    count_mode: CountMode
+    next_cursor: str | None
+
+
+async def fetch_page(
+    engine: AIOEngine,
+    model: type[Model],
+    query: dict[str, Any],
+    *,
+    skip: int,
+    limit: int,
+    after: str | None,
+    count: CountMode,
+    projection: dict[str, Any] | None = None,
+    strategy: Literal["facet", "gather"] | None = None,
+) -> Page:
+    """
+    Fetch one page of raw documents ordered by _id together with the total.
+
+    With the ``facet`` strategy an exact count and the page come back from a
+    single ``$facet`` aggregation, so one round trip. The query and the sort
+    run before ``$facet``, where they can use the ``_id`` and
+    ``owner_id, _id`` indexes; the sub-pipelines then stream the sorted
+    documents, and the page and the total must fit in one 16MB result
+    document. ``gather`` (page query and count sent concurrently, the default)
+    stays the better choice for large collections. Count modes other than
+    ``exact`` always use ``gather``.
+
+    ``limit`` must be at least 1 (routes take it as a PageLimit): ``$limit``
+    rejects 0 and ``find`` treats it as no limit.
+    """
+    if limit < 1 or skip < 0:
+        raise ValueError(f"Invalid page bounds: skip={skip}, limit={limit}")
+    strategy = strategy or settings.LIST_QUERY_STRATEGY
+    collection = engine.get_collection(model)
+    if strategy == "facet" and count == "exact":
+        page_pipeline: list[dict[str, Any]] = [
+            {"$match": apply_cursor({}, after)},
+            {"$skip": skip},
+            {"$limit": limit + 1},
+        ]
+        if projection:
+            page_pipeline.append({"$project": projection})
+        # Sorted before $facet, where the sort is an index scan: inside a
+        # facet it would be a blocking in-memory sort of every match
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"_id": 1}},
+            {"$facet": {"docs": page_pipeline, "total": [{"$count": "count"}]}},
+        ]
+        (result,) = await collection.aggregate(
+            pipeline, allowDiskUse=True
+        ).to_list(length=1)
+        docs = result["docs"]
+        total: int | None = result["total"][0]["count"] if result["total"] else 0
+        count_mode: CountMode = "exact"
+    else:
+        cursor = (
+            collection.find(apply_cursor(query, after), projection)
+            .sort("_id")
+            .skip(skip)
+            .limit(limit + 1)
+        )
+        docs, (total, count_mode) = await asyncio.gather(
+            cursor.to_list(length=None),
+            count_documents(engine, model, query, count),
+        )
+    return Page(
+        docs=docs,
+        count=total,
+        count_mode=count_mode,
+        next_cursor=next_cursor(docs, limit),
+    )
@@ -0,0 +1,45 @@
+# Fast path for list reads. Mongo only returns the public fields and the
+# BSON-decoded dicts are rendered to JSON as they are (see FastJSONResponse),
+# skipping the ODMantic model, the public model and the response_model
+# validation FastAPI runs on returned objects. Routes keep their
+# response_model for the OpenAPI schema.
+#
+# A `fields` query parameter narrows the projection further (sparse
+# fieldsets), so unrequested fields are neither sent by Mongo nor decoded.
+# Those reads declare the *PublicFields models, whose fields may be missing.
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def select_fields(fields: str | None, allowed: Sequence[str]) -> tuple[str, ...]:
+    """
+    Fields asked for by a comma separated ``fields`` parameter, in ``allowed``
+    order; all of ``allowed`` when the parameter is missing.
+
+    ``id`` is always returned and may be listed; any other field outside the
+    allowlist is rejected.
+    """
+    if fields is None:
+        return tuple(allowed)
+    requested = {field.strip() for field in fields.split(",")} - {"", "id"}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Allowed: id, {', '.join(allowed)}",
+        )
+    return tuple(field for field in allowed if field in requested)
+
+
+def projection(fields: Iterable[str]) -> dict[str, Any]:
+    # An empty projection would return whole documents
+    return dict.fromkeys(fields, 1) or {"_id": 1}
+
+
+def public_doc(doc: dict[str, Any], fields: Iterable[str]) -> dict[str, Any]:
+    """Shape a raw document like the public model: listed fields, then id."""
+    return {**{field: doc.get(field) for field in fields}, "id": doc["_id"]}
@@ -0,0 +1,47 @@
+# JSON responses rendered with orjson, the default response class of the app.
+# orjson handles datetime natively and ObjectId through `_default`, and is
+# several times faster than the json module used by Starlette's JSONResponse.
+#
+# Routes that already build their public model can return `model_response`
+# instead: FastAPI does not validate or re-encode Response objects, so the
+# model is serialized once, by pydantic-core. The route's response_model still
+# documents the schema.
+
+from collections.abc import Mapping
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(
+    model: BaseModel,
+    status_code: int = 200,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """Render a public model without FastAPI's response validation."""
+    return Response(
+        model.model_dump_json(),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
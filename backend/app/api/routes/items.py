@@ -1,72 +1,195 @@
 # This module connects to a MongoDB database using ODMantic.
 # It manages CRUD operations for items ensuring proper user authentication and authorization.
 
-from fastapi import APIRouter, HTTPException, Depends
+from collections.abc import AsyncIterator, Iterable
+from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from bson.errors import InvalidId
 from odmantic import AIOEngine, ObjectId
-from typing import List, Optional
-from app.api.deps import get_current_user, get_db
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Any, List, Optional
+from app.api.conditional import check_if_match, etag, not_modified
+from app.api.deps import TokenDep, get_current_auth_user, get_db
+from app.api.live import event_stream, item_events
+from app.api.pagination import CountMode, PageLimit, PageSkip, fetch_page
+from app.api.raw import projection, public_doc, select_fields
+from app.api.responses import FastJSONResponse, model_response
+from app.api.streaming import ExportFormat, export_response
+from app import import_items as items_import
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.crud import revision_filter
+from app.import_items import READ_CHUNK_BYTES, ImportFormat
 from app.models import (
+    AuthUser,
     Item,
+    ItemBatchResult,
     ItemCreate,
     ItemPublic,
+    ItemPublicFields,
+    ItemsBatchCreate,
+    ItemsBatchDelete,
+    ItemsBatchResults,
+    ItemsBatchUpdate,
+    ItemsImportReport,
     ItemsPublic,
     ItemUpdate,
     Message,
-    User,
 )
 
 router = APIRouter()
 
+ITEM_PUBLIC_FIELDS = ("title", "description", "owner_id")
+
 
 @router.get("/", response_model=ItemsPublic)
 async def read_items(
     engine: AIOEngine = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
-) -> ItemsPublic:
+    current_user: AuthUser = Depends(get_current_auth_user),
+    skip: PageSkip = 0,
+    limit: PageLimit = 100,
+    after: Optional[str] = None,
+    count: CountMode = "exact",
+    fields: Optional[str] = None,
+) -> FastJSONResponse:
     """
     Retrieve items accessible by the current user.
+
+    Pass the `next_cursor` of a page as `after` to get the following page;
+    `skip` still works but gets slower the deeper the page.
+
+    `count` picks how the total is computed: `exact`, `none` (skipped),
+    `estimated` (collection metadata, exact when filtered) or `cached`
+    (exact, reused for a few seconds). The mode used is in `count_mode`.
+
+    `fields` is a comma separated subset of `title`, `description` and
+    `owner_id` to return, next to `id`; all of them by default.
     """
     query = {}
     if not current_user.is_superuser:
         query = {"owner_id": current_user.id}
+    selected = select_fields(fields, ITEM_PUBLIC_FIELDS)
+
+    page = await fetch_page(
+        engine,
+        Item,
+        query,
+        skip=skip,
+        limit=limit,
+        after=after,
+        count=count,
+        projection=projection(selected),
+    )
 
-    items = await engine.find(Item, query, skip=skip, limit=limit)
-    count = await engine.count(Item, query)
+    return FastJSONResponse(
+        {
+            "items": [public_doc(doc, selected) for doc in page.docs],
+            "count": page.count,
+            "count_mode": page.count_mode,
+            "next_cursor": page.next_cursor,
+        }
+    )
 
-    # Convert database items to ItemPublic objects
-    items_public = [ItemPublic(**item.dict()) for item in items]
 
-    return ItemsPublic(items=items_public, count=count)
+@router.get("/export", response_class=StreamingResponse)
+async def export_items(
+    engine: AIOEngine = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_auth_user),
+    format: ExportFormat = "ndjson",
+) -> StreamingResponse:
+    """
+    Stream every item accessible by the current user as NDJSON or CSV.
+    """
+    fields = list(ITEM_PUBLIC_FIELDS)
+    cursor = (
+        engine.get_collection(Item)
+        .find(_owner_filter(current_user), dict.fromkeys(fields, 1))
+        .sort("_id")
+        .batch_size(settings.EXPORT_BATCH_SIZE)
+    )
+    return export_response(cursor, fields, format, filename="items")
 
 
-@router.get("/{item_id}", response_model=ItemPublic)
+@router.get("/events", response_class=StreamingResponse)
+async def item_events_stream(
+    token: TokenDep,
+    engine: AIOEngine = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_auth_user),
+) -> StreamingResponse:
+    """
+    Stream changes to the items accessible by the current user as Server-Sent
+    Events: `created` and `updated` with the item, `deleted` with its id.
+    Owners only get `deleted` when the server reads pre-images
+    (LIVE_EVENTS_PRE_IMAGES), superusers always do.
+
+    A `resync` event means changes were dropped because the client fell
+    behind, or could have been missed; the list must be fetched again. The
+    stream ends when the token stops granting the same access.
+    """
+    if not settings.LIVE_EVENTS_ENABLED or not invalidation_bus.following:
+        raise HTTPException(status_code=503, detail="Live item events are unavailable")
+
+    async def authorized() -> bool:
+        try:
+            auth_user = await get_current_auth_user(engine, token)
+        except HTTPException:
+            return False
+        # The subscription was made for the privileges of the first request
+        return auth_user.is_superuser == current_user.is_superuser
+
+    return StreamingResponse(
+        event_stream(
+            item_events,
+            current_user,
+            ITEM_PUBLIC_FIELDS,
+            maxsize=settings.LIVE_EVENTS_QUEUE_SIZE,
+            heartbeat=settings.LIVE_EVENTS_HEARTBEAT_SECONDS,
+            authorized=authorized,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{item_id}", response_model=ItemPublicFields)
 async def read_item(
+    request: Request,
     item_id: str,
     engine: AIOEngine = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> ItemPublic:
+    current_user: AuthUser = Depends(get_current_auth_user),
+    fields: Optional[str] = None,
+) -> Response:
     """
     Get item by ID.
+
+    `fields` narrows the response like in the item list. Answers 304 when
+    If-None-Match holds the current ETag.
     """
-    item = await engine.find_one(Item, Item.id == ObjectId(item_id))
+    selected = select_fields(fields, ITEM_PUBLIC_FIELDS)
+    # owner_id is always read for the permission check, revision for the ETag
+    item = await engine.get_collection(Item).find_one(
+        {"_id": ObjectId(item_id)}, projection((*selected, "owner_id", "revision"))
+    )
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    if not current_user.is_superuser and item.owner_id != current_user.id:
+    if not current_user.is_superuser and item["owner_id"] != current_user.id:
         raise HTTPException(
             status_code=403, detail="Not enough permissions to access this item"
         )
 
-    return item
+    tag = etag(item["_id"], item.get("revision", 0))
+    if response := not_modified(request, tag):
+        return response
+    return FastJSONResponse(public_doc(item, selected), headers={"ETag": tag})
 
 
 @router.post("/", response_model=ItemPublic)
 async def create_item(
     item_in: ItemCreate,
     engine: AIOEngine = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthUser = Depends(get_current_auth_user),
 ) -> ItemPublic:
     """
     Create a new item.
@@ -76,15 +199,242 @@ async def create_item(
     return item
 
 
+def _owner_filter(current_user: AuthUser) -> dict[str, Any]:
+    return {} if current_user.is_superuser else {"owner_id": current_user.id}
+
+
+def _check_batch_size(size: int) -> None:
+    if size > settings.ITEMS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batches are limited to {settings.ITEMS_BATCH_MAX_SIZE} items",
+        )
+
+
+def _parse_ids(
+    raw_ids: list[str], results: list[ItemBatchResult]
+) -> dict[int, ObjectId]:
+    """Map request positions to ObjectIds, recording a failure for invalid ones."""
+    ids = {}
+    for index, raw_id in enumerate(raw_ids):
+        try:
+            ids[index] = ObjectId(raw_id)
+        except InvalidId:
+            results.append(
+                ItemBatchResult(index=index, id=raw_id, ok=False, error="Invalid id")
+            )
+    return ids
+
+
+async def _accessible_ids(
+    engine: AIOEngine, ids: Iterable[ObjectId], current_user: AuthUser
+) -> set[ObjectId]:
+    cursor = engine.get_collection(Item).find(
+        {"_id": {"$in": list(ids)}, **_owner_filter(current_user)}, {"_id": 1}
+    )
+    return {doc["_id"] async for doc in cursor}
+
+
+def _batch_results(results: list[ItemBatchResult]) -> Response:
+    results.sort(key=lambda result: result.index)
+    succeeded = sum(result.ok for result in results)
+    return model_response(
+        ItemsBatchResults(
+            results=results, succeeded=succeeded, failed=len(results) - succeeded
+        )
+    )
+
+
+async def _bulk_update(
+    engine: AIOEngine,
+    operations: list[UpdateOne],
+    updated: list[tuple[int, ObjectId]],
+    current_user: AuthUser,
+) -> list[ItemBatchResult]:
+    errors: dict[int, str] = {}
+    try:
+        result = await engine.get_collection(Item).bulk_write(
+            operations, ordered=False
+        )
+        matched = result.matched_count
+    except BulkWriteError as e:
+        errors = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        matched = e.details["nMatched"]
+    # The bulk result only counts matches: if some items were deleted since
+    # the access check, find out which
+    missing: set[ObjectId] = set()
+    if matched < len(operations) - len(errors):
+        written = [
+            item_id
+            for position, (_, item_id) in enumerate(updated)
+            if position not in errors
+        ]
+        missing = set(written) - await _accessible_ids(engine, written, current_user)
+    results = []
+    for position, (index, item_id) in enumerate(updated):
+        error = errors.get(position)
+        if error is None and item_id in missing:
+            error = "Item not found"
+        results.append(
+            ItemBatchResult(index=index, id=str(item_id), ok=error is None, error=error)
+        )
+    return results
+
+
+@router.post("/batch", response_model=ItemsBatchResults)
+async def create_items_batch(
+    batch: ItemsBatchCreate,
+    engine: AIOEngine = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_auth_user),
+) -> Response:
+    """
+    Create several items with a single insert.
+    """
+    _check_batch_size(len(batch.items))
+    docs = [
+        Item(**item_in.dict(), owner_id=current_user.id).model_dump_doc()
+        for item_in in batch.items
+    ]
+    errors: dict[int, str] = {}
+    if docs:
+        try:
+            await engine.get_collection(Item).insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = {
+                error["index"]: error["errmsg"] for error in e.details["writeErrors"]
+            }
+    return _batch_results(
+        [
+            ItemBatchResult(
+                index=index,
+                id=str(doc["_id"]),
+                ok=index not in errors,
+                error=errors.get(index),
+            )
+            for index, doc in enumerate(docs)
+        ]
+    )
+
+
+@router.post("/import", response_model=ItemsImportReport)
+async def import_items(
+    file: UploadFile,
+    engine: AIOEngine = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_auth_user),
+    format: ImportFormat = "ndjson",
+    ordered: bool = False,
+) -> Response:
+    """
+    Import items owned by the current user from an NDJSON or CSV upload.
+
+    Every row is validated like an item creation. Unordered imports skip the
+    failing rows, ordered ones stop at the first one.
+
+    The whole upload is received and spooled (in memory up to 1 MB, then in a
+    temporary file) before this runs; only the parsing of the spooled file and
+    the inserts are incremental.
+    """
+
+    async def chunks() -> AsyncIterator[bytes]:
+        while chunk := await file.read(READ_CHUNK_BYTES):
+            yield chunk
+
+    report = await items_import.import_items(
+        engine,
+        items_import.parse_rows(chunks(), format),
+        owner_id=current_user.id,
+        ordered=ordered,
+    )
+    return model_response(report)
+
+
+@router.patch("/batch", response_model=ItemsBatchResults)
+async def update_items_batch(
+    batch: ItemsBatchUpdate,
+    engine: AIOEngine = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_auth_user),
+) -> Response:
+    """
+    Partially update several items with a single bulk write.
+
+    Items that do not exist or belong to someone else are reported as not found.
+    """
+    _check_batch_size(len(batch.items))
+    results: list[ItemBatchResult] = []
+    ids = _parse_ids([item.id for item in batch.items], results)
+    accessible = await _accessible_ids(engine, ids.values(), current_user)
+    operations = []
+    # Request position and item id of each operation
+    updated: list[tuple[int, ObjectId]] = []
+    for index, item_id in ids.items():
+        if item_id not in accessible:
+            results.append(
+                ItemBatchResult(
+                    index=index, id=str(item_id), ok=False, error="Item not found"
+                )
+            )
+            continue
+        update = batch.items[index].model_dump(exclude_unset=True, exclude={"id"})
+        if not update:
+            results.append(ItemBatchResult(index=index, id=str(item_id), ok=True))
+            continue
+        # The owner filter keeps the write safe even if ownership changed
+        operations.append(
+            UpdateOne(
+                {"_id": item_id, **_owner_filter(current_user)},
+                {"$set": update, "$inc": {"revision": 1}},
+            )
+        )
+        updated.append((index, item_id))
+    if operations:
+        results += await _bulk_update(engine, operations, updated, current_user)
+    return _batch_results(results)
+
+
+@router.post("/batch/delete", response_model=ItemsBatchResults)
+async def delete_items_batch(
+    batch: ItemsBatchDelete,
+    engine: AIOEngine = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_auth_user),
+) -> Response:
+    """
+    Delete several items by id.
+
+    Items that do not exist or belong to someone else are reported as not found.
+    """
+    _check_batch_size(len(batch.ids))
+    results: list[ItemBatchResult] = []
+    ids = _parse_ids(batch.ids, results)
+    accessible = await _accessible_ids(engine, ids.values(), current_user)
+    if accessible:
+        await engine.get_collection(Item).delete_many(
+            {"_id": {"$in": list(accessible)}, **_owner_filter(current_user)}
+        )
+    for index, item_id in ids.items():
+        found = item_id in accessible
+        results.append(
+            ItemBatchResult(
+                index=index,
+                id=str(item_id),
+                ok=found,
+                error=None if found else "Item not found",
+            )
+        )
+    return _batch_results(results)
+
+
 @router.put("/{item_id}", response_model=ItemPublic)
 async def update_item(
+    request: Request,
     item_id: str,
     item_update: ItemUpdate,
     engine: AIOEngine = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> ItemPublic:
+    current_user: AuthUser = Depends(get_current_auth_user),
+) -> FastJSONResponse:
     """
     Update an item.
+
+    With an If-Match header the update only happens if the item is unchanged.
     """
     item = await engine.find_one(Item, Item.id == ObjectId(item_id))
     if not item:
@@ -93,23 +443,36 @@ async def update_item(
         raise HTTPException(
             status_code=403, detail="Not enough permissions to modify this item"
         )
+    conditional = check_if_match(request, etag(item.id, item.revision))
 
     item_update_data = item_update.dict(exclude_unset=True)
     item_update_data.pop("_id", None)
     item_update_data.pop("id", None)
 
-    for key, value in item_update_data.items():
-        setattr(item, key, value)
-
-    await engine.save(item)
-    return item
+    query: dict[str, Any] = {"_id": item.id}
+    if conditional:
+        query["revision"] = revision_filter(item.revision)
+    update: dict[str, Any] = {"$inc": {"revision": 1}}
+    if item_update_data:
+        update["$set"] = item_update_data
+    doc = await engine.get_collection(Item).find_one_and_update(
+        query, update, return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        if conditional:
+            raise HTTPException(status_code=412, detail="Precondition Failed")
+        raise HTTPException(status_code=404, detail="Item not found")
+    return FastJSONResponse(
+        public_doc(doc, ITEM_PUBLIC_FIELDS),
+        headers={"ETag": etag(doc["_id"], doc["revision"])},
+    )
 
 
 @router.delete("/{item_id}")
 async def delete_item(
     item_id: str,
     engine: AIOEngine = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthUser = Depends(get_current_auth_user),
 ) -> Message:
     """
     Delete an item.
@@ -1,9 +1,12 @@
 # This module connects to a MongoDB database using ODMantic.
 # handles user authentication and password management
 
+from contextlib import suppress
 from datetime import timedelta
+from functools import lru_cache
+from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
 from typing import Annotated, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
@@ -11,7 +14,9 @@ from app import crud
 from app.api.deps import CurrentUser, EngineDep, get_current_active_superuser
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.ratelimit import RateLimited, rate_limiter
+from app.core.revocation import token_versions
+from app.core.security import get_password_hash_async
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
@@ -22,24 +27,81 @@ from app.utils import (
 
 router = APIRouter()
 
+IPNetwork = IPv4Network | IPv6Network
+
+
+@lru_cache(maxsize=4)
+def _trusted_networks(proxies: tuple[str, ...]) -> tuple[IPNetwork, ...]:
+    return tuple(ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ip_address(address)
+    except ValueError:
+        return False
+    networks = _trusted_networks(tuple(settings.TRUSTED_PROXIES))
+    return any(ip in network for network in networks)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The client's address for the per-IP rate limits.
+
+    Requests coming from TRUSTED_PROXIES are attributed to the last address of
+    X-Forwarded-For that is not a trusted proxy itself; earlier entries are
+    set by the client and could be forged.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted(peer):
+        return peer
+    forwarded = [
+        address.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded):
+        if not _is_trusted(address):
+            return address
+    return forwarded[0] if forwarded else peer
+
+
 @router.post("/login/access-token")
 async def login_access_token(
-    engine: EngineDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+    request: Request,
+    engine: EngineDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
+    await rate_limiter.check(
+        engine, {f"login:ip:{client_ip(request)}": settings.RATE_LIMIT_LOGIN_PER_IP}
+    )
+    # Only failed attempts count against the account, so that others cannot
+    # lock it out while its owner keeps logging in
+    account_limit = {
+        f"login:account:{form_data.username.lower()}": (
+            settings.RATE_LIMIT_LOGIN_PER_ACCOUNT
+        )
+    }
+    await rate_limiter.check(engine, account_limit, increment=False)
     user = await crud.authenticate(
         engine=engine, email=form_data.username, password=form_data.password
     )
     if not user:
+        with suppress(RateLimited):
+            # The limit applies from the next attempt
+            await rate_limiter.check(engine, account_limit)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = security.authorization_claims(user) if settings.AUTH_STATELESS else None
     return Token(
         access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id, expires_delta=access_token_expires, claims=claims
         )
     )
 
@@ -49,14 +111,31 @@ async def test_token(current_user: CurrentUser) -> Any:
     """
     Test access token
     """
-    return current_user
+    return UserPublic(
+        email=current_user.email,
+        is_active=current_user.is_active,
+        is_superuser=current_user.is_superuser,
+        full_name=current_user.full_name,
+        public_id=current_user.id,
+    )
 
 
 @router.post("/password-recovery/{email}")
-async def recover_password(email: str, engine: EngineDep) -> Message:
+async def recover_password(
+    request: Request, email: str, engine: EngineDep
+) -> Message:
     """
     Password Recovery
     """
+    await rate_limiter.check(
+        engine,
+        {
+            f"recovery:ip:{client_ip(request)}": settings.RATE_LIMIT_RECOVERY_PER_IP,
+            f"recovery:account:{email.lower()}": (
+                settings.RATE_LIMIT_RECOVERY_PER_ACCOUNT
+            ),
+        },
+    )
     user = await crud.get_user_by_email(engine=engine, email=email)
 
     if not user:
@@ -68,7 +147,8 @@ async def recover_password(email: str, engine: EngineDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    await send_email(
+        engine,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -92,9 +172,13 @@ async def reset_password(engine: EngineDep, body: NewPassword) -> Message:
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
+    hashed_password = await get_password_hash_async(password=body.new_password)
     user.hashed_password = hashed_password
-    await engine.save(user)
+    user.token_version += 1
+    await crud.save_user_fields(
+        engine=engine, db_user=user, fields={"hashed_password", "token_version"}
+    )
+    token_versions.update(user)
     return Message(message="Password updated successfully")
 
 
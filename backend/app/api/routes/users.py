@@ -4,24 +4,33 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
 
 from odmantic import AIOEngine, ObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
 
 
 from app import crud
+from app.api.conditional import check_if_match, etag, not_modified
 from app.api.deps import (
+    CurrentAuthUser,
     CurrentUser,
     EngineDep,
     get_current_active_superuser,
 )
+from app.api.pagination import CountMode, PageLimit, PageSkip, fetch_page
+from app.api.raw import projection, public_doc, select_fields
+from app.api.responses import FastJSONResponse, model_response
+from app.api.streaming import ExportFormat, export_response
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.revocation import token_versions
+from app.core.security import get_password_hash_async, verify_password_async
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
     UserCreate,
+    UserProfile,
     UserPublic,
+    UserPublicFields,
     UserRegister,
     UsersPublic,
     UserUpdate,
@@ -33,20 +42,83 @@ import logging
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+USER_PUBLIC_FIELDS = ("email", "is_active", "is_superuser", "full_name")
+
+
+async def _load_user_for_write(engine: AIOEngine, current_user: UserProfile) -> User:
+    # The cached profile lacks the password hash, and may be behind the database
+    db_user = await crud.get_user_by_id(engine, current_user.id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
+
+def _user_public_doc(doc: dict[str, Any], fields: tuple[str, ...]) -> dict[str, Any]:
+    return {**public_doc(doc, fields), "public_id": doc["_id"]}
+
 
 @router.get(
     "/",
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-async def read_users(engine: EngineDep, skip: int = 0, limit: int = 100) -> Any:
+async def read_users(
+    engine: EngineDep,
+    skip: PageSkip = 0,
+    limit: PageLimit = 100,
+    after: str | None = None,
+    count: CountMode = "exact",
+    fields: str | None = None,
+) -> FastJSONResponse:
     """
     Retrieve users.
+
+    Pass the `next_cursor` of a page as `after` to get the following page.
+    `count` picks how the total is computed, see `count_mode` in the response.
+    `fields` is a comma separated subset of `email`, `is_active`,
+    `is_superuser` and `full_name` to return next to the ids.
     """
+    selected = select_fields(fields, USER_PUBLIC_FIELDS)
+
+    page = await fetch_page(
+        engine,
+        User,
+        {},
+        skip=skip,
+        limit=limit,
+        after=after,
+        count=count,
+        projection=projection(selected),
+    )
+    return FastJSONResponse(
+        {
+            "data": [_user_public_doc(doc, selected) for doc in page.docs],
+            "count": page.count,
+            "count_mode": page.count_mode,
+            "next_cursor": page.next_cursor,
+        }
+    )
 
-    count = await engine.count(User)
-    users = await engine.find(User, skip=skip, limit=limit)
-    return UsersPublic(data=users, count=count)
+
+@router.get(
+    "/export",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+)
+async def export_users(
+    engine: EngineDep, format: ExportFormat = "ndjson"
+) -> StreamingResponse:
+    """
+    Stream every user as NDJSON or CSV.
+    """
+    fields = ["email", "full_name", "is_active", "is_superuser"]
+    cursor = (
+        engine.get_collection(User)
+        .find({}, dict.fromkeys(fields, 1))
+        .sort("_id")
+        .batch_size(settings.EXPORT_BATCH_SIZE)
+    )
+    return export_response(cursor, fields, format, filename="users")
 
 
 @router.post(
@@ -69,7 +141,8 @@ async def create_user(*, engine: EngineDep, user_in: UserCreate) -> Any:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        await send_email(
+            engine,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -79,53 +152,102 @@ async def create_user(*, engine: EngineDep, user_in: UserCreate) -> Any:
 
 @router.patch("/me", response_model=UserPublic)
 async def update_user_me(
-    *, engine: EngineDep, user_in: UserUpdateMe, current_user: CurrentUser
+    *,
+    request: Request,
+    engine: EngineDep,
+    user_in: UserUpdateMe,
+    current_user: CurrentUser,
 ) -> Any:
     """
     Update own user.
+
+    With an If-Match header the update only happens if the user is unchanged.
     """
+    db_user = await _load_user_for_write(engine, current_user)
+    conditional = check_if_match(request, etag(db_user.id, db_user.revision))
 
     if user_in.email:
         existing_user = await crud.get_user_by_email(engine=engine, email=user_in.email)
-        if existing_user and existing_user.id != current_user.id:
+        if existing_user and existing_user.id != db_user.id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
     user_data = user_in.dict(exclude_unset=True)
 
+    expected_revision = db_user.revision if conditional else None
     for key, value in user_data.items():
-        setattr(current_user, key, value)
-    await engine.save(current_user)
-    current_user = await engine.find_one(User, User.id == current_user.id)
-    return UserPublic(**current_user.dict(), public_id=current_user.id)
+        setattr(db_user, key, value)
+    if not await crud.save_user_fields(
+        engine=engine,
+        db_user=db_user,
+        fields=user_data,
+        expected_revision=expected_revision,
+    ):
+        raise HTTPException(status_code=412, detail="Precondition Failed")
+    return model_response(
+        UserPublic(**db_user.dict(), public_id=db_user.id),
+        headers={"ETag": etag(db_user.id, db_user.revision)},
+    )
 
 
 @router.patch("/me/password", response_model=Message)
 async def update_password_me(
-    *, engine: EngineDep, body: UpdatePassword, current_user: CurrentUser
+    *,
+    request: Request,
+    engine: EngineDep,
+    body: UpdatePassword,
+    current_user: CurrentUser,
 ) -> Any:
     """
     Update own password.
+
+    With an If-Match header the update only happens if the user is unchanged.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    db_user = await _load_user_for_write(engine, current_user)
+    conditional = check_if_match(request, etag(db_user.id, db_user.revision))
+    if not await verify_password_async(body.current_password, db_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
-    current_user.hashed_password = hashed_password
-    await engine.save(current_user)
-    return Message(message="Password updated successfully")
+    hashed_password = await get_password_hash_async(body.new_password)
+    expected_revision = db_user.revision if conditional else None
+    db_user.hashed_password = hashed_password
+    db_user.token_version += 1
+    if not await crud.save_user_fields(
+        engine=engine,
+        db_user=db_user,
+        fields={"hashed_password", "token_version"},
+        expected_revision=expected_revision,
+    ):
+        raise HTTPException(status_code=412, detail="Precondition Failed")
+    token_versions.update(db_user)
+    return model_response(
+        Message(message="Password updated successfully"),
+        headers={"ETag": etag(db_user.id, db_user.revision)},
+    )
 
 
 @router.get("/me", response_model=UserPublic)
-async def read_users_me(current_user: CurrentUser) -> UserPublic:
+async def read_users_me(
+    request: Request, engine: EngineDep, current_auth_user: CurrentAuthUser
+) -> Response:
     """
     Get current user.
+
+    Answers 304 when If-None-Match holds the current ETag.
     """
+    # Read from the database: the cached profile can be behind another
+    # worker's write, and a stale ETag would answer 304 with outdated data
+    current_user = await crud.get_user_profile(engine, current_auth_user.id)
+    if not current_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    tag = etag(current_user.id, current_user.revision)
+    if response := not_modified(request, tag):
+        return response
     try:
-        return UserPublic(
+        user_public = UserPublic(
             email=current_user.email,
             is_active=current_user.is_active,
             is_superuser=current_user.is_superuser,
@@ -138,6 +260,7 @@ async def read_users_me(current_user: CurrentUser) -> UserPublic:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not fetch current user",
         )
+    return model_response(user_public, headers={"ETag": tag})
 
 
 @router.delete("/me", response_model=Message)
@@ -150,8 +273,7 @@ async def delete_user_me(engine: EngineDep, current_user: CurrentUser) -> Any:
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
 
-    await engine.remove(Item, Item.owner_id == current_user.id)
-    await engine.delete(current_user)
+    await crud.delete_user(engine=engine, user_id=current_user.id)
     return Message(message="User deleted successfully")
 
 
@@ -173,27 +295,40 @@ async def register_user(engine: EngineDep, user_in: UserRegister) -> Any:
         )
 
     user_create = UserCreate(**user_in.dict())
-    user = User(**user_create.dict())
-    await engine.save(user)
+    user = await crud.create_user(engine=engine, user_create=user_create)
     return user
 
 
-@router.get("/{user_id}", response_model=UserPublic)
+@router.get("/{user_id}", response_model=UserPublicFields)
 async def read_user_by_id(
-    user_id: int, engine: EngineDep, current_user: CurrentUser
-) -> Any:
+    request: Request,
+    user_id: str,
+    engine: EngineDep,
+    current_user: CurrentAuthUser,
+    fields: str | None = None,
+) -> Response:
     """
     Get a specific user by id.
+
+    `fields` narrows the response like in the user list. Answers 304 when
+    If-None-Match holds the current ETag.
     """
-    user = await engine.find_one(User, User.id == ObjectId(user_id))
-    if user == current_user:
-        return user
-    if not current_user.is_superuser:
+    selected = select_fields(fields, USER_PUBLIC_FIELDS)
+    user_object_id = ObjectId(user_id)
+    if user_object_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
-    return user
+    user = await engine.get_collection(User).find_one(
+        {"_id": user_object_id}, projection((*selected, "revision"))
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    tag = etag(user["_id"], user.get("revision", 0))
+    if response := not_modified(request, tag):
+        return response
+    return FastJSONResponse(_user_public_doc(user, selected), headers={"ETag": tag})
 
 
 @router.patch(
@@ -203,44 +338,57 @@ async def read_user_by_id(
 )
 async def update_user(
     *,
+    request: Request,
     engine: EngineDep,
-    user_id: int,
+    user_id: str,
     user_in: UserUpdate,
 ) -> Any:
     """
     Update a user.
+
+    With an If-Match header the update only happens if the user is unchanged.
     """
-    db_user = await engine.find_one(User, User.id == ObjectId(user_id))
+    db_user = await crud.get_user_by_id(engine, ObjectId(user_id))
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
+    conditional = check_if_match(request, etag(db_user.id, db_user.revision))
     if user_in.email:
         existing_user = await crud.get_user_by_email(engine=engine, email=user_in.email)
-        if existing_user and existing_user.id != user_id:
+        if existing_user and existing_user.id != db_user.id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = await crud.update_user(engine=engine, db_user=db_user, user_in=user_in)
-    return db_user
+    updated_user = await crud.update_user(
+        engine=engine,
+        db_user=db_user,
+        user_in=user_in,
+        expected_revision=db_user.revision if conditional else None,
+    )
+    if not updated_user:
+        raise HTTPException(status_code=412, detail="Precondition Failed")
+    return model_response(
+        UserPublic(**updated_user.dict(), public_id=updated_user.id),
+        headers={"ETag": etag(updated_user.id, updated_user.revision)},
+    )
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
 async def delete_user(
-    engine: EngineDep, current_user: CurrentUser, user_id: int
+    engine: EngineDep, current_user: CurrentAuthUser, user_id: str
 ) -> Message:
     """
     Delete a user.
     """
-    user = await engine.find_one(User, User.id == ObjectId(user_id))
+    user = await crud.get_user_by_id(engine, ObjectId(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if user == current_user:
+    if user.id == current_user.id:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    await engine.remove(Item, Item.owner_id == ObjectId(user_id))
-    await engine.delete(user)
+    await crud.delete_user(engine=engine, user_id=user.id)
     return Message(message="User deleted successfully")
@@ -1,8 +1,14 @@
 # This module connects to a MongoDB database using ODMantic.
 
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
-from app.api.deps import get_current_active_superuser
+from app.api.deps import EngineDep, get_current_active_superuser
+from app.core.cache import caches
+from app.core.jobs import job_queue
+from app.core.mail import email_dispatcher
+from app.core.pool import pool_stats
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -13,14 +19,63 @@ router = APIRouter()
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+async def test_email(engine: EngineDep, email_to: EmailStr) -> Message:
     """
     Test emails.
+
+    The email is queued, this does not wait for it to be sent.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    await send_email(
+        engine,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
     return Message(message="Test email sent")
+
+
+@router.get(
+    "/cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def cache_stats() -> dict[str, dict[str, Any]]:
+    """
+    Hit/miss counters of the in-process caches of the worker serving the request.
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@router.get(
+    "/email-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def email_stats() -> dict[str, Any]:
+    """
+    Queue length and sent/failed counters of the email dispatcher of the worker
+    serving the request.
+    """
+    return email_dispatcher.stats()
+
+
+@router.get(
+    "/job-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def job_stats(engine: EngineDep) -> dict[str, dict[str, int]]:
+    """
+    Number of background jobs by kind and status.
+    """
+    return await job_queue.stats(engine)
+
+
+@router.get(
+    "/db-pool-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def db_pool_stats() -> dict[str, dict[str, Any]]:
+    """
+    Connection pool counters of the Mongo client of the worker serving the
+    request, by server.
+    """
+    return pool_stats.stats()
@@ -0,0 +1,163 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Generic, TypeVar
+
+from odmantic import ObjectId
+
+from app.core.config import settings
+from app.models import AuthUser, UserProfile
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Per-worker cache bounded both in size (least recently used entries are
+    dropped first) and in age (entries expire ``ttl`` seconds after being set).
+
+    It is only meant to be used from the event loop thread, so there is no
+    locking. A ``ttl`` of 0 disables the cache.
+
+    Every invalidation is numbered by a generation counter. A value read from
+    the database while the key was invalidated (a write happened in between)
+    is stale, so a caller passes the ``generation()`` taken before the read to
+    ``set``, which then refuses to cache it.
+    """
+
+    def __init__(self, *, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._generation = 0
+        # key -> generation of its last invalidation, for the latest maxsize
+        # keys; older invalidations all count as _invalidated_before
+        self._invalidations: OrderedDict[K, int] = OrderedDict()
+        self._invalidated_before = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(
+        self,
+        key: K,
+        value: V,
+        ttl: float | None = None,
+        *,
+        generation: int | None = None,
+    ) -> None:
+        """
+        Cache ``value``, unless ``key`` was invalidated after ``generation``.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        if generation is not None and generation < self._invalidations.get(
+            key, self._invalidated_before
+        ):
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        self._data.pop(key, None)
+        self._generation += 1
+        self._invalidations[key] = self._generation
+        self._invalidations.move_to_end(key)
+        while len(self._invalidations) > max(self.maxsize, 1):
+            _, generation = self._invalidations.popitem(last=False)
+            self._invalidated_before = generation
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._generation += 1
+        self._invalidations.clear()
+        self._invalidated_before = self._generation
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+caches: dict[str, TTLCache[Any, Any]] = {}
+
+
+def register_cache(cache: TTLCache[K, V]) -> TTLCache[K, V]:
+    caches[cache.name] = cache
+    return cache
+
+
+# Profiles (no password hash nor items) loaded by get_current_user
+user_cache: TTLCache[ObjectId, UserProfile] = register_cache(
+    TTLCache(
+        name="user",
+        maxsize=settings.USER_CACHE_MAX_SIZE,
+        ttl=settings.USER_CACHE_TTL_SECONDS,
+    )
+)
+# Authorization flags loaded by get_current_auth_user
+auth_user_cache: TTLCache[ObjectId, AuthUser] = register_cache(
+    TTLCache(
+        name="auth_user",
+        maxsize=settings.USER_CACHE_MAX_SIZE,
+        ttl=settings.USER_CACHE_TTL_SECONDS,
+    )
+)
+
+
+def invalidate_user(user_id: ObjectId) -> None:
+    user_cache.invalidate(user_id)
+    auth_user_cache.invalidate(user_id)
+
+
+# Validated access token payloads keyed by the SHA-256 digest of the token
+token_cache: TTLCache[bytes, Any] = register_cache(
+    TTLCache(
+        name="token",
+        maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+        ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+    )
+)
+
+
+# Totals of list queries for the "cached" count mode, keyed by query shape
+count_cache: TTLCache[tuple[str, str], int] = register_cache(
+    TTLCache(
+        name="count",
+        maxsize=settings.LIST_COUNT_CACHE_MAX_SIZE,
+        ttl=settings.LIST_COUNT_CACHE_TTL_SECONDS,
+    )
+)
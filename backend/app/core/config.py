@@ -16,7 +16,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing_extensions import Self
 
 
-# Helper function to parse CORS settings
+# Helper function to parse comma separated list settings (CORS, compressors,
+# proxies)
 def parse_cors(v: Any) -> list[str] | str:
     if isinstance(v, str) and not v.startswith("["):
         return [i.strip() for i in v.split(",")]
@@ -49,6 +50,43 @@ class Settings(BaseSettings):
     SENTRY_DSN: HttpUrl | None = None
     MONGODB_URI: str
     MONGODB_DB: str
+    # Create missing indexes in the background when a worker starts
+    MONGODB_SYNC_INDEXES_ON_STARTUP: bool = True
+    # Client options; None keeps the value of MONGODB_URI or the driver default.
+    # Every worker process has its own pools, GET /utils/db-pool-stats/ shows
+    # how busy they are
+    MONGODB_MAX_POOL_SIZE: int | None = None
+    MONGODB_MIN_POOL_SIZE: int | None = None
+    MONGODB_MAX_IDLE_TIME_MS: int | None = None
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int | None = None
+    # In order of preference; zstd and snappy need the zstandard and
+    # python-snappy packages
+    MONGODB_COMPRESSORS: Annotated[
+        list[Literal["zstd", "snappy", "zlib"]] | str, BeforeValidator(parse_cors)
+    ] = []
+    MONGODB_READ_PREFERENCE: (
+        Literal[
+            "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+        ]
+        | None
+    ) = None
+    MONGODB_RETRY_READS: bool | None = None
+    MONGODB_RETRY_WRITES: bool | None = None
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def mongodb_client_options(self) -> dict[str, Any]:
+        options = {
+            "maxPoolSize": self.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": self.MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": self.MONGODB_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": self.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "compressors": self.MONGODB_COMPRESSORS or None,
+            "readPreference": self.MONGODB_READ_PREFERENCE,
+            "retryReads": self.MONGODB_RETRY_READS,
+            "retryWrites": self.MONGODB_RETRY_WRITES,
+        }
+        return {name: value for name, value in options.items() if value is not None}
 
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
@@ -66,6 +104,25 @@ class Settings(BaseSettings):
         return self
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # Emails are queued and sent by background tasks, each holding a persistent
+    # SMTP connection; email jobs that find the queue full are retried later
+    EMAIL_SMTP_CONNECTIONS: int = 2
+    EMAIL_SMTP_TIMEOUT_SECONDS: int = 10
+    # Connections unused for longer are reopened before the next send
+    EMAIL_SMTP_IDLE_SECONDS: int = 30
+    EMAIL_BATCH_SIZE: int = 20
+    EMAIL_QUEUE_MAX_SIZE: int = 1000
+    # Retries of emails submitted without a job; email jobs are retried by the
+    # job queue (JOBS_MAX_ATTEMPTS) instead
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 2
+    # How long shutdown waits for queued emails to be sent
+    EMAIL_SHUTDOWN_TIMEOUT_SECONDS: int = 10
+    # Email templates are compiled once at startup; compiled bytecode is kept in
+    # this directory (the system temp directory if unset) for later starts.
+    # Auto reload recompiles a template when its file changes (local development)
+    EMAIL_TEMPLATES_BYTECODE_CACHE_DIR: str | None = None
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = False
 
     @computed_field  # type: ignore[misc]
     @property
@@ -77,6 +134,99 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER_PASSWORD: str
     USERS_OPEN_REGISTRATION: bool = False
 
+    # bcrypt runs in this pool instead of on the event loop
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    # Hash/verify calls allowed to wait or run at once before rejecting with 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Per-worker cache of authenticated users, 0 disables it
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10_000
+    # Decoded access tokens, entries never outlive the token's own exp
+    TOKEN_CACHE_TTL_SECONDS: int = 60 * 60
+    TOKEN_CACHE_MAX_SIZE: int = 50_000
+
+    # How list endpoints get a page and its exact total in one go: a single
+    # $facet aggregation, or the page query and the count sent concurrently.
+    # facet saves a round trip but its result (page and total) is limited to
+    # 16MB; gather is the safer default for large pages and collections
+    LIST_QUERY_STRATEGY: Literal["facet", "gather"] = "gather"
+    # Largest page size accepted by the list endpoints' limit parameter
+    LIST_MAX_LIMIT: int = 1000
+    # Totals reused by list endpoints called with count=cached
+    LIST_COUNT_CACHE_TTL_SECONDS: int = 30
+    LIST_COUNT_CACHE_MAX_SIZE: int = 10_000
+
+    # Largest number of elements accepted by the batch item endpoints
+    ITEMS_BATCH_MAX_SIZE: int = 1000
+    # Documents fetched per round trip by the export endpoints
+    EXPORT_BATCH_SIZE: int = 1000
+    # Rows written per insert_many by item imports
+    IMPORT_BATCH_SIZE: int = 1000
+    # Items removed per delete_many when a user is deleted, and the pause
+    # between two of them to leave write capacity to the API
+    USER_ITEMS_DELETE_BATCH_SIZE: int = 1000
+    USER_ITEMS_DELETE_PAUSE_SECONDS: float = 0.1
+
+    # Login and password recovery attempts allowed per client IP and per
+    # account in a sliding window, checked before any password hashing. The
+    # memory backend counts per worker; the mongo one shares the counts between
+    # workers, with over-limit keys still rejected from memory
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "mongo"] = "memory"
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_LOGIN_PER_IP: int = 30
+    # Failed logins per account (successful ones are not counted); past it
+    # the account cannot log in from anywhere until the window ends
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: int = 10
+    RATE_LIMIT_RECOVERY_PER_IP: int = 10
+    # Recovery emails per account, also counted for unknown addresses
+    RATE_LIMIT_RECOVERY_PER_ACCOUNT: int = 3
+    # Addresses or networks of the reverse proxies (Traefik) whose
+    # X-Forwarded-For is trusted for the client IP, comma separated, e.g.
+    # "172.16.0.0/12". Empty: the peer address is the client IP, so behind a
+    # proxy every client shares the proxy's per-IP limit
+    TRUSTED_PROXIES: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    # Keys counted by the memory backend, the least recently used go first
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Carry is_active/is_superuser and the user's token version in access tokens
+    # so that most requests are authorized without reading the user from Mongo
+    AUTH_STATELESS: bool = False
+    AUTH_TOKEN_VERSION_REFRESH_SECONDS: int = 30
+
+    # Follow the user change stream to drop cached users written by other
+    # workers (needs a replica set, caches only expire by TTL without one)
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_INVALIDATION_RETRY_SECONDS: int = 5
+    # How often the change stream resume token is saved while events flow
+    CACHE_INVALIDATION_TOKEN_SAVE_SECONDS: int = 10
+
+    # GET /items/events, fed by the same change stream reader
+    LIVE_EVENTS_ENABLED: bool = True
+    # Items with undelivered changes per connection before it must resync
+    LIVE_EVENTS_QUEUE_SIZE: int = 1000
+    # How often each connection is sent a keepalive and its token re-checked
+    LIVE_EVENTS_HEARTBEAT_SECONDS: int = 15
+    # Read the pre-image of deleted items, so that their owners hear of the
+    # deletion and not only superusers. Needs MongoDB 6.0+ and pre-images
+    # enabled on the collection beforehand, an ops step:
+    #   db.runCommand({collMod: "item", changeStreamPreAndPostImages: {enabled: true}})
+    LIVE_EVENTS_PRE_IMAGES: bool = False
+
+    # Background jobs stored in Mongo. Each API process runs JOBS_WORKERS
+    # workers; with 0 they only run in `python -m app.jobs_worker` processes
+    JOBS_WORKERS: int = 2
+    JOBS_POLL_SECONDS: float = 1
+    # A claimed job is claimed again by another worker if its lease is not
+    # renewed for this long (the worker running it died)
+    JOBS_VISIBILITY_TIMEOUT_SECONDS: int = 60
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_RETRY_BASE_SECONDS: float = 5
+    # Finished jobs are removed by a TTL index after this long
+    JOBS_RETENTION_SECONDS: int = 7 * 24 * 3600
+
     # Check for default secret values and raise warnings or errors
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
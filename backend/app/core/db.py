@@ -1,18 +1,71 @@
-from odmantic import AIOEngine
-from motor.motor_asyncio import AsyncIOMotorClient
 import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from odmantic import AIOEngine
 
-# from app.db import engine
 from app import crud
 from app.core.config import settings
-from app.models import User, UserCreate
-import logging
-
-client = AsyncIOMotorClient(settings.MONGODB_URI)
-engine = AIOEngine(client=client, database=settings.MONGODB_DB)
+from app.core.indexes import sync_indexes
+from app.core.pool import pool_stats
+from app.models import UserCreate
 
 logger = logging.getLogger(__name__)
+
+
+class Database:
+    """
+    The Mongo client of the process, created by ``connect`` (the lifespan of
+    app.main, or the main function of a script) rather than on import, so that
+    importing the app does no I/O: pymongo starts monitoring the servers as
+    soon as a client is created.
+    """
+
+    def __init__(self) -> None:
+        self.client: AsyncIOMotorClient | None = None
+        self._engine: AIOEngine | None = None
+
+    @property
+    def engine(self) -> AIOEngine:
+        if self._engine is None:
+            raise RuntimeError("The database is not connected, call db.connect()")
+        return self._engine
+
+    def connect(self) -> AIOEngine:
+        if self._engine is None:
+            self.client = AsyncIOMotorClient(
+                settings.MONGODB_URI,
+                event_listeners=[pool_stats],
+                **settings.mongodb_client_options,
+            )
+            self._engine = AIOEngine(client=self.client, database=settings.MONGODB_DB)
+        return self._engine
+
+    async def warm_up(self) -> None:
+        """
+        Select a server and open minPoolSize connections, so that the first
+        requests do not pay for server discovery and connection handshakes.
+        """
+        engine = self.connect()
+        await engine.client.admin.command("ping")
+        # Concurrent commands each need a connection of their own
+        min_pool_size = engine.client.options.pool_options.min_pool_size
+        await asyncio.gather(
+            *(engine.client.admin.command("ping") for _ in range(min_pool_size - 1))
+        )
+        logger.info(f"Mongo client ready: {pool_stats.stats()}")
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+        self.client, self._engine = None, None
+
+
+db = Database()
+
+
 async def init_db(engine: AIOEngine) -> None:
+    await sync_indexes(engine)
     user = await crud.get_user_by_email(engine, settings.FIRST_SUPERUSER)
     if not user:
         user_in = UserCreate(
@@ -0,0 +1,180 @@
+# Declares every index the application relies on and reconciles them with the
+# database, either at startup or from `python app/sync_indexes.py`.
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from odmantic import AIOEngine, Model
+from odmantic.index import ODMBaseIndex
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.models import Item, Job, RateLimitCounter, User
+
+logger = logging.getLogger(__name__)
+
+MODELS: list[type[Model]] = [User, Item, Job, RateLimitCounter]
+
+# Indexes needed by specific queries, on top of the ones declared on the models
+QUERY_INDEXES: dict[type[Model], list[IndexModel]] = {
+    Item: [
+        # read_items for regular users (owner_id filter, _id order and keyset
+        # cursor), its count and the removal of a deleted user's items
+        IndexModel([("owner_id", ASCENDING), ("_id", ASCENDING)], name="owner_id_id"),
+    ],
+    User: [
+        # Covers the token version table refresh of the stateless auth mode,
+        # which filters on is_active and reads _id and token_version
+        IndexModel(
+            [
+                ("is_active", ASCENDING),
+                ("token_version", ASCENDING),
+                ("_id", ASCENDING),
+            ],
+            name="is_active_token_version_id",
+        ),
+    ],
+    Job: [
+        # Claiming the oldest due pending job
+        IndexModel(
+            [("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"
+        ),
+        # Removes finished jobs. An existing index on finished_at is kept as
+        # is: drop it to apply a new JOBS_RETENTION_SECONDS
+        IndexModel(
+            [("finished_at", ASCENDING)],
+            name="finished_at_ttl",
+            expireAfterSeconds=settings.JOBS_RETENTION_SECONDS,
+        ),
+    ],
+    RateLimitCounter: [
+        # Counters expire once their window can no longer be weighted in
+        IndexModel(
+            [("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0
+        ),
+    ],
+}
+
+
+def declared_indexes(model: type[Model]) -> list[IndexModel]:
+    indexes = [
+        index.get_pymongo_index() if isinstance(index, ODMBaseIndex) else index
+        for index in model.__indexes__()
+    ]
+    return indexes + QUERY_INDEXES.get(model, [])
+
+
+IndexKey = tuple[tuple[str, Any], ...]
+
+
+def _index_key(key: Any) -> IndexKey:
+    # index_information() gives lists of pairs, with 1.0 for ascending on
+    # some servers; IndexModel documents give SON
+    pairs = key.items() if hasattr(key, "items") else key
+    return tuple(
+        (name, int(direction) if isinstance(direction, float) else direction)
+        for name, direction in pairs
+    )
+
+
+@dataclass
+class IndexReport:
+    collection: str
+    created: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+    # Declared indexes that exist under another name: declared -> existing
+    renamed: dict[str, str] = field(default_factory=dict)
+    # Declared indexes whose name is taken by an index on other keys, which
+    # is also undeclared; they are created once that index is dropped
+    conflicting: list[str] = field(default_factory=list)
+    # Existing indexes that no declaration asks for
+    undeclared: list[str] = field(default_factory=list)
+    dropped: list[str] = field(default_factory=list)
+    # Indexes with no recorded access since the server started, None if the
+    # $indexStats stage is not available to this user
+    unused: list[str] | None = None
+
+
+async def _unused_indexes(engine: AIOEngine, model: type[Model]) -> list[str] | None:
+    try:
+        stats = await (
+            engine.get_collection(model)
+            .aggregate([{"$indexStats": {}}])
+            .to_list(length=None)
+        )
+    except OperationFailure as e:
+        logger.warning(f"Could not read index usage of {model.__collection__}: {e}")
+        return None
+    return sorted(
+        stat["name"]
+        for stat in stats
+        if stat["name"] != "_id_" and stat["accesses"]["ops"] == 0
+    )
+
+
+async def sync_indexes(
+    engine: AIOEngine, *, dry_run: bool = False, drop_undeclared: bool = False
+) -> list[IndexReport]:
+    """
+    Create the declared indexes that are missing and report on the others.
+
+    Declared and existing indexes are matched on their keys, so an index built
+    under another name counts as present. With ``dry_run`` nothing is created
+    or dropped; ``missing`` and ``undeclared`` list what would be.
+
+    Index builds only lock the collection briefly at their start and end
+    (MongoDB 4.2+), so this can run while the API is serving; it is started as
+    a background task so that slow builds on large collections do not delay
+    startup either.
+    """
+    reports = []
+    for model in MODELS:
+        collection = engine.get_collection(model)
+        report = IndexReport(collection=model.__collection__)
+        existing = {
+            name: _index_key(info["key"])
+            for name, info in (await collection.index_information()).items()
+        }
+        existing_by_key = {key: name for name, key in existing.items()}
+        matched = {"_id_"}
+        to_create = []
+        for index in declared_indexes(model):
+            name = index.document["name"]
+            key = _index_key(index.document["key"])
+            if key in existing_by_key:
+                matched.add(existing_by_key[key])
+                if existing_by_key[key] != name:
+                    report.renamed[name] = existing_by_key[key]
+            elif name in existing:
+                report.conflicting.append(name)
+            else:
+                to_create.append(index)
+        report.missing = sorted(index.document["name"] for index in to_create)
+        if not dry_run and to_create:
+            await collection.create_indexes(to_create)
+            report.created, report.missing = report.missing, []
+
+        report.undeclared = sorted(set(existing) - matched)
+        if drop_undeclared and not dry_run:
+            for name in report.undeclared:
+                await collection.drop_index(name)
+            report.dropped, report.undeclared = report.undeclared, []
+
+        report.unused = await _unused_indexes(engine, model)
+        log = (
+            logger.warning
+            if report.missing or report.conflicting or report.undeclared
+            else logger.info
+        )
+        log(f"Indexes of {report.collection}: {report}")
+        reports.append(report)
+    return reports
+
+
+async def sync_indexes_on_startup(engine: AIOEngine) -> None:
+    try:
+        await sync_indexes(engine)
+    except Exception as e:
+        logger.error(f"Error reconciling indexes: {e}")
@@ -0,0 +1,229 @@
+# Cross-worker cache invalidation driven by MongoDB change streams.
+# Every worker caches users in process (app.core.cache) and keeps a token
+# version table (app.core.revocation); writes made by other workers reach them
+# through the change events published here instead of waiting for the TTL.
+# Cached list totals (count=cached) are approximate by design and keep
+# expiring by TTL only. Other per-worker consumers of changes, such as the
+# live item events, subscribe to the same reader.
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from odmantic import AIOEngine
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.cache import auth_user_cache, invalidate_user, user_cache
+from app.core.revocation import token_versions
+
+logger = logging.getLogger(__name__)
+
+# Resume tokens are stored in this collection, one document per stream name
+RESUME_TOKENS_COLLECTION = "change_stream_resume_tokens"
+STREAM_NAME = "cache-invalidation"
+
+# $changeStream on a standalone server, or a server that does not support it
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+CHANGE_OPERATIONS = ["insert", "update", "replace", "delete"]
+# The resume token is no longer in the oplog (ChangeStreamHistoryLost,
+# ChangeStreamFatalError), events may have been missed
+CHANGE_STREAM_HISTORY_LOST = {280, 286}
+
+
+@dataclass(frozen=True, slots=True)
+class ChangeEvent:
+    collection: str
+    operation: str
+    id: Any
+    # Fields set by an update, or the whole document of an insert or replace
+    fields: Mapping[str, Any] = field(default_factory=dict)
+    # Document after the change (looked up for updates, documents=True) and
+    # before it (pre_images=True); None when unavailable
+    document: Mapping[str, Any] | None = None
+    before: Mapping[str, Any] | None = None
+
+    @classmethod
+    def from_change(cls, change: Mapping[str, Any]) -> "ChangeEvent":
+        document = change.get("fullDocument")
+        if change["operationType"] == "update":
+            fields = change.get("updateDescription", {}).get("updatedFields", {})
+        else:
+            fields = document or {}
+        return cls(
+            collection=change["ns"]["coll"],
+            operation=change["operationType"],
+            id=change["documentKey"]["_id"],
+            fields=fields,
+            document=document,
+            before=change.get("fullDocumentBeforeChange"),
+        )
+
+
+class InvalidationBus:
+    """
+    Tails the change streams of the subscribed collections and hands every
+    change to the subscribers of its collection, so that per-worker caches drop
+    entries written by any worker, not only their own.
+
+    Each worker runs its own reader. The resume token is kept across reconnects
+    and saved in Mongo periodically, so a restarted reader picks up where the
+    stream was instead of skipping the events in between; replaying an event
+    only invalidates entries again. When the resume point is lost the
+    subscribers are reset (their caches cleared) since events may be missing.
+
+    Without change streams (standalone server) the reader stops after logging
+    it and caches are only kept fresh by their TTL.
+
+    Subscribers that need the documents (``documents=True``) get updates with
+    the current document looked up. With ``pre_images=True`` changes also
+    carry the document before them, when the collection records pre-images
+    (MongoDB 6.0+, enabled with collMod by the operator, never by the app).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # Whether the reader is connected to the change stream right now
+        self.following = False
+        self._subscribers: defaultdict[
+            str, list[Callable[[ChangeEvent], None]]
+        ] = defaultdict(list)
+        self._reset_handlers: list[Callable[[], None]] = []
+        self._document_collections: set[str] = set()
+        self._pre_images = False
+
+    def subscribe(
+        self,
+        collection: str,
+        on_change: Callable[[ChangeEvent], None],
+        on_reset: Callable[[], None] | None = None,
+        *,
+        documents: bool = False,
+        pre_images: bool = False,
+    ) -> None:
+        self._subscribers[collection].append(on_change)
+        if on_reset is not None:
+            self._reset_handlers.append(on_reset)
+        if documents:
+            self._document_collections.add(collection)
+        if pre_images:
+            self._pre_images = True
+
+    def publish(self, event: ChangeEvent) -> None:
+        for on_change in self._subscribers.get(event.collection, []):
+            try:
+                on_change(event)
+            except Exception:
+                logger.exception(f"Error handling change event {event}")
+
+    def reset(self) -> None:
+        for on_reset in self._reset_handlers:
+            on_reset()
+
+    def _pipeline(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "$match": {
+                    "ns.coll": {"$in": sorted(self._subscribers)},
+                    "operationType": {"$in": CHANGE_OPERATIONS},
+                }
+            }
+        ]
+
+    def _watch_options(self) -> dict[str, Any]:
+        options: dict[str, Any] = {}
+        if self._document_collections:
+            options["full_document"] = "updateLookup"
+        if self._pre_images:
+            # Null for collections that do not record pre-images
+            options["full_document_before_change"] = "whenAvailable"
+        return options
+
+    async def _load_token(self, engine: AIOEngine) -> Any:
+        doc = await engine.database[RESUME_TOKENS_COLLECTION].find_one(
+            {"_id": self.name}
+        )
+        return doc["token"] if doc else None
+
+    async def _save_token(self, engine: AIOEngine, token: Any) -> None:
+        await engine.database[RESUME_TOKENS_COLLECTION].update_one(
+            {"_id": self.name},
+            {"$set": {"token": token, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    async def run(
+        self, engine: AIOEngine, *, retry_seconds: float, save_seconds: float
+    ) -> None:
+        try:
+            token = await self._load_token(engine)
+        except PyMongoError as e:
+            logger.error(f"Could not load the change stream resume token: {e}")
+            token = None
+        options = self._watch_options()
+        saved_token, saved_at = token, time.monotonic()
+        try:
+            while True:
+                try:
+                    async with engine.database.watch(
+                        self._pipeline(), resume_after=token, **options
+                    ) as stream:
+                        logger.info(f"Following change streams for {self.name}")
+                        self.following = True
+                        while stream.alive:
+                            change = await stream.try_next()
+                            if change is not None:
+                                self.publish(ChangeEvent.from_change(change))
+                            token = stream.resume_token
+                            if (
+                                token != saved_token
+                                and time.monotonic() - saved_at >= save_seconds
+                            ):
+                                await self._save_token(engine, token)
+                                saved_token, saved_at = token, time.monotonic()
+                except OperationFailure as e:
+                    self.following = False
+                    if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                        logger.warning(
+                            "Change streams are not available, cached entries "
+                            f"only expire by TTL: {e}"
+                        )
+                        return
+                    if e.code in CHANGE_STREAM_HISTORY_LOST and token is not None:
+                        logger.warning(f"Change stream resume point lost: {e}")
+                        token = None
+                        self.reset()
+                        continue
+                    logger.error(f"Change stream error, retrying: {e}")
+                except PyMongoError as e:
+                    self.following = False
+                    logger.error(f"Change stream error, retrying: {e}")
+                await asyncio.sleep(retry_seconds)
+        finally:
+            self.following = False
+            if token is not None and token != saved_token:
+                try:
+                    await self._save_token(engine, token)
+                except PyMongoError as e:
+                    logger.error(f"Could not save the change stream resume token: {e}")
+
+
+def _on_user_change(event: ChangeEvent) -> None:
+    invalidate_user(event.id)
+    if event.operation == "delete" or event.fields.get("is_active") is False:
+        token_versions.discard(event.id)
+    elif "token_version" in event.fields:
+        token_versions.set_version(event.id, event.fields["token_version"])
+
+
+def _clear_user_caches() -> None:
+    user_cache.clear()
+    auth_user_cache.clear()
+
+
+invalidation_bus = InvalidationBus(STREAM_NAME)
+invalidation_bus.subscribe("user", _on_user_change, on_reset=_clear_user_caches)
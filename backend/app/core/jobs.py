@@ -0,0 +1,246 @@
+# Durable background jobs stored in the job collection. Request handlers
+# enqueue slow work (emails, cascade deletes) and return; workers in the API
+# processes or in `python -m app.jobs_worker` processes claim the jobs
+# atomically, so any number of them can share the collection, and jobs left
+# unfinished by a crashed worker are claimed again once their lease expires.
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from odmantic import AIOEngine, ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AIOEngine, Job], Awaitable[None]]
+
+
+class LeaseLost(Exception):
+    """The job was claimed by another worker, this one must stop running it."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_end() -> datetime:
+    return _now() + timedelta(seconds=settings.JOBS_VISIBILITY_TIMEOUT_SECONDS)
+
+
+class JobQueue:
+    """
+    At-least-once job queue over the job collection.
+
+    A worker claims the oldest due job with ``find_one_and_update``, which
+    moves its ``run_at`` to the end of a lease (the visibility timeout) and
+    gives it a new ``lease_id``. The lease is renewed while the handler runs;
+    if the worker dies the job becomes due again when the lease ends. Only the
+    holder of the current lease can mark the job done, or schedule its retry
+    with exponential backoff, until it fails for good after JOBS_MAX_ATTEMPTS.
+
+    Since a job can run more than once, handlers must be idempotent.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, JobHandler] = {}
+        # Set by enqueue so the workers of this process do not wait for a poll
+        self._wakeup = asyncio.Event()
+
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        def register(func: JobHandler) -> JobHandler:
+            self._handlers[kind] = func
+            return func
+
+        return register
+
+    async def enqueue(
+        self,
+        engine: AIOEngine,
+        kind: str,
+        payload: dict[str, Any],
+        *,
+        delay: float = 0,
+    ) -> Job:
+        now = _now()
+        job = Job(
+            kind=kind,
+            payload=payload,
+            run_at=now + timedelta(seconds=delay),
+            created_at=now,
+        )
+        await engine.get_collection(Job).insert_one(job.doc())
+        self._wakeup.set()
+        return job
+
+    async def claim(self, engine: AIOEngine) -> Job | None:
+        """Lease the oldest due job this process has a handler for, if any."""
+        doc = await engine.get_collection(Job).find_one_and_update(
+            {
+                "status": "pending",
+                "run_at": {"$lte": _now()},
+                "kind": {"$in": sorted(self._handlers)},
+            },
+            {
+                "$set": {"run_at": _lease_end(), "lease_id": ObjectId()},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return Job.model_validate_doc(doc) if doc else None
+
+    async def _update_leased(
+        self, engine: AIOEngine, job: Job, update: dict[str, Any]
+    ) -> bool:
+        result = await engine.get_collection(Job).update_one(
+            {"_id": job.id, "lease_id": job.lease_id}, update
+        )
+        return result.matched_count == 1
+
+    async def checkpoint(
+        self, engine: AIOEngine, job: Job, progress: dict[str, Any]
+    ) -> None:
+        """
+        Save progress in the job's payload, where a later attempt resumes from.
+
+        Raises LeaseLost if the job was claimed again meanwhile.
+        """
+        update = {"$set": {f"payload.{key}": value for key, value in progress.items()}}
+        if not await self._update_leased(engine, job, update):
+            raise LeaseLost
+        job.payload.update(progress)
+
+    async def _renew_lease(self, engine: AIOEngine, job: Job) -> None:
+        while True:
+            await asyncio.sleep(settings.JOBS_VISIBILITY_TIMEOUT_SECONDS / 3)
+            try:
+                renewed = await self._update_leased(
+                    engine, job, {"$set": {"run_at": _lease_end()}}
+                )
+            except PyMongoError as e:
+                logger.error(f"Could not renew the lease of job {job.id}: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Lost the lease of job {job.id} ({job.kind})")
+                return
+
+    async def _finish(
+        self, engine: AIOEngine, job: Job, error: Exception | None
+    ) -> None:
+        now = _now()
+        update: dict[str, Any]
+        # The payload may hold secrets (new account emails): jobs drop it once
+        # they are done or failed for good, only pending jobs keep it
+        if error is None:
+            update = {
+                "$set": {
+                    "status": "done",
+                    "finished_at": now,
+                    "lease_id": None,
+                    "payload": {},
+                    "error": None,
+                }
+            }
+        elif job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            logger.error(
+                f"Job {job.id} ({job.kind}) failed after {job.attempts} "
+                f"attempt(s): {error}"
+            )
+            update = {
+                "$set": {
+                    "status": "failed",
+                    "finished_at": now,
+                    "lease_id": None,
+                    "payload": {},
+                    "error": str(error),
+                }
+            }
+        else:
+            delay = settings.JOBS_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            logger.warning(
+                f"Job {job.id} ({job.kind}) failed, retrying in {delay}s: {error}"
+            )
+            update = {
+                "$set": {
+                    "run_at": now + timedelta(seconds=delay),
+                    "lease_id": None,
+                    "error": str(error),
+                }
+            }
+        if not await self._update_leased(engine, job, update):
+            logger.warning(
+                f"Lease of job {job.id} ({job.kind}) expired before it finished, "
+                "it may run again"
+            )
+
+    async def _release(self, engine: AIOEngine, job: Job) -> None:
+        # Stopped before the job finished: make it due again right away, without
+        # counting this attempt
+        await self._update_leased(
+            engine,
+            job,
+            {"$set": {"run_at": _now(), "lease_id": None}, "$inc": {"attempts": -1}},
+        )
+
+    async def run_job(self, engine: AIOEngine, job: Job) -> None:
+        renew = asyncio.create_task(self._renew_lease(engine, job))
+        error: Exception | None = None
+        try:
+            await self._handlers[job.kind](engine, job)
+        except asyncio.CancelledError:
+            with suppress(PyMongoError):
+                await self._release(engine, job)
+            raise
+        except LeaseLost:
+            logger.warning(f"Stopped job {job.id} ({job.kind}), its lease expired")
+            return
+        except Exception as e:
+            error = e
+        finally:
+            renew.cancel()
+        try:
+            await self._finish(engine, job, error)
+        except PyMongoError as e:
+            logger.error(f"Could not record the result of job {job.id}: {e}")
+
+    async def _worker(self, engine: AIOEngine, poll_seconds: float) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self.claim(engine)
+            except PyMongoError as e:
+                logger.error(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), poll_seconds)
+                continue
+            await self.run_job(engine, job)
+
+    async def run(
+        self, engine: AIOEngine, *, workers: int, poll_seconds: float
+    ) -> None:
+        """Run ``workers`` concurrent workers until cancelled."""
+        logger.info(f"Starting {workers} job workers for {sorted(self._handlers)}")
+        await asyncio.gather(
+            *(self._worker(engine, poll_seconds) for _ in range(workers))
+        )
+
+    async def stats(self, engine: AIOEngine) -> dict[str, dict[str, int]]:
+        """Number of jobs by kind and status."""
+        counts: dict[str, dict[str, int]] = {}
+        group = {"_id": {"kind": "$kind", "status": "$status"}, "n": {"$sum": 1}}
+        async for row in engine.get_collection(Job).aggregate([{"$group": group}]):
+            counts.setdefault(row["_id"]["kind"], {})[row["_id"]["status"]] = row["n"]
+        return counts
+
+
+job_queue = JobQueue()
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmailQueueFull(Exception):
+    """The outgoing email queue is full, the caller should retry later."""
+
+
+@dataclass
+class OutgoingEmail:
+    message: EmailMessage
+    attempts: int = 0
+    # Whether transient failures are retried by the dispatcher
+    retry: bool = True
+    # Resolved once the email is sent or given up on, for ``send``
+    result: asyncio.Future[None] | None = None
+
+    @property
+    def abandoned(self) -> bool:
+        # Whoever awaited ``send`` was cancelled (a job stopped by shutdown,
+        # which runs it again later): sending it now would send it twice
+        return self.result is not None and self.result.cancelled()
+
+    def resolve(self, error: Exception | None) -> None:
+        if self.result is None or self.result.done():
+            return
+        if error is None:
+            self.result.set_result(None)
+        else:
+            self.result.set_exception(error)
+
+
+def _is_transient(error: Exception) -> bool:
+    # 4xx replies and connection problems are worth retrying, 5xx replies are not
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+class SMTPConnection:
+    """
+    A persistent SMTP connection owned by one sender task. smtplib is blocking,
+    so every call runs in the connection's own thread, which also keeps the
+    calls on a connection in order.
+    """
+
+    def __init__(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        timeout = settings.EMAIL_SMTP_TIMEOUT_SECONDS
+        smtp: smtplib.SMTP
+        if settings.SMTP_SSL and not settings.SMTP_TLS:
+            smtp = smtplib.SMTP_SSL(
+                settings.SMTP_HOST, settings.SMTP_PORT, timeout=timeout
+            )
+        else:
+            smtp = smtplib.SMTP(
+                settings.SMTP_HOST, settings.SMTP_PORT, timeout=timeout
+            )
+            if settings.SMTP_TLS:
+                smtp.starttls()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        return smtp
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def send_batch(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """Send messages in order, returning the error of each one (None if sent)."""
+        if (
+            self._smtp is not None
+            and time.monotonic() - self._last_used > settings.EMAIL_SMTP_IDLE_SECONDS
+        ):
+            # The server has probably dropped it already
+            self.close()
+        results: list[Exception | None] = []
+        for message in messages:
+            try:
+                if self._smtp is None:
+                    self._smtp = self._connect()
+                self._smtp.send_message(message)
+                results.append(None)
+            except (
+                smtplib.SMTPRecipientsRefused,
+                smtplib.SMTPSenderRefused,
+                smtplib.SMTPDataError,
+            ) as e:
+                # smtplib has reset the transaction, the connection is reusable
+                results.append(e)
+            except (smtplib.SMTPException, OSError) as e:
+                self.close()
+                results.append(e)
+        self._last_used = time.monotonic()
+        return results
+
+
+class EmailDispatcher:
+    """
+    Sends emails from background tasks so that request handlers only pay for
+    putting a message in a bounded queue.
+
+    Each sender task owns a persistent SMTP connection, takes up to
+    EMAIL_BATCH_SIZE queued messages at a time and sends them in one trip to
+    its thread. Transient failures of submitted emails are retried with
+    exponential backoff up to EMAIL_MAX_ATTEMPTS times; ``send`` makes a single
+    attempt, its caller (the email job) is retried by the job queue instead.
+    When the queue is full both raise EmailQueueFull instead of letting the
+    backlog grow. Emails whose ``send`` was cancelled before they left the
+    queue are dropped.
+
+    The senders start with the first submitted message and are stopped, after
+    the queue is drained, by ``shutdown``.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[OutgoingEmail] | None = None
+        self._senders: list[asyncio.Task[None]] = []
+        self._retries: set[asyncio.Task[None]] = set()
+        self.sent = 0
+        self.failed = 0
+
+    def _start(self) -> asyncio.Queue[OutgoingEmail]:
+        queue: asyncio.Queue[OutgoingEmail] = asyncio.Queue(
+            settings.EMAIL_QUEUE_MAX_SIZE
+        )
+        self._queue = queue
+        self._senders = [
+            asyncio.create_task(self._sender(queue, SMTPConnection()))
+            for _ in range(settings.EMAIL_SMTP_CONNECTIONS)
+        ]
+        return queue
+
+    def submit(self, message: EmailMessage) -> None:
+        self._put(OutgoingEmail(message))
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Queue an email and wait until it is sent, raising the error if the
+        attempt fails. Not retried, so that retries with a durable caller are
+        not multiplied by the dispatcher's own.
+        """
+        result: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._put(OutgoingEmail(message, retry=False, result=result))
+        await result
+
+    def _put(self, email: OutgoingEmail) -> None:
+        queue = self._queue or self._start()
+        try:
+            queue.put_nowait(email)
+        except asyncio.QueueFull:
+            raise EmailQueueFull
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retrying": len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+    async def _sender(
+        self, queue: asyncio.Queue[OutgoingEmail], connection: SMTPConnection
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < settings.EMAIL_BATCH_SIZE and not queue.empty():
+                    batch.append(queue.get_nowait())
+                for email in batch:
+                    if email.abandoned:
+                        queue.task_done()
+                batch = [email for email in batch if not email.abandoned]
+                if not batch:
+                    continue
+                try:
+                    results = await loop.run_in_executor(
+                        connection.executor,
+                        connection.send_batch,
+                        [email.message for email in batch],
+                    )
+                except Exception as e:
+                    logger.exception("Unexpected error sending emails")
+                    results = [e] * len(batch)
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+                for email, error in zip(batch, results):
+                    self._handle_result(queue, email, error)
+        finally:
+            # Queued behind a send still running in the thread, if any
+            await loop.run_in_executor(connection.executor, connection.close)
+            connection.executor.shutdown(wait=False)
+
+    def _handle_result(
+        self,
+        queue: asyncio.Queue[OutgoingEmail],
+        email: OutgoingEmail,
+        error: Exception | None,
+    ) -> None:
+        if error is None:
+            self.sent += 1
+            email.resolve(None)
+            return
+        email.attempts += 1
+        recipient = email.message["To"]
+        if (
+            not email.retry
+            or email.attempts >= settings.EMAIL_MAX_ATTEMPTS
+            or not _is_transient(error)
+        ):
+            self.failed += 1
+            logger.error(
+                f"Giving up sending email to {recipient} after "
+                f"{email.attempts} attempt(s): {error}"
+            )
+            email.resolve(error)
+            return
+        delay = settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (email.attempts - 1)
+        logger.warning(
+            f"Sending email to {recipient} failed, retrying in {delay}s: {error}"
+        )
+        task = asyncio.create_task(self._retry(queue, email, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry(
+        self, queue: asyncio.Queue[OutgoingEmail], email: OutgoingEmail, delay: float
+    ) -> None:
+        await asyncio.sleep(delay)
+        await queue.put(email)
+
+    async def _drain(self, queue: asyncio.Queue[OutgoingEmail]) -> None:
+        while True:
+            await queue.join()
+            if not self._retries:
+                return
+            await asyncio.wait(self._retries)
+
+    async def shutdown(self, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for queued and retried emails, then stop."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._drain(self._queue), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Stopping with {self._queue.qsize()} queued and "
+                f"{len(self._retries)} retrying emails unsent"
+            )
+        for task in [*self._senders, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._senders, *self._retries, return_exceptions=True)
+        self._queue, self._senders = None, []
+
+
+email_dispatcher = EmailDispatcher()
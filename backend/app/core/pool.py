@@ -0,0 +1,123 @@
+# Live statistics of the Mongo client's connection pools, one per server, for
+# sizing MONGODB_MAX_POOL_SIZE against the number of workers.
+
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from pymongo import monitoring
+
+
+@dataclass
+class ServerPoolStats:
+    # Connections open, and lent to an operation right now
+    open: int = 0
+    checked_out: int = 0
+    max_checked_out: int = 0
+    # Operations waiting for a connection right now
+    waiters: int = 0
+    max_waiters: int = 0
+    checkouts: int = 0
+    # Checkouts that failed, most often a wait queue timeout
+    failed_checkouts: int = 0
+    # Seconds spent waiting for a connection, over all checkouts
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    cleared: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        attempts = self.checkouts + self.failed_checkouts
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "max_checked_out": self.max_checked_out,
+            "waiters": self.waiters,
+            "max_waiters": self.max_waiters,
+            "checkouts": self.checkouts,
+            "failed_checkouts": self.failed_checkouts,
+            "avg_wait_ms": self.wait_seconds / attempts * 1000 if attempts else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "cleared": self.cleared,
+        }
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Counts the connection pool events of a client. The driver calls listeners
+    from its own threads (Motor runs pymongo in a thread pool), hence the lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._servers: dict[str, ServerPoolStats] = {}
+
+    def _server(self, address: Any) -> ServerPoolStats:
+        host, port = address
+        return self._servers.setdefault(f"{host}:{port}", ServerPoolStats())
+
+    def _waited(self, event: Any) -> ServerPoolStats:
+        stats = self._server(event.address)
+        stats.waiters -= 1
+        duration = event.duration or 0.0
+        stats.wait_seconds += duration
+        stats.max_wait_seconds = max(stats.max_wait_seconds, duration)
+        return stats
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {address: s.as_dict() for address, s in self._servers.items()}
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self._server(event.address)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self._server(event.address).cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._server(event.address).open += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._server(event.address).open -= 1
+
+    def connection_check_out_started(
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ) -> None:
+        with self._lock:
+            stats = self._server(event.address)
+            stats.waiters += 1
+            stats.max_waiters = max(stats.max_waiters, stats.waiters)
+
+    def connection_check_out_failed(
+        self, event: monitoring.ConnectionCheckOutFailedEvent
+    ) -> None:
+        with self._lock:
+            self._waited(event).failed_checkouts += 1
+
+    def connection_checked_out(
+        self, event: monitoring.ConnectionCheckedOutEvent
+    ) -> None:
+        with self._lock:
+            stats = self._waited(event)
+            stats.checkouts += 1
+            stats.checked_out += 1
+            stats.max_checked_out = max(stats.max_checked_out, stats.checked_out)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._server(event.address).checked_out -= 1
+
+
+pool_stats = PoolStatsListener()
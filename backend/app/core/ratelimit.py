@@ -0,0 +1,165 @@
+# Sliding window rate limiting of the endpoints that hash passwords or send
+# emails, so that a burst of attempts is rejected before it reaches bcrypt.
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from odmantic import AIOEngine
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.models import RateLimitCounter
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimited(Exception):
+    """Too many attempts for a key, the client should retry after a while."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Sliding window counters: each key counts its hits in fixed windows of
+    RATE_LIMIT_WINDOW_SECONDS, and a hit is allowed while the count of the
+    current window plus the previous window's count, weighted by how much of it
+    still overlaps the sliding window, stays within the limit.
+
+    Counts live in memory, or in the rate limit counter collection with the
+    mongo backend so that all workers share them. Either way a key found over
+    its limit is remembered in memory until the end of the window, so an
+    ongoing attack is rejected without any database round trip. If Mongo is
+    unavailable the counts of this worker are used.
+    """
+
+    def __init__(self) -> None:
+        # key -> (window number, count of that window, count of the one before)
+        self._counts: OrderedDict[str, tuple[int, int, int]] = OrderedDict()
+        # key -> time until which it is rejected
+        self._blocked: dict[str, float] = {}
+
+    def _hit_memory(self, key: str, window: int) -> tuple[int, int]:
+        counted_window, count, previous = self._counts.pop(key, (window, 0, 0))
+        if counted_window == window - 1:
+            previous, count = count, 0
+        elif counted_window != window:
+            previous, count = 0, 0
+        count += 1
+        self._counts[key] = (window, count, previous)
+        while len(self._counts) > settings.RATE_LIMIT_MAX_KEYS:
+            self._counts.popitem(last=False)
+        return previous, count
+
+    def _peek_memory(self, key: str, window: int) -> tuple[int, int]:
+        counted_window, count, previous = self._counts.get(key, (window, 0, 0))
+        if counted_window == window - 1:
+            return count, 0
+        if counted_window != window:
+            return 0, 0
+        return previous, count
+
+    async def _peek_mongo(
+        self, engine: AIOEngine, key: str, window: int
+    ) -> tuple[int, int]:
+        collection = engine.get_collection(RateLimitCounter)
+        current, previous = await asyncio.gather(
+            collection.find_one({"_id": f"{key}:{window}"}),
+            collection.find_one({"_id": f"{key}:{window - 1}"}),
+        )
+        return (
+            previous["count"] if previous else 0,
+            current["count"] if current else 0,
+        )
+
+    async def _count(
+        self, engine: AIOEngine, key: str, window: int, increment: bool
+    ) -> tuple[int, int]:
+        if settings.RATE_LIMIT_BACKEND == "mongo":
+            try:
+                if increment:
+                    return await self._hit_mongo(engine, key, window)
+                return await self._peek_mongo(engine, key, window)
+            except PyMongoError as e:
+                logger.error(f"Rate limit counters unavailable, counting locally: {e}")
+        if increment:
+            return self._hit_memory(key, window)
+        return self._peek_memory(key, window)
+
+    async def _hit_mongo(
+        self, engine: AIOEngine, key: str, window: int
+    ) -> tuple[int, int]:
+        collection = engine.get_collection(RateLimitCounter)
+        expires_at = datetime.fromtimestamp(
+            (window + 2) * settings.RATE_LIMIT_WINDOW_SECONDS, timezone.utc
+        )
+        current, previous = await asyncio.gather(
+            collection.find_one_and_update(
+                {"_id": f"{key}:{window}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            ),
+            collection.find_one({"_id": f"{key}:{window - 1}"}),
+        )
+        return (previous["count"] if previous else 0), current["count"]
+
+    def _prune_blocked(self, now: float) -> None:
+        if len(self._blocked) > settings.RATE_LIMIT_MAX_KEYS:
+            self._blocked = {
+                key: until for key, until in self._blocked.items() if until > now
+            }
+
+    async def hit(
+        self, engine: AIOEngine, key: str, limit: int, *, increment: bool = True
+    ) -> None:
+        """
+        Count an attempt for ``key``, raising RateLimited when over ``limit``.
+
+        With ``increment=False`` nothing is counted: it only raises if one more
+        attempt would be over the limit, for keys that count failures later.
+        """
+        now = time.time()
+        blocked_until = self._blocked.get(key, 0.0)
+        if now < blocked_until:
+            raise RateLimited(math.ceil(blocked_until - now))
+
+        window_seconds = settings.RATE_LIMIT_WINDOW_SECONDS
+        window = int(now // window_seconds)
+        previous, count = await self._count(engine, key, window, increment)
+        if not increment:
+            count += 1
+
+        overlap = 1 - (now - window * window_seconds) / window_seconds
+        if previous * overlap + count > limit:
+            blocked_until = (window + 1) * window_seconds
+            self._blocked[key] = blocked_until
+            self._prune_blocked(now)
+            raise RateLimited(max(1, math.ceil(blocked_until - now)))
+
+    async def check(
+        self, engine: AIOEngine, limits: dict[str, int], *, increment: bool = True
+    ) -> None:
+        """
+        Count an attempt for every key of ``limits`` (key -> limit), in order,
+        and raise RateLimited at the first one over its limit. See ``hit`` for
+        ``increment``.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        for key, limit in limits.items():
+            await self.hit(engine, key, limit, increment=increment)
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._blocked.clear()
+
+
+rate_limiter = RateLimiter()
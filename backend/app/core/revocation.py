@@ -0,0 +1,104 @@
+import asyncio
+import logging
+
+from odmantic import AIOEngine, ObjectId
+
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersionTable:
+    """
+    In-memory ``user id -> token_version`` table of active users, used by the
+    stateless auth mode to reject tokens of deactivated or deleted users and
+    tokens issued before a password or privilege change.
+
+    The whole table is reloaded from the ``user`` collection periodically, and
+    entries are updated right away for writes made by this worker. Writes made
+    by other workers arrive through the change stream reader of
+    app.core.invalidation when there is one, else on the next refresh.
+    """
+
+    def __init__(self) -> None:
+        self._versions: dict[ObjectId, int] = {}
+        # Entries written while a refresh scans the collection, None for
+        # removals; re-applied over the snapshot, which may predate them
+        self._changed_during_refresh: dict[ObjectId, int | None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def _set(self, user_id: ObjectId, version: int | None) -> None:
+        if version is None:
+            self._versions.pop(user_id, None)
+        else:
+            self._versions[user_id] = version
+        if self._changed_during_refresh is not None:
+            self._changed_during_refresh[user_id] = version
+
+    def update(self, user: User) -> None:
+        self._set(user.id, user.token_version if user.is_active else None)
+
+    def discard(self, user_id: ObjectId) -> None:
+        self._set(user_id, None)
+
+    def set_version(self, user_id: ObjectId, token_version: int) -> None:
+        # Only known (active) users: others are looked up on their next request
+        if user_id in self._versions:
+            self._set(user_id, token_version)
+
+    async def current_version(
+        self, engine: AIOEngine, user_id: ObjectId, token_version: int
+    ) -> int | None:
+        """
+        Current token version of an active user, or None if the user does not
+        exist or is inactive.
+
+        Unknown users and tokens newer than the table (issued by another worker
+        after a change) are looked up in the database and stored.
+        """
+        version = self._versions.get(user_id)
+        if version is not None and token_version <= version:
+            return version
+        doc = await engine.get_collection(User).find_one(
+            {"_id": user_id, "is_active": True}, {"token_version": 1}
+        )
+        if doc is None:
+            self._set(user_id, None)
+            return None
+        version = doc.get("token_version", 0)
+        self._set(user_id, version)
+        return version
+
+    async def refresh(self, engine: AIOEngine) -> None:
+        versions = {}
+        changed: dict[ObjectId, int | None] = {}
+        self._changed_during_refresh = changed
+        try:
+            cursor = engine.get_collection(User).find(
+                {"is_active": True}, {"token_version": 1}
+            )
+            async for doc in cursor:
+                versions[doc["_id"]] = doc.get("token_version", 0)
+        finally:
+            self._changed_during_refresh = None
+        # A revocation made during the scan must not be undone by the snapshot
+        for user_id, version in changed.items():
+            if version is None:
+                versions.pop(user_id, None)
+            else:
+                versions[user_id] = version
+        self._versions = versions
+        logger.info(f"Token version table refreshed with {len(versions)} users")
+
+    async def refresh_forever(self, engine: AIOEngine, interval: float) -> None:
+        while True:
+            try:
+                await self.refresh(engine)
+            except Exception as e:
+                logger.error(f"Error refreshing token version table: {e}")
+            await asyncio.sleep(interval)
+
+
+token_versions = TokenVersionTable()
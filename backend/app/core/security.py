@@ -1,12 +1,19 @@
 # No changes required for the switch to ODMantic (MongoDB).
 
+import asyncio
+import hashlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import suppress
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Literal
 
 import jwt
 from passlib.context import CryptContext
 
+from app.core.cache import token_cache
 from app.core.config import settings
+from app.models import TokenPayload, User
 import logging
 from datetime import datetime, timezone
 
@@ -19,21 +26,147 @@ ALGORITHM = "HS256"
 logger = logging.getLogger(__name__)
 
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    claims: dict[str, Any] | None = None,
+) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     logger.info(f"Token created at {datetime.utcnow()}, expires at {expire}")
     logger.info(f"Subject: {subject}")
     return encoded_jwt
 
 
+def authorization_claims(user: User) -> dict[str, Any]:
+    """Claims that let stateless auth authorize a request without a user lookup."""
+    return {
+        "act": user.is_active,
+        "su": user.is_superuser,
+        "ver": user.token_version,
+    }
+
+
+def decode_access_token(token: str) -> TokenPayload:
+    """
+    Decode and validate an access token, reusing the result for tokens seen before.
+
+    Raises the same errors as ``jwt.decode`` and ``TokenPayload`` validation.
+    Cached entries expire together with the token, so an expired token is
+    decoded again and rejected.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data: TokenPayload | None = token_cache.get(key)
+    if token_data is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        token_data = TokenPayload(**payload)
+        exp = payload.get("exp")
+        token_cache.set(key, token_data, ttl=exp - time.time() if exp else None)
+    return token_data
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHashingUnavailable(Exception):
+    """The hashing pool already has too many pending jobs to accept another one."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded worker pool so that
+    async handlers never block the event loop for the duration of a hash.
+
+    Calls beyond ``max_pending`` (queued plus running) are rejected right away
+    with ``PasswordHashingUnavailable`` instead of piling up behind the pool.
+    """
+
+    def __init__(
+        self,
+        *,
+        executor: Literal["thread", "process"],
+        max_workers: int,
+        max_pending: int,
+    ) -> None:
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, func: Any, *args: Any) -> Any:
+        # Only the event loop thread touches the counter, no lock needed
+        if self._pending >= self.max_pending:
+            logger.warning(
+                f"Password hashing pool saturated ({self._pending} pending), rejecting"
+            )
+            raise PasswordHashingUnavailable()
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(func, *args)
+        self._pending += 1
+        # Released when the job ends, not when the caller stops waiting: a
+        # cancelled request leaves a started hash running in the pool
+        future.add_done_callback(
+            lambda _: self._call_in_loop(loop, self._release)
+        )
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+    @staticmethod
+    def _call_in_loop(loop: asyncio.AbstractEventLoop, callback: Any) -> None:
+        # Done callbacks run in the pool's thread, or in the loop's on cancel
+        with suppress(RuntimeError):  # loop closed during shutdown
+            loop.call_soon_threadsafe(callback)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        result: bool = await self._run(verify_password, plain_password, hashed_password)
+        return result
+
+    async def hash(self, password: str) -> str:
+        result: str = await self._run(get_password_hash, password)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
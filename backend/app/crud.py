@@ -1,39 +1,233 @@
+import asyncio
+from collections.abc import Iterable
 from typing import Any, Union
-from odmantic import AIOEngine, Model, query, SyncEngine
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from odmantic import AIOEngine, Model, ObjectId, query, SyncEngine
+from app.core.cache import invalidate_user
+from app.core.config import settings
+from app.core.jobs import job_queue
+from app.core.revocation import token_versions
+from app.core.security import get_password_hash_async, verify_password_async
+from app.models import (
+    AuthUser,
+    Item,
+    ItemCreate,
+    Job,
+    User,
+    UserCreate,
+    UserProfile,
+    UserUpdate,
+)
 
 import logging
 
+# User lookups never need the embedded items list, which can be large
+USER_LEAN_PROJECTION = {"items": 0}
+AUTH_USER_PROJECTION = {"is_active": 1, "is_superuser": 1}
+USER_PROFILE_PROJECTION = {
+    "email": 1,
+    "full_name": 1,
+    "is_active": 1,
+    "is_superuser": 1,
+    "revision": 1,
+}
+
+DELETE_USER_JOB = "delete_user"
+
+
+def user_from_doc(doc: dict[str, Any]) -> User:
+    """
+    Build a User from a lean document.
+
+    Such a user has an empty ``items`` list, so it must be written back with
+    ``save_user_fields`` rather than ``engine.save``, which would overwrite the
+    stored list.
+    """
+    # The projection leaves the items key out, which User requires
+    user = User.model_validate_doc({"items": [], **doc})
+    # Same state as an instance loaded by engine.find_one: nothing modified
+    object.__setattr__(user, "__fields_modified__", set())
+    return user
+
+
+async def get_user_by_id(engine: AIOEngine, user_id: ObjectId) -> User | None:
+    doc = await engine.get_collection(User).find_one(
+        {"_id": user_id}, USER_LEAN_PROJECTION
+    )
+    return user_from_doc(doc) if doc else None
+
+
+async def get_auth_user(engine: AIOEngine, user_id: ObjectId) -> AuthUser | None:
+    doc = await engine.get_collection(User).find_one(
+        {"_id": user_id}, AUTH_USER_PROJECTION
+    )
+    if not doc:
+        return None
+    return AuthUser(
+        id=doc["_id"],
+        is_active=doc.get("is_active", True),
+        is_superuser=doc.get("is_superuser", False),
+    )
+
+
+async def get_user_profile(
+    engine: AIOEngine, user_id: ObjectId
+) -> UserProfile | None:
+    doc = await engine.get_collection(User).find_one(
+        {"_id": user_id}, USER_PROFILE_PROJECTION
+    )
+    if not doc:
+        return None
+    return UserProfile(
+        id=doc["_id"],
+        email=doc["email"],
+        full_name=doc.get("full_name"),
+        is_active=doc.get("is_active", True),
+        is_superuser=doc.get("is_superuser", False),
+        revision=doc.get("revision", 0),
+    )
+
+
+def revision_filter(revision: int) -> Any:
+    """
+    Query value matching a stored ``revision``, for compare-and-set writes.
+
+    Documents written before revisions existed have none, which reads as 0.
+    """
+    return {"$in": [0, None]} if revision == 0 else revision
+
+
+async def save_user_fields(
+    *,
+    engine: AIOEngine,
+    db_user: User,
+    fields: Iterable[str],
+    expected_revision: int | None = None,
+) -> bool:
+    """
+    Write only the given fields of a user, leaving the rest of the document as is.
+
+    The revision is bumped with the write. With ``expected_revision`` the write
+    only happens if the stored revision still matches; returns whether it did.
+    """
+    doc = db_user.model_dump_doc(include=set(fields))
+    saved = True
+    if doc:
+        query: dict[str, Any] = {"_id": db_user.id}
+        if expected_revision is not None:
+            query["revision"] = revision_filter(expected_revision)
+        result = await engine.get_collection(User).update_one(
+            query, {"$set": doc, "$inc": {"revision": 1}}
+        )
+        saved = result.matched_count == 1
+        if saved:
+            db_user.revision += 1
+    invalidate_user(db_user.id)
+    return saved
+
+
 async def create_user(*, engine: AIOEngine, user_create: UserCreate) -> User:
     # Create a User object and hash the password
     db_obj = User(
         email=user_create.email,
-        hashed_password=get_password_hash(user_create.password)
+        hashed_password=await get_password_hash_async(user_create.password)
     )
     # Save the user to the database
     await engine.save(db_obj)
     return db_obj
 
 
-async def update_user(*, engine: AIOEngine, db_user: User, user_in: UserUpdate) -> Any:
+async def update_user(
+    *,
+    engine: AIOEngine,
+    db_user: User,
+    user_in: UserUpdate,
+    expected_revision: int | None = None,
+) -> User | None:
+    """Apply an update; None if ``expected_revision`` no longer matches."""
     user_data = user_in.model_dump(exclude_unset=True)
     extra_data = {}
     if "password" in user_data:
         password = user_data["password"]
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash_async(password)
         extra_data["hashed_password"] = hashed_password
 
-    for key, value in {**user_data, **extra_data}.items():
+    # Tokens issued before a password or privilege change must stop working
+    if "password" in user_data or any(
+        key in user_data and user_data[key] != getattr(db_user, key)
+        for key in ("is_active", "is_superuser")
+    ):
+        extra_data["token_version"] = db_user.token_version + 1
+
+    user_data.pop("password", None)
+    values = {**user_data, **extra_data}
+    for key, value in values.items():
         setattr(db_user, key, value)
 
-    await engine.save(db_user)  # Equivalent to session.add(db_user) and session.commit()
+    if not await save_user_fields(
+        engine=engine,
+        db_user=db_user,
+        fields=values,
+        expected_revision=expected_revision,
+    ):
+        return None
+    token_versions.update(db_user)
     return db_user
 logger = logging.getLogger(__name__)
 
+async def delete_user(*, engine: AIOEngine, user_id: ObjectId) -> None:
+    """
+    Delete a user right away and their items in a background job, which can
+    take long for users with many items.
+
+    The job is queued first and deletes the user too, so a crash in between
+    leaves nothing half deleted.
+    """
+    await job_queue.enqueue(engine, DELETE_USER_JOB, {"user_id": user_id})
+    await engine.get_collection(User).delete_one({"_id": user_id})
+    invalidate_user(user_id)
+    token_versions.discard(user_id)
+
+
+@job_queue.handler(DELETE_USER_JOB)
+async def delete_user_job(engine: AIOEngine, job: Job) -> None:
+    """
+    Delete a user's items in ``_id`` order, USER_ITEMS_DELETE_BATCH_SIZE at a
+    time with a pause in between. The last deleted ``_id`` is saved after every
+    batch, so an interrupted job resumes after it.
+    """
+    user_id = job.payload["user_id"]
+    await engine.get_collection(User).delete_one({"_id": user_id})
+    items = engine.get_collection(Item)
+    match: dict[str, Any] = {"owner_id": user_id}
+    while True:
+        if "last_id" in job.payload:
+            match["_id"] = {"$gt": job.payload["last_id"]}
+        cursor = (
+            items.find(match, {"_id": 1})
+            .sort("_id", 1)
+            .limit(settings.USER_ITEMS_DELETE_BATCH_SIZE)
+        )
+        ids = [doc["_id"] async for doc in cursor]
+        if not ids:
+            return
+        result = await items.delete_many({"_id": {"$in": ids}})
+        await job_queue.checkpoint(
+            engine,
+            job,
+            {
+                "last_id": ids[-1],
+                "deleted": job.payload.get("deleted", 0) + result.deleted_count,
+            },
+        )
+        await asyncio.sleep(settings.USER_ITEMS_DELETE_PAUSE_SECONDS)
+
+
 async def get_user_by_email(engine: AIOEngine, email: str) -> Union[User, None]:
     try:
-        session_user = await engine.find_one(User, User.email == email)
+        doc = await engine.get_collection(User).find_one(
+            {"email": email}, USER_LEAN_PROJECTION
+        )
+        session_user = user_from_doc(doc) if doc else None
         if session_user:
             logger.info(f"User found: {session_user.email}")
         else:
@@ -47,7 +241,7 @@ async def authenticate(*, engine: AIOEngine, email: str, password: str) -> Union
     db_user = await get_user_by_email(engine=engine, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    if not await verify_password_async(password, db_user.hashed_password):
         return None
     return db_user
 
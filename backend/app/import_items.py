@@ -0,0 +1,290 @@
+# Bulk import of items from NDJSON or CSV, used by POST /items/import and as a
+# command line tool:
+#
+#     python app/import_items.py items.ndjson --owner-email user@example.com
+#
+# The input is parsed incrementally and written in insert_many batches, so
+# memory use is bounded by the batch size whatever the size of the input.
+# Uploads to POST /items/import are spooled by Starlette (in memory, then on
+# disk) before the endpoint runs; the parsing reads the spooled file in chunks.
+
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from typing import Any, Literal
+
+from odmantic import AIOEngine, ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app import crud
+from app.core.config import settings
+from app.core.db import db
+from app.models import Item, ItemCreate, ItemImportError, ItemsImportReport
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["ndjson", "csv"]
+
+MAX_REPORTED_ERRORS = 100
+READ_CHUNK_BYTES = 64 * 1024
+# Longest line, and longest CSV record, kept in memory while parsing
+MAX_LINE_CHARS = 1024 * 1024
+
+# A parsed row, or the reason it could not be parsed
+Row = dict[str, Any] | str
+
+
+async def _line_batches(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[list[str | None]]:
+    """
+    The decoded lines completed by each chunk, without their newline.
+
+    A line longer than MAX_LINE_CHARS is dropped as it arrives, so that input
+    without newlines cannot fill the memory, and None takes its place.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    too_long = False
+    async for chunk in chunks:
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        batch: list[str | None] = []
+        for line in lines:
+            batch.append(None if too_long or len(line) > MAX_LINE_CHARS else line)
+            too_long = False
+        if len(pending) > MAX_LINE_CHARS:
+            pending, too_long = "", True
+        if batch:
+            yield batch
+    pending += decoder.decode(b"", final=True)
+    if pending or too_long:
+        yield [None if too_long or len(pending) > MAX_LINE_CHARS else pending]
+
+
+LINE_TOO_LONG = f"Line longer than {MAX_LINE_CHARS} characters"
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    async for lines in _line_batches(chunks):
+        for line in lines:
+            if line is None:
+                yield LINE_TOO_LONG
+                continue
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield f"Invalid JSON: {e}"
+                continue
+            yield row if isinstance(row, dict) else "Expected a JSON object"
+
+
+class _CSVLines:
+    """
+    The line iterator of an import's csv.reader, extended as chunks arrive.
+
+    When it runs out of lines in the middle of a record, the reader returns
+    the record parsed so far: ``starved`` tells so, and ``retry_record`` puts
+    the record's lines back to be parsed again once more lines arrived. Only
+    records that straddle chunks are parsed twice.
+    """
+
+    def __init__(self) -> None:
+        self._lines: deque[str | None] = deque()
+        # Lines read for the record being parsed
+        self._record: list[str | None] = []
+        self.starved = False
+
+    def __iter__(self) -> "_CSVLines":
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            self.starved = True
+            raise StopIteration
+        line = self._lines.popleft()
+        self._record.append(line)
+        if line is None:
+            raise csv.Error(LINE_TOO_LONG)
+        return line + "\n"
+
+    def extend(self, lines: list[str | None]) -> None:
+        self._lines.extend(lines)
+
+    def record_chars(self) -> int:
+        return sum(len(line) for line in self._record if line is not None)
+
+    def next_record(self) -> None:
+        self._record.clear()
+        self.starved = False
+
+    def retry_record(self) -> None:
+        self._lines.extendleft(reversed(self._record))
+        self.next_record()
+
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    lines = _CSVLines()
+    reader = csv.reader(lines)
+    batches = _line_batches(chunks)
+    more_input = True
+    header: list[str] | None = None
+    while True:
+        lines.next_record()
+        try:
+            values = next(reader, None)
+        except csv.Error as e:
+            yield str(e)
+            continue
+        if lines.starved and more_input:
+            if lines.record_chars() > MAX_LINE_CHARS:
+                # Most likely a quote that opens a field and is never closed
+                yield f"Record longer than {MAX_LINE_CHARS} characters"
+                return
+            lines.retry_record()
+            batch = await anext(batches, None)
+            if batch is None:
+                more_input = False
+            else:
+                lines.extend(batch)
+            continue
+        if values is None:
+            return
+        if lines.starved:
+            yield "Unterminated quoted field"
+            continue
+        if not values:
+            continue
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells fall back to the field defaults
+        yield {key: value for key, value in zip(header, values) if value != ""}
+
+
+async def import_items(
+    db_engine: AIOEngine,
+    rows: AsyncIterator[Row],
+    *,
+    owner_id: ObjectId,
+    ordered: bool = False,
+    batch_size: int | None = None,
+    on_progress: Callable[[ItemsImportReport], None] | None = None,
+) -> ItemsImportReport:
+    """
+    Validate rows against ItemCreate and insert them as items of ``owner_id``.
+
+    In ordered mode the import stops at the first invalid row or failed write,
+    everything before it being inserted; otherwise failing rows are reported
+    and skipped.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    collection = db_engine.get_collection(Item)
+    report = ItemsImportReport(inserted=0, failed=0, errors=[])
+
+    def fail(row_number: int, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ItemImportError(row=row_number, error=error))
+
+    async def flush(batch: list[tuple[int, dict[str, Any]]]) -> None:
+        try:
+            result = await collection.insert_many(
+                [doc for _, doc in batch], ordered=ordered
+            )
+            report.inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details["writeErrors"]
+            report.inserted += e.details["nInserted"]
+            for error in write_errors:
+                fail(batch[error["index"]][0], error["errmsg"])
+            report.stopped = ordered
+        logger.info(f"Imported {report.inserted} items, {report.failed} failed")
+        if on_progress:
+            on_progress(report)
+
+    batch: list[tuple[int, dict[str, Any]]] = []
+    row_number = 0
+    async for row in rows:
+        row_number += 1
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            item_in = ItemCreate.model_validate(row)
+        except (ValueError, ValidationError) as e:
+            fail(row_number, str(e))
+            if ordered:
+                report.stopped = True
+                break
+            continue
+        item = Item(**item_in.model_dump(exclude={"id"}), owner_id=owner_id)
+        batch.append((row_number, item.model_dump_doc()))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+            if report.stopped:
+                break
+    # Rows before an ordered import's first invalid row are still written
+    if batch:
+        await flush(batch)
+    return report
+
+
+def parse_rows(chunks: AsyncIterator[bytes], format: ImportFormat) -> AsyncIterator[Row]:
+    return csv_rows(chunks) if format == "csv" else ndjson_rows(chunks)
+
+
+async def _file_chunks(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := file.read(READ_CHUNK_BYTES):
+            yield chunk
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = db.connect()
+    try:
+        await run_import(engine, args)
+    finally:
+        db.close()
+
+
+async def run_import(engine: AIOEngine, args: argparse.Namespace) -> None:
+    owner = await crud.get_user_by_email(engine=engine, email=args.owner_email)
+    if not owner:
+        raise SystemExit(f"No user with email {args.owner_email}")
+    format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    logger.info(f"Importing {args.path} as {format}")
+    report = await import_items(
+        engine,
+        parse_rows(_file_chunks(args.path), format),
+        owner_id=owner.id,
+        ordered=args.ordered,
+        batch_size=args.batch_size,
+    )
+    for error in report.errors:
+        print(f"row {error.row}: {error.error}")
+    print(
+        f"inserted={report.inserted} failed={report.failed}"
+        + (" (stopped at first error)" if report.stopped else "")
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Import items from NDJSON or CSV.")
+    parser.add_argument("path")
+    parser.add_argument("--owner-email", required=True)
+    parser.add_argument("--format", choices=["ndjson", "csv"])
+    parser.add_argument("--ordered", action="store_true")
+    parser.add_argument("--batch-size", type=int)
+    asyncio.run(main(parser.parse_args()))
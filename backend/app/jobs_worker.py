@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.db import db
+from app.core.jobs import job_queue
+from app.core.mail import email_dispatcher
+
+# Register their job handlers
+import app.crud  # noqa: F401
+import app.utils  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(*, workers: int) -> None:
+    engine = db.connect()
+    try:
+        await job_queue.run(
+            engine, workers=workers, poll_seconds=settings.JOBS_POLL_SECONDS
+        )
+    finally:
+        await email_dispatcher.shutdown(settings.EMAIL_SHUTDOWN_TIMEOUT_SECONDS)
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run background job workers beside the API processes."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(settings.JOBS_WORKERS, 1),
+        help="number of jobs run concurrently (default: JOBS_WORKERS)",
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(workers=args.workers))
+    except KeyboardInterrupt:
+        logger.info("Job workers stopped")
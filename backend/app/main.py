@@ -1,13 +1,29 @@
 # This module does not establish any SQL database connection.
 # No changes required for the switch to ODMantic (MongoDB).
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import Any
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.responses import FastJSONResponse
 from app.core.config import settings
+from app.core.db import db
+from app.core.indexes import sync_indexes_on_startup
+from app.core.invalidation import invalidation_bus
+from app.core.jobs import job_queue
+from app.core.mail import email_dispatcher
+from app.core.ratelimit import RateLimited
+from app.core.revocation import token_versions
+from app.core.security import PasswordHashingUnavailable, password_hasher
+from app.utils import precompile_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -17,10 +33,60 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    engine = db.connect()
+    # Before the worker reports it is started, as is the template compilation
+    await db.warm_up()
+    precompile_email_templates()
+    background_tasks: list[asyncio.Task[Any]] = []
+    if settings.MONGODB_SYNC_INDEXES_ON_STARTUP:
+        background_tasks.append(asyncio.create_task(sync_indexes_on_startup(engine)))
+    if settings.AUTH_STATELESS:
+        background_tasks.append(
+            asyncio.create_task(
+                token_versions.refresh_forever(
+                    engine, settings.AUTH_TOKEN_VERSION_REFRESH_SECONDS
+                )
+            )
+        )
+    if settings.CACHE_INVALIDATION_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(
+                invalidation_bus.run(
+                    engine,
+                    retry_seconds=settings.CACHE_INVALIDATION_RETRY_SECONDS,
+                    save_seconds=settings.CACHE_INVALIDATION_TOKEN_SAVE_SECONDS,
+                )
+            )
+        )
+    if settings.JOBS_WORKERS:
+        background_tasks.append(
+            asyncio.create_task(
+                job_queue.run(
+                    engine,
+                    workers=settings.JOBS_WORKERS,
+                    poll_seconds=settings.JOBS_POLL_SECONDS,
+                )
+            )
+        )
+    yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await email_dispatcher.shutdown(settings.EMAIL_SHUTDOWN_TIMEOUT_SECONDS)
+    password_hasher.shutdown()
+    db.close()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -35,4 +101,25 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+
+@app.exception_handler(PasswordHashingUnavailable)
+async def password_hashing_unavailable_handler(
+    request: Request, exc: PasswordHashingUnavailable
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many attempts, try again later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,9 +1,12 @@
 # This module has alreday been converted to ODMantic.
 
+from dataclasses import dataclass
+from datetime import datetime
+
 from odmantic import Field, Model, ObjectId
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from pydantic import EmailStr
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_validator
 
 
 class UserBase(Model):
@@ -32,6 +35,14 @@ class UserUpdateMe(Model):
     full_name: Optional[str] = None
     email: Optional[EmailStr] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def _email_not_null(cls, data: Any) -> Any:
+        # Can be left out, but User requires an email: null would $set it to None
+        if isinstance(data, dict) and "email" in data and data["email"] is None:
+            raise ValueError("email cannot be null")
+        return data
+
 
 class UpdatePassword(Model):
     current_password: str
@@ -45,15 +56,55 @@ class User(Model):
     full_name: Optional[str] = None
     hashed_password: str
     items: List["Item"] = Field(default_factory=list)
+    # Bumped whenever previously issued access tokens must stop working
+    token_version: int = 0
+    # Bumped on every write, the ETag of the user's representations
+    revision: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class AuthUser:
+    """What authorization needs to know about the current user."""
+
+    id: ObjectId
+    is_active: bool
+    is_superuser: bool
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    """The current user as cached per worker, without password hash or items."""
+
+    id: ObjectId
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    is_superuser: bool
+    revision: int
 
 
 class UserPublic(UserBase):
     public_id: ObjectId
 
 
+class UserPublicFields(Model):
+    """UserPublic as returned by the reads that take ``?fields=``."""
+
+    # Fields left out of ?fields= are missing from the response
+    email: Optional[EmailStr] = None
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+    full_name: Optional[str] = None
+    public_id: ObjectId
+
+
 class UsersPublic(Model):
-    data: List[UserPublic]
-    count: int
+    data: List[UserPublicFields]
+    # None when the total was not requested (count=none)
+    count: Optional[int]
+    # How count was computed: exact, none, estimated or cached
+    count_mode: str = "exact"
+    next_cursor: Optional[str] = None
 
 
 class ItemBase(Model):
@@ -68,6 +119,14 @@ class ItemCreate(ItemBase):
 class ItemUpdate(ItemBase):
     title: Optional[str] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def _title_not_null(cls, data: Any) -> Any:
+        # Can be left out, but Item requires a title: null would $set it to None
+        if isinstance(data, dict) and "title" in data and data["title"] is None:
+            raise ValueError("title cannot be null")
+        return data
+
 
 class Item(Model):
     title: str
@@ -75,6 +134,8 @@ class Item(Model):
     title: str
     owner: Optional[ObjectId] = Field(default=None)
     owner_id: ObjectId
+    # Bumped on every write, the ETag of the item's representations
+    revision: int = 0
 
 
 class ItemPublic(Model):
@@ -83,9 +144,100 @@ class ItemPublic(Model):
     owner_id: ObjectId
 
 
+class ItemPublicFields(Model):
+    """ItemPublic as returned by the reads that take ``?fields=``."""
+
+    # Fields left out of ?fields= are missing from the response
+    title: Optional[str] = None
+    description: Optional[str] = None
+    owner_id: Optional[ObjectId] = None
+
+
 class ItemsPublic(BaseModel):
-    items: List[ItemPublic]
-    count: int
+    items: List[ItemPublicFields]
+    # None when the total was not requested (count=none)
+    count: Optional[int]
+    # How count was computed: exact, none, estimated or cached
+    count_mode: str = "exact"
+    next_cursor: Optional[str] = None
+
+
+class ItemsBatchCreate(BaseModel):
+    items: List[ItemCreate]
+
+
+class ItemBatchUpdate(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+    @field_validator("title")
+    @classmethod
+    def _title_not_null(cls, title: Optional[str]) -> str:
+        # Can be left out, but Item requires a title: null would $set it to None
+        if title is None:
+            raise ValueError("title cannot be null")
+        return title
+
+
+class ItemsBatchUpdate(BaseModel):
+    items: List[ItemBatchUpdate]
+
+
+class ItemsBatchDelete(BaseModel):
+    ids: List[str]
+
+
+class ItemBatchResult(BaseModel):
+    # Position of the element in the request
+    index: int
+    id: Optional[str] = None
+    ok: bool
+    error: Optional[str] = None
+
+
+class ItemsBatchResults(BaseModel):
+    results: List[ItemBatchResult]
+    succeeded: int
+    failed: int
+
+
+class ItemImportError(BaseModel):
+    # 1-based record number, blank NDJSON lines and the CSV header excluded
+    row: int
+    error: str
+
+
+class ItemsImportReport(BaseModel):
+    inserted: int
+    failed: int
+    # Only the first errors are listed, failed has the total
+    errors: List[ItemImportError]
+    # Ordered imports stop at the first failing row
+    stopped: bool = False
+
+
+class Job(Model):
+    kind: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    # pending until it is done, or failed after its last attempt
+    status: str = "pending"
+    attempts: int = 0
+    # When a worker can claim the job next: its scheduled time while it waits,
+    # the end of the lease while a worker runs it
+    run_at: datetime
+    # Set by each claim, only the worker holding the lease can finish the job
+    lease_id: Optional[ObjectId] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class RateLimitCounter(Model):
+    # "<limited key>:<window number>"
+    key: str = Field(primary_field=True)
+    count: int = 0
+    expires_at: datetime
 
 
 class Message(Model):
@@ -99,6 +251,10 @@ class Token(Model):
 
 class TokenPayload(Model):
     sub: Optional[str] = None
+    # Only present in tokens issued with AUTH_STATELESS enabled
+    act: Optional[bool] = None
+    su: Optional[bool] = None
+    ver: Optional[int] = None
 
 
 class NewPassword(Model):
@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+import logging
+
+from app.core.db import db
+from app.core.indexes import sync_indexes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(*, dry_run: bool, drop_undeclared: bool) -> None:
+    logger.info("Reconciling indexes")
+    try:
+        reports = await sync_indexes(
+            db.connect(), dry_run=dry_run, drop_undeclared=drop_undeclared
+        )
+    finally:
+        db.close()
+    for report in reports:
+        renamed = [f"{name} as {existing}" for name, existing in report.renamed.items()]
+        unused = "unknown" if report.unused is None else ", ".join(report.unused)
+        print(f"{report.collection}:")
+        print(f"  created:     {', '.join(report.created) or '-'}")
+        print(f"  missing:     {', '.join(report.missing) or '-'}")
+        print(f"  renamed:     {', '.join(renamed) or '-'}")
+        print(f"  conflicting: {', '.join(report.conflicting) or '-'}")
+        print(f"  undeclared:  {', '.join(report.undeclared) or '-'}")
+        print(f"  dropped:     {', '.join(report.dropped) or '-'}")
+        print(f"  unused:      {unused or '-'}")
+    logger.info("Indexes reconciled")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create missing indexes and report missing, undeclared and unused ones."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only report, do not create or drop indexes",
+    )
+    parser.add_argument(
+        "--drop-undeclared",
+        action="store_true",
+        help="drop existing indexes that are not declared in app.core.indexes",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(dry_run=args.dry_run, drop_undeclared=args.drop_undeclared))
@@ -0,0 +1,142 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from odmantic import ObjectId
+from starlette.requests import Request
+
+from app import crud
+from app.api.conditional import check_if_match, etag, not_modified
+from app.api.deps import get_current_auth_user, get_db
+from app.api.routes import items
+from app.models import AuthUser, User
+
+
+def _request(**headers: str) -> Request:
+    raw = [
+        (name.replace("_", "-").encode(), value.encode())
+        for name, value in headers.items()
+    ]
+    return Request({"type": "http", "headers": raw})
+
+
+def test_not_modified() -> None:
+    tag = etag(ObjectId(), 3)
+    assert not_modified(_request(), tag) is None
+    assert not_modified(_request(if_none_match='"other"'), tag) is None
+    response = not_modified(_request(if_none_match=f'"other", W/{tag}'), tag)
+    assert response is not None
+    assert response.status_code == 304
+    assert response.headers["etag"] == tag
+    assert not_modified(_request(if_none_match="*"), tag) is not None
+
+
+def test_check_if_match() -> None:
+    tag = etag(ObjectId(), 3)
+    assert check_if_match(_request(), tag) is False
+    assert check_if_match(_request(if_match=tag), tag) is True
+    assert check_if_match(_request(if_match="*"), tag) is True
+    for header in (f"W/{tag}", '"other"'):
+        with pytest.raises(HTTPException) as exc_info:
+            check_if_match(_request(if_match=header), tag)
+        assert exc_info.value.status_code == 412
+
+
+class FakeCollection:
+    """One stored document, written by compare-and-set queries."""
+
+    def __init__(self, doc: dict[str, Any]) -> None:
+        self.doc = doc
+
+    def _matches(self, query: dict[str, Any]) -> bool:
+        for key, value in query.items():
+            stored = self.doc.get(key)
+            if isinstance(value, dict) and "$in" in value:
+                if stored not in value["$in"]:
+                    return False
+            elif stored != value:
+                return False
+        return True
+
+    def _apply(self, update: dict[str, Any]) -> None:
+        self.doc.update(update.get("$set", {}))
+        self.doc["revision"] = self.doc.get("revision", 0) + 1
+
+    async def find_one_and_update(
+        self, query: dict[str, Any], update: dict[str, Any], **kwargs: Any
+    ) -> dict[str, Any] | None:
+        if not self._matches(query):
+            return None
+        self._apply(update)
+        return dict(self.doc)
+
+    async def update_one(
+        self, query: dict[str, Any], update: dict[str, Any]
+    ) -> SimpleNamespace:
+        matched = self._matches(query)
+        if matched:
+            self._apply(update)
+        return SimpleNamespace(matched_count=int(matched))
+
+
+class FakeEngine:
+    def __init__(self, doc: dict[str, Any]) -> None:
+        self.collection = FakeCollection(doc)
+
+    def get_collection(self, model: Any) -> FakeCollection:
+        return self.collection
+
+    async def find_one(self, model: Any, *args: Any) -> Any:
+        return model.model_validate_doc(self.collection.doc)
+
+
+def test_revision_filter_matches_legacy_documents() -> None:
+    assert crud.revision_filter(0) == {"$in": [0, None]}
+    assert crud.revision_filter(2) == 2
+
+
+def test_conditional_update_of_legacy_item() -> None:
+    owner = AuthUser(id=ObjectId(), is_active=True, is_superuser=False)
+    # Written before items had a revision
+    doc = {"_id": ObjectId(), "title": "t", "owner_id": owner.id}
+    engine = FakeEngine(doc)
+    app = FastAPI()
+    app.include_router(items.router, prefix="/items")
+    app.dependency_overrides[get_db] = lambda: engine
+    app.dependency_overrides[get_current_auth_user] = lambda: owner
+    client = TestClient(app)
+
+    tag = etag(doc["_id"], 0)
+    response = client.put(
+        f"/items/{doc['_id']}", json={"title": "new"}, headers={"If-Match": tag}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["etag"] == etag(doc["_id"], 1)
+    assert doc["title"] == "new"
+
+    response = client.put(f"/items/{doc['_id']}", json={"title": None})
+    assert response.status_code == 422
+    assert doc["title"] == "new"
+
+
+def test_conditional_save_of_legacy_user() -> None:
+    user = User(email="user@example.com", hashed_password="x")
+    doc = user.model_dump_doc()
+    del doc["revision"]
+    engine = FakeEngine(doc)
+    user.full_name = "New"
+
+    async def save(expected_revision: int) -> bool:
+        return await crud.save_user_fields(
+            engine=engine,  # type: ignore[arg-type]
+            db_user=user,
+            fields={"full_name"},
+            expected_revision=expected_revision,
+        )
+
+    assert asyncio.run(save(0))
+    assert doc["full_name"] == "New" and doc["revision"] == 1
+    assert not asyncio.run(save(0))
@@ -0,0 +1,189 @@
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from odmantic import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.api.deps import get_current_auth_user, get_db
+from app.api.routes import items
+from app.models import AuthUser
+
+OWNER = AuthUser(id=ObjectId(), is_active=True, is_superuser=False)
+
+
+def _matches(doc: dict[str, Any], query: dict[str, Any]) -> bool:
+    for key, value in query.items():
+        if isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class FakeItems:
+    def __init__(self) -> None:
+        self.docs: dict[ObjectId, dict[str, Any]] = {}
+        # Ids deleted by another request right after the access check
+        self.deleted_concurrently: set[ObjectId] = set()
+        # Ids whose update fails with a write error
+        self.failing: set[ObjectId] = set()
+
+    def add(self, owner_id: ObjectId = OWNER.id, **fields: Any) -> ObjectId:
+        doc = {"_id": ObjectId(), "title": "t", "owner_id": owner_id, "revision": 0}
+        self.docs[doc["_id"]] = {**doc, **fields}
+        return doc["_id"]
+
+    async def _iterate(self, query: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        for doc in list(self.docs.values()):
+            if _matches(doc, query):
+                yield dict(doc)
+        for item_id in self.deleted_concurrently:
+            self.docs.pop(item_id, None)
+
+    def find(self, query: dict[str, Any], *args: Any) -> AsyncIterator[Any]:
+        return self._iterate(query)
+
+    async def insert_many(self, docs: list[dict[str, Any]], ordered: bool) -> None:
+        for doc in docs:
+            self.docs[doc["_id"]] = doc
+
+    async def bulk_write(self, operations: list[UpdateOne], ordered: bool) -> Any:
+        matched, errors = 0, []
+        for index, operation in enumerate(operations):
+            query, update = operation._filter, operation._doc
+            doc = self.docs.get(query["_id"])
+            if doc is None or not _matches(doc, query):
+                continue
+            if query["_id"] in self.failing:
+                errors.append({"index": index, "errmsg": "Document failed validation"})
+                continue
+            matched += 1
+            doc.update(update["$set"])
+            doc["revision"] += update["$inc"]["revision"]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nMatched": matched})
+        return SimpleNamespace(matched_count=matched)
+
+    async def delete_many(self, query: dict[str, Any]) -> None:
+        for doc in list(self.docs.values()):
+            if _matches(doc, query):
+                del self.docs[doc["_id"]]
+
+
+class FakeEngine:
+    def __init__(self) -> None:
+        self.items = FakeItems()
+
+    def get_collection(self, model: Any) -> FakeItems:
+        return self.items
+
+
+@pytest.fixture
+def engine() -> FakeEngine:
+    return FakeEngine()
+
+
+@pytest.fixture
+def client(engine: FakeEngine) -> TestClient:
+    app = FastAPI()
+    app.include_router(items.router, prefix="/items")
+    app.dependency_overrides[get_db] = lambda: engine
+    app.dependency_overrides[get_current_auth_user] = lambda: OWNER
+    return TestClient(app)
+
+
+def _results(response: Any) -> list[tuple[bool, str | None]]:
+    assert response.status_code == 200, response.text
+    return [(result["ok"], result["error"]) for result in response.json()["results"]]
+
+
+def test_create_batch(client: TestClient, engine: FakeEngine) -> None:
+    response = client.post(
+        "/items/batch", json={"items": [{"title": "a"}, {"title": "b"}]}
+    )
+    assert _results(response) == [(True, None), (True, None)]
+    assert sorted(doc["title"] for doc in engine.items.docs.values()) == ["a", "b"]
+
+
+def test_update_batch(client: TestClient, engine: FakeEngine) -> None:
+    mine = engine.items.add()
+    unchanged = engine.items.add()
+    theirs = engine.items.add(owner_id=ObjectId())
+    response = client.patch(
+        "/items/batch",
+        json={
+            "items": [
+                {"id": str(mine), "title": "new"},
+                {"id": str(unchanged)},
+                {"id": str(theirs), "title": "new"},
+                {"id": "not-an-id", "title": "new"},
+            ]
+        },
+    )
+    assert _results(response) == [
+        (True, None),
+        (True, None),
+        (False, "Item not found"),
+        (False, "Invalid id"),
+    ]
+    assert engine.items.docs[mine]["title"] == "new"
+    assert engine.items.docs[mine]["revision"] == 1
+    assert engine.items.docs[theirs]["title"] == "t"
+
+
+def test_update_batch_rejects_null_title(
+    client: TestClient, engine: FakeEngine
+) -> None:
+    item_id = engine.items.add()
+    response = client.patch(
+        "/items/batch", json={"items": [{"id": str(item_id), "title": None}]}
+    )
+    assert response.status_code == 422
+    assert engine.items.docs[item_id]["title"] == "t"
+    # description is optional and can be cleared
+    response = client.patch(
+        "/items/batch", json={"items": [{"id": str(item_id), "description": None}]}
+    )
+    assert _results(response) == [(True, None)]
+
+
+def test_update_batch_reports_write_errors(
+    client: TestClient, engine: FakeEngine
+) -> None:
+    ok, failing, deleted = engine.items.add(), engine.items.add(), engine.items.add()
+    engine.items.failing.add(failing)
+    engine.items.deleted_concurrently.add(deleted)
+    response = client.patch(
+        "/items/batch",
+        json={"items": [{"id": str(i), "title": "new"} for i in (ok, failing, deleted)]},
+    )
+    assert _results(response) == [
+        (True, None),
+        (False, "Document failed validation"),
+        (False, "Item not found"),
+    ]
+    assert response.json()["succeeded"] == 1
+
+
+def test_delete_batch(client: TestClient, engine: FakeEngine) -> None:
+    mine = engine.items.add()
+    theirs = engine.items.add(owner_id=ObjectId())
+    response = client.post(
+        "/items/batch/delete", json={"ids": [str(mine), str(theirs)]}
+    )
+    assert _results(response) == [(True, None), (False, "Item not found")]
+    assert list(engine.items.docs) == [theirs]
+
+
+def test_batch_size_is_limited(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(items.settings, "ITEMS_BATCH_MAX_SIZE", 2)
+    response = client.post("/items/batch", json={"items": [{"title": "a"}] * 3})
+    assert response.status_code == 413
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from typing import Any
+
+from odmantic import ObjectId
+
+from app.api.live import ItemEvent, ItemEventHub, Subscription, event_stream
+from app.core.invalidation import ChangeEvent
+from app.models import AuthUser
+
+
+def _user(is_superuser: bool = False) -> AuthUser:
+    return AuthUser(id=ObjectId(), is_active=True, is_superuser=is_superuser)
+
+
+def _change(operation: str, id: ObjectId, **docs: Any) -> ChangeEvent:
+    return ChangeEvent(collection="item", operation=operation, id=id, **docs)
+
+
+async def _allow() -> bool:
+    return True
+
+
+def _drain(subscription: Subscription) -> tuple[bool, list[ItemEvent]]:
+    return asyncio.run(subscription.get())
+
+
+def test_fan_out_to_owner_and_superusers() -> None:
+    hub = ItemEventHub()
+    owner, other, admin = _user(), _user(), _user(is_superuser=True)
+    subscriptions = {
+        name: hub.connect(user, 10)
+        for name, user in (("owner", owner), ("other", other), ("admin", admin))
+    }
+    item_id = ObjectId()
+    hub.on_change(_change("insert", item_id, document={"owner_id": owner.id}))
+    # Deletes without a pre-image only reach superusers
+    hub.on_change(_change("delete", ObjectId()))
+
+    assert [e.type for e in _drain(subscriptions["owner"])[1]] == ["created"]
+    assert [e.type for e in _drain(subscriptions["admin"])[1]] == [
+        "created",
+        "deleted",
+    ]
+    assert not subscriptions["other"]._pending
+
+    for subscription in subscriptions.values():
+        hub.disconnect(subscription)
+    assert len(hub) == 0
+
+
+def test_coalescing_and_overflow() -> None:
+    subscription = Subscription(_user(), maxsize=2)
+    a, b, c = ObjectId(), ObjectId(), ObjectId()
+    subscription.put(ItemEvent("created", a, {"title": "1"}))
+    subscription.put(ItemEvent("updated", a, {"title": "2"}))
+    subscription.put(ItemEvent("created", b, {}))
+    subscription.put(ItemEvent("deleted", b))
+    resync, events = _drain(subscription)
+    assert not resync
+    assert events == [ItemEvent("created", a, {"title": "2"})]
+
+    for item_id in (a, b, c):
+        subscription.put(ItemEvent("updated", item_id, {}))
+    resync, events = _drain(subscription)
+    assert resync
+    assert [event.id for event in events] == [c]
+
+
+def test_event_stream_messages() -> None:
+    hub = ItemEventHub()
+    owner = _user()
+    item_id = ObjectId()
+
+    async def run() -> list[str]:
+        stream = event_stream(
+            hub, owner, ("title",), maxsize=10, heartbeat=0.01, authorized=_allow
+        )
+        messages = [await anext(stream)]  # keepalive, connected by now
+        hub.on_change(
+            _change(
+                "update",
+                item_id,
+                document={"_id": item_id, "title": "t", "owner_id": owner.id},
+            )
+        )
+        messages.append(await anext(stream))
+        await stream.aclose()
+        return messages
+
+    keepalive, message = asyncio.run(run())
+    assert keepalive == ": keepalive\n\n"
+    event, data = message.strip().split("\n")
+    assert event == "event: updated"
+    assert json.loads(data.removeprefix("data: ")) == {
+        "id": str(item_id),
+        "item": {"title": "t", "id": str(item_id)},
+    }
+    assert len(hub) == 0
+
+
+def test_event_stream_ends_when_no_longer_authorized() -> None:
+    hub = ItemEventHub()
+    checks: list[bool] = []
+
+    async def authorized() -> bool:
+        checks.append(True)
+        return len(checks) < 2
+
+    async def run() -> list[str]:
+        stream = event_stream(
+            hub, _user(), (), maxsize=10, heartbeat=0.01, authorized=authorized
+        )
+        return [message async for message in stream]
+
+    assert asyncio.run(run()) == [": keepalive\n\n"]
+    assert len(checks) == 2
+    assert len(hub) == 0
@@ -0,0 +1,188 @@
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from odmantic import ObjectId
+
+from app.api.pagination import (
+    CountMode,
+    PageLimit,
+    PageSkip,
+    apply_cursor,
+    count_documents,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    next_cursor,
+)
+from app.core.config import settings
+from app.models import Item
+
+
+def test_cursor_round_trip() -> None:
+    object_id = ObjectId()
+    assert decode_cursor(encode_cursor(object_id)) == object_id
+
+
+def test_decode_invalid_cursor() -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_apply_cursor() -> None:
+    object_id = ObjectId()
+    query = {"owner_id": "owner"}
+    assert apply_cursor(query, None) is query
+    assert apply_cursor(query, encode_cursor(object_id)) == {
+        "owner_id": "owner",
+        "_id": {"$gt": object_id},
+    }
+
+
+def test_next_cursor() -> None:
+    docs = [{"_id": ObjectId()} for _ in range(3)]
+    assert next_cursor(docs[:2], limit=2) is None
+    page = list(docs)
+    cursor = next_cursor(page, limit=2)
+    assert page == docs[:2]
+    assert cursor is not None
+    assert decode_cursor(cursor) == docs[1]["_id"]
+
+
+def test_page_parameters_are_bounded() -> None:
+    app = FastAPI()
+
+    @app.get("/")
+    async def read(skip: PageSkip = 0, limit: PageLimit = 100) -> list[int]:
+        return [skip, limit]
+
+    client = TestClient(app)
+    assert client.get("/").json() == [0, 100]
+    assert client.get(f"/?limit={settings.LIST_MAX_LIMIT}").status_code == 200
+    for query in (
+        "limit=0",
+        "limit=-1",
+        f"limit={settings.LIST_MAX_LIMIT + 1}",
+        "skip=-1",
+    ):
+        assert client.get(f"/?{query}").status_code == 422
+
+
+class CountingEngine:
+    def __init__(self) -> None:
+        self.count_calls = 0
+
+    async def count(self, model: Any, query: Any) -> int:
+        self.count_calls += 1
+        return 42
+
+    def get_collection(self, model: Any) -> "CountingEngine":
+        return self
+
+    async def estimated_document_count(self) -> int:
+        return 40
+
+
+def test_count_documents_modes() -> None:
+    engine = CountingEngine()
+    query = {"owner_id": ObjectId()}
+
+    async def run(query: dict[str, Any], mode: CountMode) -> Any:
+        return await count_documents(engine, Item, query, mode)  # type: ignore[arg-type]
+
+    assert asyncio.run(run(query, "exact")) == (42, "exact")
+    assert asyncio.run(run(query, "none")) == (None, "none")
+    assert asyncio.run(run({}, "estimated")) == (40, "estimated")
+    assert asyncio.run(run(query, "estimated")) == (42, "exact")
+    engine.count_calls = 0
+    assert asyncio.run(run(query, "cached")) == (42, "cached")
+    assert asyncio.run(run(query, "cached")) == (42, "cached")
+    assert engine.count_calls == 1
+
+
+class AggregatingEngine:
+    def __init__(self, docs: list[dict[str, Any]]) -> None:
+        self.docs = docs
+        self.pipelines: list[Any] = []
+
+    def get_collection(self, model: Any) -> "AggregatingEngine":
+        return self
+
+    def aggregate(
+        self, pipeline: list[dict[str, Any]], **options: Any
+    ) -> "AggregatingEngine":
+        self.pipelines.append(pipeline)
+        self.options = options
+        return self
+
+    async def to_list(self, length: int) -> list[dict[str, Any]]:
+        limit = self.pipelines[-1][2]["$facet"]["docs"][2]["$limit"]
+        docs = self.docs[:limit]
+        return [{"docs": docs, "total": [{"count": len(self.docs)}]}]
+
+
+def test_fetch_page_facet() -> None:
+    engine = AggregatingEngine([{"_id": ObjectId()} for _ in range(3)])
+
+    async def run(skip: int, limit: int) -> Any:
+        return await fetch_page(
+            engine,  # type: ignore[arg-type]
+            Item,
+            {},
+            skip=skip,
+            limit=limit,
+            after=None,
+            count="exact",
+            strategy="facet",
+        )
+
+    page = asyncio.run(run(0, 2))
+    assert page.docs == engine.docs[:2]
+    assert page.count == 3
+    assert page.next_cursor == encode_cursor(engine.docs[1]["_id"])
+    assert engine.pipelines[-1][2]["$facet"]["docs"][2] == {"$limit": 3}
+    assert engine.options == {"allowDiskUse": True}
+
+    engine.pipelines.clear()
+    for skip, limit in ((0, 0), (0, -1), (-1, 2)):
+        with pytest.raises(ValueError):
+            asyncio.run(run(skip, limit))
+    assert engine.pipelines == []
+
+
+def test_fetch_page_facet_sorts_before_facet() -> None:
+    engine = AggregatingEngine([{"_id": ObjectId()}])
+    owner_id, after = ObjectId(), ObjectId()
+    asyncio.run(
+        fetch_page(
+            engine,  # type: ignore[arg-type]
+            Item,
+            {"owner_id": owner_id},
+            skip=1,
+            limit=10,
+            after=encode_cursor(after),
+            count="exact",
+            projection={"title": 1},
+            strategy="facet",
+        )
+    )
+    # The owner filter and the sort can use the owner_id, _id index; the
+    # cursor only narrows the page, the total counts every match
+    assert engine.pipelines[-1] == [
+        {"$match": {"owner_id": owner_id}},
+        {"$sort": {"_id": 1}},
+        {
+            "$facet": {
+                "docs": [
+                    {"$match": {"_id": {"$gt": after}}},
+                    {"$skip": 1},
+                    {"$limit": 11},
+                    {"$project": {"title": 1}},
+                ],
+                "total": [{"$count": "count"}],
+            }
+        },
+    ]
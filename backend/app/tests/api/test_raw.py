@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+from odmantic import ObjectId
+
+from app.api.raw import projection, public_doc, select_fields
+from app.api.responses import FastJSONResponse
+from app.models import Item, ItemPublic, ItemPublicFields
+
+
+def test_public_doc_matches_public_model() -> None:
+    item = Item(title="t", owner_id=ObjectId())
+    fields = ("title", "description", "owner_id")
+    doc = item.model_dump_doc()
+    assert projection(fields) == {"title": 1, "description": 1, "owner_id": 1}
+    expected = ItemPublic(**item.dict()).model_dump_json()
+    assert FastJSONResponse(public_doc(doc, fields)).body.decode() == expected
+
+
+def test_select_fields() -> None:
+    allowed = ("title", "description", "owner_id")
+    assert select_fields(None, allowed) == allowed
+    assert select_fields("owner_id, title,", allowed) == ("title", "owner_id")
+    assert select_fields("id", allowed) == ()
+    assert projection(()) == {"_id": 1}
+
+
+def test_select_fields_rejects_unknown() -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        select_fields("title,hashed_password", ("title",))
+    assert exc_info.value.status_code == 400
+    assert "hashed_password" in exc_info.value.detail
+
+
+def test_sparse_doc_matches_response_model() -> None:
+    item = Item(title="t", description="d", owner_id=ObjectId())
+    body = FastJSONResponse(public_doc(item.model_dump_doc(), ("title",))).body
+    assert ItemPublicFields.model_validate_json(body).title == "t"
+    with pytest.raises(ValueError):
+        ItemPublic.model_validate_json(body)
@@ -0,0 +1,23 @@
+import json
+from datetime import datetime
+
+from odmantic import ObjectId
+
+from app.api.responses import FastJSONResponse, model_response
+from app.models import ItemBatchResult, ItemsBatchResults, UserPublic
+
+
+def test_fast_json_response_native_types() -> None:
+    id = ObjectId()
+    body = FastJSONResponse({"id": id, "at": datetime(2024, 1, 2, 3, 4, 5)}).body
+    assert json.loads(body) == {"id": str(id), "at": "2024-01-02T03:04:05"}
+
+
+def test_model_response_matches_pydantic_json() -> None:
+    results = ItemsBatchResults(
+        results=[ItemBatchResult(index=0, id="x", ok=True)], succeeded=1, failed=0
+    )
+    user = UserPublic(email="a@example.com", public_id=ObjectId())
+    for model in (results, user):
+        response = model_response(model)
+        assert json.loads(response.body) == json.loads(model.model_dump_json())
@@ -0,0 +1,86 @@
+import asyncio
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from odmantic import ObjectId
+
+from app.api import streaming
+from app.api.streaming import ExportFormat, _chunks
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict[str, Any]]) -> None:
+        self.docs = docs
+
+    async def _iterate(self) -> AsyncIterator[dict[str, Any]]:
+        for doc in self.docs:
+            yield doc
+
+    def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        return self._iterate()
+
+
+FIELDS = ["title", "description", "owner_id"]
+
+
+def _docs(n: int) -> list[dict[str, Any]]:
+    owner_id = ObjectId()
+    return [
+        {"_id": ObjectId(), "title": f"item {i}", "description": None, "owner_id": owner_id}
+        for i in range(n)
+    ]
+
+
+def _export(docs: list[dict[str, Any]], format: ExportFormat) -> list[str]:
+    async def run() -> list[str]:
+        return [chunk async for chunk in _chunks(FakeCursor(docs), FIELDS, format)]  # type: ignore[arg-type]
+
+    return asyncio.run(run())
+
+
+def test_ndjson_lines() -> None:
+    docs = _docs(2)
+    (chunk,) = _export(docs, "ndjson")
+    doc = docs[0]
+    assert chunk.split("\n")[0] == (
+        f'{{"id":"{doc["_id"]}","title":"item 0","description":null,'
+        f'"owner_id":"{doc["owner_id"]}"}}'
+    )
+    assert chunk.endswith("\n")
+    assert [json.loads(line)["title"] for line in chunk.splitlines()] == [
+        "item 0",
+        "item 1",
+    ]
+    assert _export([], "ndjson") == []
+
+
+def test_csv_rows() -> None:
+    docs = _docs(2)
+    (chunk,) = _export(docs, "csv")
+    rows = list(csv.reader(io.StringIO(chunk)))
+    assert rows[0] == ["id", *FIELDS]
+    # None is an empty cell, ObjectIds their hex string
+    assert rows[1] == [str(docs[0]["_id"]), "item 0", "", str(docs[0]["owner_id"])]
+    assert len(rows) == 3
+    # The header is sent even without documents
+    assert _export([], "csv") == ["id,title,description,owner_id\r\n"]
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_chunks_of_export_chunk_bytes(
+    format: ExportFormat, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(streaming, "EXPORT_CHUNK_BYTES", 300)
+    docs = _docs(20)
+    chunks = _export(docs, format)
+    assert len(chunks) > 1
+    # Every chunk but the last reached the size, and ends on a whole record
+    for chunk in chunks[:-1]:
+        assert len(chunk) >= 300
+        assert chunk.endswith("\n")
+    monkeypatch.setattr(streaming, "EXPORT_CHUNK_BYTES", 1 << 20)
+    assert "".join(chunks) == "".join(_export(docs, format))
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+def test_cache_hit_and_miss_counters() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_cache_expires_entries() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=10, ttl=60)
+    with patch("app.core.cache.time.monotonic", return_value=1000.0):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=5)
+    with patch("app.core.cache.time.monotonic", return_value=1010.0):
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+    with patch("app.core.cache.time.monotonic", return_value=1061.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_invalidate() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
+
+
+def test_cache_disabled_with_zero_ttl() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_cache_refuses_values_read_before_an_invalidation() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=10, ttl=60)
+    generation = cache.generation()
+    # Written and invalidated while the old value was being read
+    cache.invalidate("a")
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is None
+    # Other keys, and reads started after the invalidation, are cached
+    cache.set("b", 2, generation=generation)
+    assert cache.get("b") == 2
+    cache.set("a", 3, generation=cache.generation())
+    assert cache.get("a") == 3
+
+
+def test_cache_generation_survives_dropped_invalidations() -> None:
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=2, ttl=60)
+    generation = cache.generation()
+    for key in "abc":
+        cache.invalidate(key)
+    # The invalidation of "a" is no longer tracked, so any older read is refused
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is None
+    cache.clear()
+    cache.set("b", 2, generation=generation)
+    assert cache.get("b") is None
@@ -0,0 +1,128 @@
+import asyncio
+from typing import Any
+
+import pytest
+from pymongo import IndexModel
+
+from app.core import indexes
+from app.core.indexes import IndexReport, sync_indexes
+from app.models import Item
+
+# only_items replaces it for the sync_indexes tests
+unused_indexes = indexes._unused_indexes
+
+
+class FakeCollection:
+    def __init__(self, existing: dict[str, Any]) -> None:
+        self.existing = {"_id_": {"key": [("_id", 1)]}, **existing}
+        self.created: list[str] = []
+        self.dropped: list[str] = []
+
+    async def index_information(self) -> dict[str, Any]:
+        return self.existing
+
+    async def create_indexes(self, models: list[IndexModel]) -> None:
+        self.created += [model.document["name"] for model in models]
+
+    async def drop_index(self, name: str) -> None:
+        self.dropped.append(name)
+
+
+class FakeEngine:
+    def __init__(self, existing: dict[str, Any]) -> None:
+        self.collections: dict[Any, FakeCollection] = {}
+        self.existing = existing
+
+    def get_collection(self, model: Any) -> FakeCollection:
+        existing = self.existing if model is Item else {}
+        return self.collections.setdefault(model, FakeCollection(existing))
+
+
+@pytest.fixture(autouse=True)
+def only_items(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(indexes, "MODELS", [Item])
+
+    async def no_stats(engine: Any, model: Any) -> None:
+        return None
+
+    monkeypatch.setattr(indexes, "_unused_indexes", no_stats)
+
+
+def _sync(engine: FakeEngine, **kwargs: Any) -> IndexReport:
+    [report] = asyncio.run(sync_indexes(engine, **kwargs))  # type: ignore[arg-type]
+    return report
+
+
+def test_missing_index_is_created() -> None:
+    engine = FakeEngine({})
+    report = _sync(engine)
+    assert report.created == ["owner_id_id"]
+    assert engine.collections[Item].created == ["owner_id_id"]
+
+
+def test_index_on_the_same_keys_under_another_name_is_kept() -> None:
+    engine = FakeEngine({"legacy": {"key": [("owner_id", 1.0), ("_id", 1.0)]}})
+    report = _sync(engine, drop_undeclared=True)
+    assert report.renamed == {"owner_id_id": "legacy"}
+    assert report.created == report.dropped == []
+    assert engine.collections[Item].created == []
+
+
+def test_index_name_taken_by_other_keys_is_reported() -> None:
+    engine = FakeEngine({"owner_id_id": {"key": [("owner_id", 1)]}})
+    report = _sync(engine)
+    assert report.conflicting == ["owner_id_id"]
+    assert report.undeclared == ["owner_id_id"]
+    assert engine.collections[Item].created == []
+
+
+def test_dry_run_writes_nothing() -> None:
+    engine = FakeEngine({"title_1": {"key": [("title", 1)]}})
+    report = _sync(engine, dry_run=True, drop_undeclared=True)
+    assert report.missing == ["owner_id_id"]
+    assert report.undeclared == ["title_1"]
+    assert report.created == report.dropped == []
+    collection = engine.collections[Item]
+    assert collection.created == collection.dropped == []
+
+    report = _sync(engine, drop_undeclared=True)
+    assert report.created == ["owner_id_id"]
+    assert report.dropped == ["title_1"]
+
+
+def test_declared_indexes_add_the_query_indexes() -> None:
+    names = [index.document["name"] for index in indexes.declared_indexes(Item)]
+    assert names[-1] == "owner_id_id"
+    assert len(names) == len(Item.__indexes__()) + 1
+
+
+def test_unused_indexes_leave_out_id_and_used_ones() -> None:
+    stats = [
+        {"name": "_id_", "accesses": {"ops": 0}},
+        {"name": "owner_id_id", "accesses": {"ops": 12}},
+        {"name": "title_1", "accesses": {"ops": 0}},
+    ]
+
+    class StatsCursor:
+        async def to_list(self, length: None) -> list[dict[str, Any]]:
+            return stats
+
+    class StatsCollection:
+        def aggregate(self, pipeline: list[dict[str, Any]]) -> StatsCursor:
+            assert pipeline == [{"$indexStats": {}}]
+            return StatsCursor()
+
+    class StatsEngine:
+        def get_collection(self, model: Any) -> StatsCollection:
+            return StatsCollection()
+
+    unused = asyncio.run(unused_indexes(StatsEngine(), Item))  # type: ignore[arg-type]
+    assert unused == ["title_1"]
+
+
+def test_startup_sync_errors_are_logged_not_raised() -> None:
+    class FailingEngine:
+        def get_collection(self, model: Any) -> Any:
+            raise RuntimeError("server unavailable")
+
+    asyncio.run(indexes.sync_indexes_on_startup(FailingEngine()))  # type: ignore[arg-type]
@@ -0,0 +1,152 @@
+import asyncio
+from typing import Any
+
+from odmantic import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.core.cache import auth_user_cache, user_cache
+from app.core.invalidation import (
+    RESUME_TOKENS_COLLECTION,
+    ChangeEvent,
+    InvalidationBus,
+    invalidation_bus,
+)
+from app.core.revocation import token_versions
+from app.models import AuthUser
+
+
+def _change(operation: str, id: Any, **extra: Any) -> dict[str, Any]:
+    return {
+        "operationType": operation,
+        "ns": {"db": "app", "coll": "user"},
+        "documentKey": {"_id": id},
+        **extra,
+    }
+
+
+class FakeStream:
+    def __init__(self, changes: list[dict[str, Any]], error: Exception) -> None:
+        self.changes = changes
+        self.error = error
+        self.resume_token: Any = None
+
+    async def __aenter__(self) -> "FakeStream":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.changes) or self.error is not None
+
+    async def try_next(self) -> dict[str, Any] | None:
+        if not self.changes:
+            error, self.error = self.error, None
+            assert error is not None
+            raise error
+        change = self.changes.pop(0)
+        self.resume_token = {"_data": change["documentKey"]["_id"]}
+        return change
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.docs: dict[str, Any] = {}
+
+    async def find_one(self, query: dict[str, Any]) -> Any:
+        return self.docs.get(query["_id"])
+
+    async def update_one(
+        self, query: dict[str, Any], update: dict[str, Any], upsert: bool
+    ) -> None:
+        self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+
+
+class FakeDatabase:
+    def __init__(self, streams: list[FakeStream]) -> None:
+        self.streams = streams
+        self.resume_after: list[Any] = []
+        self.tokens = FakeCollection()
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        assert name == RESUME_TOKENS_COLLECTION
+        return self.tokens
+
+    def watch(self, pipeline: Any, resume_after: Any) -> FakeStream:
+        self.resume_after.append(resume_after)
+        return self.streams.pop(0)
+
+
+class FakeEngine:
+    def __init__(self, database: FakeDatabase) -> None:
+        self.database = database
+
+
+def test_user_change_invalidates_caches() -> None:
+    user_id = ObjectId()
+    user_cache.set(user_id, {"_id": user_id})
+    auth_user_cache.set(
+        user_id, AuthUser(id=user_id, is_active=True, is_superuser=False)
+    )
+    token_versions._versions[user_id] = 1
+
+    invalidation_bus.publish(
+        ChangeEvent.from_change(
+            _change(
+                "update",
+                user_id,
+                updateDescription={"updatedFields": {"token_version": 2}},
+            )
+        )
+    )
+    assert user_cache.get(user_id) is None
+    assert auth_user_cache.get(user_id) is None
+    assert token_versions._versions[user_id] == 2
+
+    invalidation_bus.publish(ChangeEvent.from_change(_change("delete", user_id)))
+    assert user_id not in token_versions._versions
+
+
+def test_run_resumes_and_saves_token() -> None:
+    events: list[ChangeEvent] = []
+    resets: list[bool] = []
+    bus = InvalidationBus("test")
+    bus.subscribe("user", events.append, on_reset=lambda: resets.append(True))
+    database = FakeDatabase(
+        [
+            # Connection drop, then history lost: resume, then restart from now
+            FakeStream(
+                [_change("insert", 1, fullDocument={"_id": 1})],
+                OperationFailure("network", code=6),
+            ),
+            FakeStream([], OperationFailure("history lost", code=286)),
+            FakeStream(
+                [_change("delete", 2)], OperationFailure("unsupported", code=40573)
+            ),
+        ]
+    )
+    engine: Any = FakeEngine(database)
+    asyncio.run(bus.run(engine, retry_seconds=0, save_seconds=0))
+
+    assert [(event.operation, event.id) for event in events] == [
+        ("insert", 1),
+        ("delete", 2),
+    ]
+    assert events[0].fields == {"_id": 1}
+    assert database.resume_after == [None, {"_data": 1}, None]
+    assert resets == [True]
+    assert database.tokens.docs["test"]["token"] == {"_data": 2}
+
+
+def test_pre_images_are_opt_in() -> None:
+    bus = InvalidationBus("test")
+    bus.subscribe("user", lambda event: None)
+    assert bus._watch_options() == {}
+    bus.subscribe("item", lambda event: None, documents=True)
+    assert bus._watch_options() == {"full_document": "updateLookup"}
+    bus.subscribe("item", lambda event: None, documents=True, pre_images=True)
+    assert bus._watch_options() == {
+        "full_document": "updateLookup",
+        "full_document_before_change": "whenAvailable",
+    }
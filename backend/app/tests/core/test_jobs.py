@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from odmantic import ObjectId
+
+from app.core.config import settings
+from app.core.jobs import JobQueue
+from app.models import Job
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int) -> None:
+        self.matched_count = matched_count
+
+
+class FakeCollection:
+    def __init__(self, lease_id: ObjectId | None) -> None:
+        self.lease_id = lease_id
+        self.updates: list[dict[str, Any]] = []
+
+    async def update_one(
+        self, query: dict[str, Any], update: dict[str, Any]
+    ) -> UpdateResult:
+        if query["lease_id"] != self.lease_id:
+            return UpdateResult(0)
+        self.updates.append(update)
+        return UpdateResult(1)
+
+
+class FakeEngine:
+    def __init__(self, collection: FakeCollection) -> None:
+        self.collection = collection
+
+    def get_collection(self, model: Any) -> FakeCollection:
+        return self.collection
+
+
+def _job(attempts: int) -> Job:
+    now = datetime.now(timezone.utc)
+    return Job(
+        kind="test",
+        payload={"n": 1},
+        attempts=attempts,
+        run_at=now,
+        lease_id=ObjectId(),
+        created_at=now,
+    )
+
+
+def _run(queue: JobQueue, job: Job, lease_id: ObjectId | None = None) -> FakeCollection:
+    collection = FakeCollection(job.lease_id if lease_id is None else lease_id)
+    asyncio.run(queue.run_job(FakeEngine(collection), job))  # type: ignore[arg-type]
+    return collection
+
+
+def test_done_job_drops_payload() -> None:
+    queue = JobQueue()
+    payloads = []
+
+    @queue.handler("test")
+    async def handler(engine: Any, job: Job) -> None:
+        payloads.append(job.payload)
+
+    collection = _run(queue, _job(attempts=1))
+    assert payloads == [{"n": 1}]
+    [update] = collection.updates
+    assert update["$set"]["status"] == "done"
+    assert update["$set"]["payload"] == {}
+
+
+def test_failed_job_is_retried_then_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "JOBS_MAX_ATTEMPTS", 2)
+    queue = JobQueue()
+
+    @queue.handler("test")
+    async def handler(engine: Any, job: Job) -> None:
+        raise RuntimeError("boom")
+
+    [retry] = _run(queue, _job(attempts=1)).updates
+    assert "status" not in retry["$set"]
+    assert retry["$set"]["lease_id"] is None
+    assert retry["$set"]["error"] == "boom"
+    # Kept for the next attempt
+    assert "payload" not in retry["$set"]
+
+    [failed] = _run(queue, _job(attempts=2)).updates
+    assert failed["$set"]["status"] == "failed"
+    assert failed["$set"]["payload"] == {}
+
+
+def test_expired_lease_is_not_overwritten() -> None:
+    queue = JobQueue()
+
+    @queue.handler("test")
+    async def handler(engine: Any, job: Job) -> None:
+        pass
+
+    # Another worker claimed the job again in the meantime
+    assert _run(queue, _job(attempts=1), lease_id=ObjectId()).updates == []
+
+
+def test_checkpoint_saves_progress_until_lease_is_lost() -> None:
+    queue = JobQueue()
+    progress = []
+
+    @queue.handler("test")
+    async def handler(engine: FakeEngine, job: Job) -> None:
+        await queue.checkpoint(engine, job, {"done": 1})  # type: ignore[arg-type]
+        progress.append(dict(job.payload))
+        engine.collection.lease_id = ObjectId()
+        await queue.checkpoint(engine, job, {"done": 2})  # type: ignore[arg-type]
+        progress.append(dict(job.payload))
+
+    collection = _run(queue, _job(attempts=1))
+    assert progress == [{"n": 1, "done": 1}]
+    assert collection.updates == [{"$set": {"payload.done": 1}}]
+
+
+def test_cancelled_job_is_released() -> None:
+    queue = JobQueue()
+
+    @queue.handler("test")
+    async def handler(engine: Any, job: Job) -> None:
+        await asyncio.sleep(10)
+
+    job = _job(attempts=1)
+    collection = FakeCollection(job.lease_id)
+
+    async def run() -> None:
+        task = asyncio.create_task(
+            queue.run_job(FakeEngine(collection), job)  # type: ignore[arg-type]
+        )
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    [release] = collection.updates
+    assert release["$set"]["lease_id"] is None
+    assert release["$inc"] == {"attempts": -1}
@@ -0,0 +1,116 @@
+import asyncio
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+from app.core import mail
+from app.core.config import settings
+from app.core.mail import EmailDispatcher, EmailQueueFull
+
+
+class FakeConnection(mail.SMTPConnection):
+    # Errors to return for the next sends, in order
+    errors: list[Exception | None] = []
+    sent: list[str] = []
+
+    def send_batch(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        results = []
+        for message in messages:
+            error = self.errors.pop(0) if self.errors else None
+            if error is None:
+                self.sent.append(message["To"])
+            results.append(error)
+        return results
+
+
+def _message(to: str) -> EmailMessage:
+    message = EmailMessage()
+    message["To"] = to
+    message.set_content("hello")
+    return message
+
+
+def test_is_transient() -> None:
+    assert mail._is_transient(smtplib.SMTPServerDisconnected())
+    assert mail._is_transient(ConnectionRefusedError())
+    assert mail._is_transient(smtplib.SMTPDataError(451, b"try later"))
+    assert not mail._is_transient(smtplib.SMTPDataError(554, b"rejected"))
+    assert not mail._is_transient(
+        smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"no such user")})
+    )
+
+
+def test_dispatcher_retries_transient_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mail, "SMTPConnection", FakeConnection)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_SECONDS", 0)
+    FakeConnection.sent = []
+    FakeConnection.errors = [
+        smtplib.SMTPServerDisconnected(),
+        smtplib.SMTPDataError(554, b"rejected"),
+    ]
+
+    async def send() -> EmailDispatcher:
+        dispatcher = EmailDispatcher()
+        for to in ("a@example.com", "b@example.com", "c@example.com"):
+            dispatcher.submit(_message(to))
+        await dispatcher.shutdown(timeout=5)
+        return dispatcher
+
+    dispatcher = asyncio.run(send())
+    # a is retried after the disconnect, b is rejected for good
+    assert sorted(FakeConnection.sent) == ["a@example.com", "c@example.com"]
+    assert dispatcher.stats()["sent"] == 2
+    assert dispatcher.stats()["failed"] == 1
+
+
+def test_send_is_not_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mail, "SMTPConnection", FakeConnection)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_SECONDS", 0)
+    FakeConnection.sent = []
+    FakeConnection.errors = [smtplib.SMTPServerDisconnected()]
+
+    async def send() -> None:
+        dispatcher = EmailDispatcher()
+        # The email job awaiting it is retried by the job queue
+        with pytest.raises(smtplib.SMTPServerDisconnected):
+            await dispatcher.send(_message("a@example.com"))
+        await dispatcher.send(_message("a@example.com"))
+        await dispatcher.shutdown(timeout=5)
+
+    asyncio.run(send())
+    assert FakeConnection.sent == ["a@example.com"]
+
+
+def test_cancelled_send_is_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mail, "SMTPConnection", FakeConnection)
+    FakeConnection.sent = []
+    FakeConnection.errors = []
+
+    async def send() -> None:
+        dispatcher = EmailDispatcher()
+        task = asyncio.create_task(dispatcher.send(_message("a@example.com")))
+        await asyncio.sleep(0)  # queued, not picked by a sender yet
+        # Job workers are cancelled first on shutdown, the job runs again later
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        dispatcher.submit(_message("b@example.com"))
+        await dispatcher.shutdown(timeout=5)
+
+    asyncio.run(send())
+    assert FakeConnection.sent == ["b@example.com"]
+
+
+def test_dispatcher_queue_full(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mail, "SMTPConnection", FakeConnection)
+    monkeypatch.setattr(settings, "EMAIL_QUEUE_MAX_SIZE", 1)
+
+    async def send() -> None:
+        dispatcher = EmailDispatcher()
+        dispatcher.submit(_message("a@example.com"))
+        with pytest.raises(EmailQueueFull):
+            dispatcher.submit(_message("b@example.com"))
+        await dispatcher.shutdown(timeout=5)
+
+    asyncio.run(send())
@@ -0,0 +1,33 @@
+from pymongo import monitoring
+
+from app.core.pool import PoolStatsListener
+
+ADDRESS = ("db", 27017)
+
+
+def test_pool_stats() -> None:
+    listener = PoolStatsListener()
+    listener.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    for _ in range(2):
+        listener.connection_check_out_started(
+            monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+        )
+    listener.connection_checked_out(
+        monitoring.ConnectionCheckedOutEvent(ADDRESS, 1, 0.001)
+    )
+    listener.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(ADDRESS, "timeout", 0.5)
+    )
+
+    stats = listener.stats()["db:27017"]
+    assert stats["open"] == 1
+    assert stats["checked_out"] == 1
+    assert stats["waiters"] == 0
+    assert stats["max_waiters"] == 2
+    assert stats["checkouts"] == 1
+    assert stats["failed_checkouts"] == 1
+    assert stats["max_wait_ms"] == 500
+    assert round(stats["avg_wait_ms"], 1) == 250.5
+
+    listener.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert listener.stats()["db:27017"]["checked_out"] == 0
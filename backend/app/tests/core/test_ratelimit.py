@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+from starlette.requests import Request
+
+from app.api.routes.login import client_ip
+from app.core import ratelimit
+from app.core.config import settings
+from app.core.ratelimit import RateLimited, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class UnavailableEngine:
+    def get_collection(self, model: Any) -> Any:
+        raise ServerSelectionTimeoutError("no servers")
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock(600.0)
+    monkeypatch.setattr(ratelimit, "time", clock)
+    monkeypatch.setattr(settings, "RATE_LIMIT_WINDOW_SECONDS", 60)
+    return clock
+
+
+def _hits(limiter: RateLimiter, key: str, limit: int, n: int) -> int:
+    """Number of the ``n`` attempts that were allowed."""
+
+    async def run() -> int:
+        allowed = 0
+        for _ in range(n):
+            try:
+                await limiter.hit(None, key, limit)  # type: ignore[arg-type]
+            except RateLimited:
+                pass
+            else:
+                allowed += 1
+        return allowed
+
+    return asyncio.run(run())
+
+
+def test_limit_per_key(clock: FakeClock) -> None:
+    limiter = RateLimiter()
+    assert _hits(limiter, "a", 3, 5) == 3
+    assert _hits(limiter, "b", 3, 1) == 1
+    with pytest.raises(RateLimited) as exc_info:
+        asyncio.run(limiter.hit(None, "a", 3))  # type: ignore[arg-type]
+    assert exc_info.value.retry_after == 60
+
+
+def test_previous_window_is_weighted(clock: FakeClock) -> None:
+    limiter = RateLimiter()
+    assert _hits(limiter, "a", 4, 4) == 4
+    # Half of the previous window still overlaps: 4 * 0.5 + 2 attempts
+    clock.now += 90
+    assert _hits(limiter, "a", 4, 3) == 2
+    # The previous window no longer overlaps
+    clock.now += 90
+    assert _hits(limiter, "a", 4, 4) == 4
+
+
+def test_mongo_unavailable_counts_locally(
+    clock: FakeClock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "mongo")
+    limiter = RateLimiter()
+
+    async def run() -> None:
+        engine: Any = UnavailableEngine()
+        await limiter.hit(engine, "a", 1)
+        with pytest.raises(RateLimited):
+            await limiter.hit(engine, "a", 1)
+
+    asyncio.run(run())
+
+
+def test_disabled(clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    limiter = RateLimiter()
+
+    async def run() -> None:
+        for _ in range(5):
+            await limiter.check(None, {"a": 1})  # type: ignore[arg-type]
+
+    asyncio.run(run())
+
+
+def test_check_without_increment(clock: FakeClock) -> None:
+    limiter = RateLimiter()
+
+    async def run() -> None:
+        engine: Any = None
+        # Successful attempts are only checked, never counted
+        for _ in range(5):
+            await limiter.check(engine, {"a": 2}, increment=False)
+        await limiter.check(engine, {"a": 2})
+        await limiter.check(engine, {"a": 2})
+        with pytest.raises(RateLimited):
+            await limiter.check(engine, {"a": 2}, increment=False)
+
+    asyncio.run(run())
+
+
+def _request(peer: str, forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_client_ip_behind_trusted_proxies(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert client_ip(_request("10.0.0.2", "1.2.3.4")) == "10.0.0.2"
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.0/8"])
+    assert client_ip(_request("10.0.0.2", "1.2.3.4")) == "1.2.3.4"
+    # The client can prepend anything, the proxy appends the address it saw
+    assert client_ip(_request("10.0.0.2", "9.9.9.9, 1.2.3.4, 10.0.0.3")) == "1.2.3.4"
+    # Not from a proxy: the header is ignored
+    assert client_ip(_request("5.6.7.8", "1.2.3.4")) == "5.6.7.8"
+    assert client_ip(_request("10.0.0.2")) == "10.0.0.2"
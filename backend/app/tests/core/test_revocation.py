@@ -0,0 +1,192 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from odmantic import ObjectId
+
+from app.api.deps import get_current_auth_user
+from app.core.cache import auth_user_cache
+from app.core.config import settings
+from app.core.revocation import TokenVersionTable, token_versions
+from app.core.security import authorization_claims, create_access_token
+from app.models import User
+
+
+def _matches(doc: dict[str, Any], query: dict[str, Any]) -> bool:
+    return all(doc.get(key, True) == value for key, value in query.items())
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.docs: dict[ObjectId, dict[str, Any]] = {}
+        self.reads = 0
+
+    async def find_one(self, query: dict[str, Any], *args: Any) -> Any:
+        self.reads += 1
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc and _matches(doc, query) else None
+
+    async def _iterate(self, query: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        for doc in list(self.docs.values()):
+            if _matches(doc, query):
+                yield dict(doc)
+
+    def find(self, query: dict[str, Any], *args: Any) -> AsyncIterator[Any]:
+        self.reads += 1
+        return self._iterate(query)
+
+
+class FakeEngine:
+    def __init__(self) -> None:
+        self.collection = FakeCollection()
+
+    def get_collection(self, model: Any) -> FakeCollection:
+        return self.collection
+
+    def add(self, user: User) -> None:
+        self.collection.docs[user.id] = user.model_dump_doc()
+
+    def set(self, user: User, **fields: Any) -> None:
+        self.collection.docs[user.id].update(fields)
+
+
+@pytest.fixture
+def stateless(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    token_versions._versions.clear()
+    auth_user_cache.clear()
+
+
+def _token(user: User) -> str:
+    return create_access_token(user.id, claims=authorization_claims(user))
+
+
+def _authorize(engine: FakeEngine, token: str) -> Any:
+    return asyncio.run(get_current_auth_user(engine, token))  # type: ignore[arg-type]
+
+
+def _rejected(engine: FakeEngine, token: str) -> int:
+    with pytest.raises(HTTPException) as exc_info:
+        _authorize(engine, token)
+    return exc_info.value.status_code
+
+
+def _user(**fields: Any) -> User:
+    return User(email="user@example.com", hashed_password="x", **fields)
+
+
+def test_token_authorized_from_claims(stateless: None) -> None:
+    engine = FakeEngine()
+    user = _user(is_superuser=True)
+    engine.add(user)
+    token = _token(user)
+    auth_user = _authorize(engine, token)
+    assert auth_user.id == user.id and auth_user.is_superuser
+    # Later requests only use the version table
+    reads = engine.collection.reads
+    _authorize(engine, token)
+    assert engine.collection.reads == reads
+
+
+def test_bumped_token_version_rejects_older_tokens(stateless: None) -> None:
+    engine = FakeEngine()
+    user = _user()
+    engine.add(user)
+    token = _token(user)
+    _authorize(engine, token)
+    # Password change made by this worker
+    user.token_version += 1
+    engine.set(user, token_version=user.token_version)
+    token_versions.update(user)
+    assert _rejected(engine, token) == 403
+    assert _authorize(engine, _token(user)).id == user.id
+
+
+def test_stale_token_version_is_rejected(stateless: None) -> None:
+    engine = FakeEngine()
+    user = _user(token_version=3)
+    engine.add(user)
+    stale = create_access_token(
+        user.id, claims={**authorization_claims(user), "ver": 2}
+    )
+    # Unknown user: the version is looked up in the database
+    assert _rejected(engine, stale) == 403
+    # Known user: the version comes from the table
+    assert _rejected(engine, stale) == 403
+
+
+def test_deactivated_user_is_rejected(stateless: None) -> None:
+    engine = FakeEngine()
+    user = _user()
+    engine.add(user)
+    token = _token(user)
+    _authorize(engine, token)
+    user.is_active = False
+    engine.set(user, is_active=False)
+    token_versions.update(user)
+    assert _rejected(engine, token) == 403
+    # A token that carries act=false is refused even if the table allows it
+    inactive = create_access_token(
+        user.id, claims={**authorization_claims(user), "act": False}
+    )
+    engine.set(user, is_active=True)
+    assert _rejected(engine, inactive) == 400
+
+
+def test_deactivated_user_is_rejected_without_claims(stateless: None) -> None:
+    engine = FakeEngine()
+    user = _user(is_active=False)
+    engine.add(user)
+    assert _rejected(engine, create_access_token(user.id)) == 400
+
+
+def test_refresh_picks_up_changes() -> None:
+    engine = FakeEngine()
+    table = TokenVersionTable()
+    changed, deactivated, deleted = _user(), _user(), _user()
+    for user in (changed, deactivated, deleted):
+        engine.add(user)
+    asyncio.run(table.refresh(engine))  # type: ignore[arg-type]
+    assert len(table) == 3
+
+    # Changes made by another worker
+    engine.set(changed, token_version=1)
+    engine.set(deactivated, is_active=False)
+    del engine.collection.docs[deleted.id]
+    asyncio.run(table.refresh(engine))  # type: ignore[arg-type]
+    assert table._versions == {changed.id: 1}
+
+    async def versions() -> list[int | None]:
+        return [
+            await table.current_version(engine, user.id, 0)  # type: ignore[arg-type]
+            for user in (changed, deactivated, deleted)
+        ]
+
+    assert asyncio.run(versions()) == [1, None, None]
+
+
+def test_changes_during_refresh_are_kept() -> None:
+    engine = FakeEngine()
+    table = TokenVersionTable()
+    bumped, deactivated, other = _user(), _user(), _user()
+    for user in (bumped, deactivated, other):
+        engine.add(user)
+    scan = engine.collection._iterate
+
+    async def interleaved(query: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        async for doc in scan(query):
+            yield doc
+            if doc["_id"] == bumped.id:
+                # Password change and deactivation made by this worker, after
+                # the scan read the old documents
+                bumped.token_version += 1
+                table.update(bumped)
+                deactivated.is_active = False
+                table.update(deactivated)
+
+    engine.collection._iterate = interleaved  # type: ignore[method-assign]
+    asyncio.run(table.refresh(engine))  # type: ignore[arg-type]
+    assert table._versions == {bumped.id: 1, other.id: 0}
+    assert table._changed_during_refresh is None
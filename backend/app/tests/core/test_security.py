@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+
+from app.core.cache import token_cache
+from app.core.security import (
+    PasswordHasher,
+    PasswordHashingUnavailable,
+    create_access_token,
+    decode_access_token,
+    verify_password,
+)
+
+
+def test_decode_access_token_is_cached() -> None:
+    token = create_access_token("some-user-id")
+    hits = token_cache.hits
+    assert decode_access_token(token).sub == "some-user-id"
+    assert decode_access_token(token).sub == "some-user-id"
+    assert token_cache.hits == hits + 1
+
+
+def test_decode_access_token_rejects_expired_cached_token() -> None:
+    token = create_access_token("some-user-id", expires_delta=timedelta(seconds=1))
+    assert decode_access_token(token).sub == "some-user-id"
+    time.sleep(2)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_access_token(token)
+
+
+def test_password_hasher_hash_and_verify() -> None:
+    hasher = PasswordHasher(executor="thread", max_workers=2, max_pending=4)
+
+    async def run() -> tuple[str, bool, bool]:
+        hashed = await hasher.hash("secret")
+        return (
+            hashed,
+            await hasher.verify("secret", hashed),
+            await hasher.verify("wrong", hashed),
+        )
+
+    try:
+        hashed, valid, invalid = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert verify_password("secret", hashed)
+    assert valid is True
+    assert invalid is False
+
+
+def test_password_hasher_rejects_when_saturated() -> None:
+    hasher = PasswordHasher(executor="thread", max_workers=1, max_pending=2)
+
+    async def run() -> list[object]:
+        return await asyncio.gather(
+            *(hasher.hash("secret") for _ in range(4)), return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, str) for r in results) == 2
+    assert sum(isinstance(r, PasswordHashingUnavailable) for r in results) == 2
+    assert hasher.pending == 0
+
+
+def test_password_hasher_propagates_errors() -> None:
+    hasher = PasswordHasher(executor="thread", max_workers=1, max_pending=1)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(hasher.verify("secret", "not-a-bcrypt-hash"))
+    finally:
+        hasher.shutdown()
+    assert hasher.pending == 0
+
+
+def test_password_hasher_slot_held_until_job_ends() -> None:
+    hasher = PasswordHasher(executor="thread", max_workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash() -> str:
+        started.set()
+        release.wait(5)
+        return "hashed"
+
+    async def run() -> None:
+        task = asyncio.create_task(hasher._run(slow_hash))
+        await asyncio.to_thread(started.wait, 5)
+        # The client went away, but the hash keeps running in the pool
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert hasher.pending == 1
+        with pytest.raises(PasswordHashingUnavailable):
+            await hasher.hash("secret")
+        release.set()
+        while hasher.pending:
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert hasher.pending == 0
@@ -0,0 +1,73 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+
+from app import import_items
+from app.import_items import csv_rows, ndjson_rows
+
+
+async def _chunks(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _collect(rows: AsyncIterator[Any]) -> list[Any]:
+    async def run() -> list[Any]:
+        return [row async for row in rows]
+
+    return asyncio.run(run())
+
+
+def test_ndjson_rows_across_chunks() -> None:
+    data = '{"title": "héllo"}\n\n{"title": "b"}\nnope\n[1]'.encode()
+    rows = _collect(ndjson_rows(_chunks(data, 3)))
+    assert rows[0] == {"title": "héllo"}
+    assert rows[1] == {"title": "b"}
+    assert rows[2].startswith("Invalid JSON")
+    assert rows[3] == "Expected a JSON object"
+    assert len(rows) == 4
+
+
+def test_csv_rows_with_quoted_newlines() -> None:
+    data = b'title,description\r\nx,"multi\nline ""quoted"""\r\ny,\r\nshort\r\n'
+    rows = _collect(csv_rows(_chunks(data, 4)))
+    assert rows == [
+        {"title": "x", "description": 'multi\nline "quoted"'},
+        {"title": "y"},
+        "Expected 2 columns, got 1",
+    ]
+
+
+def test_csv_rows_unterminated_quote() -> None:
+    data = b'title\n"never closed\n'
+    assert _collect(csv_rows(_chunks(data, 64))) == ["Unterminated quoted field"]
+
+
+def test_csv_rows_with_quote_inside_unquoted_field() -> None:
+    data = b'title,description\n5" screen,x\nnext,y\nthird,z\n'
+    for size in (3, 64):
+        assert _collect(csv_rows(_chunks(data, size))) == [
+            {"title": '5" screen', "description": "x"},
+            {"title": "next", "description": "y"},
+            {"title": "third", "description": "z"},
+        ]
+
+
+def test_lines_are_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(import_items, "MAX_LINE_CHARS", 20)
+    data = b'{"title": "way too long"}\n{"title": "a"}\n' + b"x" * 100
+    rows = _collect(ndjson_rows(_chunks(data, 4)))
+    assert rows == [import_items.LINE_TOO_LONG, {"title": "a"}, import_items.LINE_TOO_LONG]
+
+    data = b"title\n" + b"y" * 100 + b"\nb\n"
+    rows = _collect(csv_rows(_chunks(data, 4)))
+    assert rows == [import_items.LINE_TOO_LONG, {"title": "b"}]
+
+
+def test_csv_runaway_quoted_field_stops(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(import_items, "MAX_LINE_CHARS", 20)
+    data = b'title\n"opened\n' + b"line\n" * 10
+    rows = _collect(csv_rows(_chunks(data, 4)))
+    assert rows == ["Record longer than 20 characters"]
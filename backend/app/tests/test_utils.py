@@ -0,0 +1,51 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from jinja2 import Template
+
+from app import utils
+from app.core.config import settings
+
+TEMPLATES_DIR = Path(utils.__file__).parent / "email-templates" / "build"
+
+CONTEXT = {
+    "project_name": "Test project",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "password": "p<a>ss&word",
+    "valid_hours": 48,
+    "link": "http://localhost/reset-password?token=abc&x=1",
+}
+
+TEMPLATE_NAMES = sorted(path.name for path in TEMPLATES_DIR.glob("*.html"))
+
+
+@pytest.fixture
+def fresh_templates(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(settings, "EMAIL_TEMPLATES_BYTECODE_CACHE_DIR", str(tmp_path))
+    utils.email_templates.cache_clear()
+    yield
+    utils.email_templates.cache_clear()
+
+
+@pytest.mark.usefixtures("fresh_templates")
+@pytest.mark.parametrize("template_name", TEMPLATE_NAMES)
+def test_render_email_template_matches_a_per_call_template(
+    template_name: str, tmp_path: Path
+) -> None:
+    expected = Template((TEMPLATES_DIR / template_name).read_text()).render(CONTEXT)
+
+    utils.precompile_email_templates()
+    assert (
+        utils.render_email_template(template_name=template_name, context=CONTEXT)
+        == expected
+    )
+
+    # A new environment renders from the bytecode cache written above
+    assert any(tmp_path.iterdir())
+    utils.email_templates.cache_clear()
+    assert (
+        utils.render_email_template(template_name=template_name, context=CONTEXT)
+        == expected
+    )
@@ -1,12 +1,10 @@
-# This module connects to an SQL database.
-# Changes are required to switch from SQLModel to ODMantic (MongoDB).
-
+import asyncio
 import logging
+
 from odmantic import AIOEngine
-from motor.motor_asyncio import AsyncIOMotorClient
 from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixed
 
-from app.core.config import settings
+from app.core.db import db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,9 +12,6 @@ logger = logging.getLogger(__name__)
 max_tries = 60 * 5  # 5 minutes
 wait_seconds = 1
 
-client = AsyncIOMotorClient(settings.MONGODB_URI)
-engine = AIOEngine(motor_client=client, database=settings.MONGODB_DB)
-
 
 @retry(
     stop=stop_after_attempt(max_tries),
@@ -27,7 +22,7 @@ engine = AIOEngine(motor_client=client, database=settings.MONGODB_DB)
 async def init(db_engine: AIOEngine) -> None:
     try:
         # Try to perform a simple operation to check if DB is awake
-        await db_engine.find_one(User)  # Assuming `User` is one of your models
+        await db_engine.client.admin.command("ping")
     except Exception as e:
         logger.error(e)
         raise e
@@ -35,10 +30,12 @@ async def init(db_engine: AIOEngine) -> None:
 
 async def main() -> None:
     logger.info("Initializing service")
-    await init(engine)
+    try:
+        await init(db.connect())
+    finally:
+        db.close()
     logger.info("Service finished initializing")
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -1,18 +1,25 @@
 # This module does not establish any SQL database connection.
 # No changes required for the switch to ODMantic (MongoDB).
 
-import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import cache
+from email.message import EmailMessage
+from email.utils import formataddr
 from pathlib import Path
 from typing import Any
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
+from odmantic import AIOEngine
 
 from app.core.config import settings
+from app.core.jobs import job_queue
+from app.core.mail import email_dispatcher
+from app.models import Job
+
+SEND_EMAIL_JOB = "send_email"
 
 
 @dataclass
@@ -21,37 +28,69 @@ class EmailData:
     subject: str
 
 
+@cache
+def email_templates() -> Environment:
+    # Created on first use rather than on import, the bytecode cache creates
+    # its directory
+    return Environment(
+        loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+        bytecode_cache=FileSystemBytecodeCache(
+            settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR
+        ),
+        auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD,
+    )
+
+
+def precompile_email_templates() -> None:
+    """
+    Compile every email template into the environment's cache, so the first
+    emails sent do not pay for reading and compiling them.
+    """
+    environment = email_templates()
+    for template_name in environment.list_templates(extensions=["html"]):
+        environment.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = email_templates().get_template(template_name).render(context)
     return html_content
 
 
-def send_email(
+def build_email(*, email_to: str, subject: str, html_content: str) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = formataddr(
+        (settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL)
+    )
+    message["To"] = email_to
+    message.set_content(html_content, subtype="html")
+    return message
+
+
+async def send_email(
+    engine: AIOEngine,
     *,
     email_to: str,
     subject: str = "",
     html_content: str = "",
 ) -> None:
+    """
+    Queue an email as a background job.
+
+    A job worker sends it through the email dispatcher, and the job is retried
+    until the email is sent or JOBS_MAX_ATTEMPTS is reached.
+    """
     assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    await job_queue.enqueue(
+        engine,
+        SEND_EMAIL_JOB,
+        {"email_to": email_to, "subject": subject, "html_content": html_content},
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
-    logging.info(f"send email result: {response}")
+
+
+@job_queue.handler(SEND_EMAIL_JOB)
+async def send_email_job(engine: AIOEngine, job: Job) -> None:
+    await email_dispatcher.send(build_email(**job.payload))
 
 
 def generate_test_email(email_to: str) -> EmailData:
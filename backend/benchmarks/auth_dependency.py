@@ -0,0 +1,101 @@
+"""
+Micro-benchmark of the auth dependency chain (`get_current_user` for the
+`UserProfile`, `get_current_auth_user` and `get_current_active_superuser` for
+the `AuthUser`) with and without the token and user caches.
+
+The database is replaced by an in-memory collection that answers `find_one`
+with the projected fields of a fixed user after `--db-latency` seconds, so the
+numbers isolate the JWT decode, payload validation and lean user loading costs
+plus the simulated round trip:
+
+    python -m benchmarks.auth_dependency --iterations 20000 --db-latency 0.0005
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from app.api.deps import (
+    get_current_active_superuser,
+    get_current_auth_user,
+    get_current_user,
+)
+from app.core import security
+from app.core.cache import auth_user_cache, token_cache, user_cache
+from app.models import User
+
+
+def _project(doc: dict[str, Any], projection: dict[str, int]) -> dict[str, Any]:
+    if any(projection.values()):
+        return {key: doc[key] for key in ("_id", *projection) if key in doc}
+    return {key: value for key, value in doc.items() if key not in projection}
+
+
+class InMemoryCollection:
+    def __init__(self, doc: dict[str, Any], latency: float) -> None:
+        self.doc = doc
+        self.latency = latency
+
+    async def find_one(
+        self, query: dict[str, Any], projection: dict[str, int] | None = None
+    ) -> dict[str, Any] | None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if query.get("_id") != self.doc["_id"]:
+            return None
+        # A new dict per query, like the BSON decoding of the real driver
+        return _project(self.doc, projection or {})
+
+
+class InMemoryEngine:
+    def __init__(self, user: User, latency: float) -> None:
+        self.collection = InMemoryCollection(user.model_dump_doc(), latency)
+
+    def get_collection(self, model: Any) -> InMemoryCollection:
+        return self.collection
+
+
+async def run(engine: Any, token: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        profile = await get_current_user(engine=engine, token=token)
+        auth_user = await get_current_auth_user(engine=engine, token=token)
+        assert profile.id == auth_user.id
+        await get_current_active_superuser(current_user=auth_user)
+    return time.perf_counter() - start
+
+
+def set_caches(enabled: bool, ttls: dict[str, float]) -> None:
+    for cache in (token_cache, user_cache, auth_user_cache):
+        cache.clear()
+        cache.ttl = ttls[cache.name] if enabled else 0
+
+
+async def main(args: argparse.Namespace) -> None:
+    user = User(
+        email="bench@example.com",
+        hashed_password=security.get_password_hash("bench"),
+        is_superuser=True,
+    )
+    engine = InMemoryEngine(user, args.db_latency)
+    token = security.create_access_token(user.id)
+    ttls = {
+        cache.name: cache.ttl for cache in (token_cache, user_cache, auth_user_cache)
+    }
+
+    for label, enabled in (("no cache", False), ("cache", True)):
+        set_caches(enabled, ttls)
+        await run(engine, token, min(1000, args.iterations))  # warm-up
+        elapsed = await run(engine, token, args.iterations)
+        print(
+            f"{label:<9} {elapsed / args.iterations * 1e6:8.1f} us/request "
+            f"({args.iterations / elapsed:,.0f} req/s)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--db-latency", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,124 @@
+"""
+Throughput and event loop lag of sending emails the previous way (one new
+blocking SMTP session per email, on the event loop) against queueing them to
+the `EmailDispatcher`, which sends in batches over persistent connections.
+
+A local SMTP sink is started in a thread, `--latency` adds a delay to every
+SMTP reply to stand in for a remote server:
+
+    python -m benchmarks.email_dispatch --emails 200 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import smtplib
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+
+from app.core.config import settings
+from app.core.mail import EmailDispatcher
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    latency = 0.0
+
+    def reply(self, line: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.reply("220 sink ready")
+        while line := self.rfile.readline():
+            command = line.decode().strip().split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("250-sink\r\n250 8BITMIME")
+            elif command == "DATA":
+                self.reply("354 end with .")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def build_message(i: int) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = f"Benchmark email {i}"
+    message["From"] = "bench@example.com"
+    message["To"] = f"user{i}@example.com"
+    message.set_content("<p>" + "x" * 512 + "</p>", subtype="html")
+    return message
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    interval = 0.001
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def inline(emails: int) -> None:
+    for i in range(emails):
+        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as smtp:
+            smtp.send_message(build_message(i))
+        # Let other tasks run between requests, as the routes would
+        await asyncio.sleep(0)
+
+
+async def dispatcher(emails: int) -> None:
+    email_dispatcher = EmailDispatcher()
+    for i in range(emails):
+        email_dispatcher.submit(build_message(i))
+    await email_dispatcher.shutdown(timeout=600)
+
+
+async def run(name: str, emails: int) -> None:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    lag_task = asyncio.create_task(measure_lag(stop, lags))
+    start = time.perf_counter()
+    await (inline if name == "inline" else dispatcher)(emails)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    worst = max(lags) * 1000
+    print(
+        f"{name:>10}: {emails / elapsed:8.0f} emails/s, "
+        f"worst loop lag {worst:8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    SMTPSinkHandler.latency = args.latency
+    sink = SMTPSink(("127.0.0.1", 0), SMTPSinkHandler)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    settings.SMTP_HOST = "127.0.0.1"
+    settings.SMTP_PORT = sink.server_address[1]
+    settings.SMTP_TLS = settings.SMTP_SSL = False
+    settings.SMTP_USER = None
+    try:
+        for name in ("inline", "dispatcher"):
+            asyncio.run(run(name, args.emails))
+    finally:
+        sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
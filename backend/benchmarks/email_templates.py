@@ -0,0 +1,75 @@
+"""
+Render throughput of the email templates: the previous `render_email_template`,
+which read the file and compiled a new `jinja2.Template` on every call, against
+the shared `email_templates()` environment, with and without auto reload (which
+checks the file's modification time on every render):
+
+    python -m benchmarks.email_templates --iterations 2000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Template
+
+from app import utils
+
+TEMPLATES_DIR = Path(utils.__file__).parent / "email-templates" / "build"
+
+CONTEXT = {
+    "project_name": "Benchmark",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "password": "secret",
+    "valid_hours": 48,
+    "link": "http://localhost/reset-password?token=abc",
+}
+
+
+def render_compiled_per_call(template_name: str) -> str:
+    template_str = (TEMPLATES_DIR / template_name).read_text()
+    return Template(template_str).render(CONTEXT)
+
+
+def render_environment(template_name: str) -> str:
+    return utils.render_email_template(template_name=template_name, context=CONTEXT)
+
+
+def run(
+    render: Callable[[str], Any], template_names: list[str], iterations: int
+) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        render(template_names[i % len(template_names)])
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    template_names = sorted(path.name for path in TEMPLATES_DIR.glob("*.html"))
+    start = time.perf_counter()
+    utils.precompile_email_templates()
+    print(f"precompile: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    variants: list[tuple[str, Callable[[str], Any]]] = [
+        ("compile per call", render_compiled_per_call),
+        ("environment", render_environment),
+    ]
+    for name, render in variants:
+        elapsed = run(render, template_names, args.iterations)
+        print(f"{name:>28}: {args.iterations / elapsed:10.0f} renders/s")
+
+    utils.email_templates().auto_reload = True
+    elapsed = run(render_environment, template_names, args.iterations)
+    name = "environment, auto reload"
+    print(f"{name:>28}: {args.iterations / elapsed:10.0f} renders/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare item creation throughput of one `POST /items/` per item against the
+batch endpoint, against a running backend:
+
+    python -m benchmarks.items_batch --base-url http://localhost:8000/api/v1 \
+        --items 5000 --batch-sizes 10 100 1000
+
+The created items are removed afterwards with the batch delete endpoint.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def create_single(
+    client: httpx.AsyncClient, headers: dict[str, str], count: int, concurrency: int
+) -> list[str]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(i: int) -> str:
+        async with semaphore:
+            response = await client.post(
+                "/items/", json={"title": f"single {i}"}, headers=headers
+            )
+            response.raise_for_status()
+            return str(response.json()["id"])
+
+    return await asyncio.gather(*(create(i) for i in range(count)))
+
+
+async def create_batched(
+    client: httpx.AsyncClient, headers: dict[str, str], count: int, batch_size: int
+) -> list[str]:
+    ids = []
+    for start in range(0, count, batch_size):
+        batch = [
+            {"title": f"batch {i}"} for i in range(start, min(count, start + batch_size))
+        ]
+        response = await client.post(
+            "/items/batch", json={"items": batch}, headers=headers
+        )
+        response.raise_for_status()
+        ids += [result["id"] for result in response.json()["results"]]
+    return ids
+
+
+async def cleanup(
+    client: httpx.AsyncClient, headers: dict[str, str], ids: list[str], batch_size: int
+) -> None:
+    for start in range(0, len(ids), batch_size):
+        response = await client.post(
+            "/items/batch/delete",
+            json={"ids": ids[start : start + batch_size]},
+            headers=headers,
+        )
+        response.raise_for_status()
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        response = await client.post(
+            "/login/access-token",
+            data={"username": args.username, "password": args.password},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        runs = [("single", None)] + [("batch", size) for size in args.batch_sizes]
+        for label, batch_size in runs:
+            start = time.perf_counter()
+            if batch_size is None:
+                ids = await create_single(client, headers, args.items, args.concurrency)
+            else:
+                ids = await create_batched(client, headers, args.items, batch_size)
+            elapsed = time.perf_counter() - start
+            name = label if batch_size is None else f"{label} {batch_size}"
+            print(f"{name:<12} {args.items / elapsed:10,.0f} items/s ({elapsed:.2f}s)")
+            await cleanup(client, headers, ids, max(args.batch_sizes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--username", default="admin@example.com")
+    parser.add_argument("--password", default="changethis")
+    parser.add_argument("--items", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""
+Measure bulk import throughput (rows per second) of `import_items` for ordered
+and unordered imports at several insert batch sizes.
+
+Rows are generated in memory as NDJSON and go through the same parser as the
+upload endpoint. It needs a reachable MongoDB (MONGODB_URI from the settings)
+and writes to a scratch database named after MONGODB_DB with a `_bench`
+suffix, which is dropped at the end:
+
+    python -m benchmarks.items_import --rows 100000 --batch-sizes 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from odmantic import AIOEngine, ObjectId
+
+from app.core.config import settings
+from app.import_items import READ_CHUNK_BYTES, import_items, ndjson_rows
+from app.models import Item
+
+
+def ndjson(rows: int) -> bytes:
+    return "".join(
+        json.dumps({"title": f"item {i}", "description": "x" * 64}) + "\n"
+        for i in range(rows)
+    ).encode()
+
+
+async def chunks(data: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), READ_CHUNK_BYTES):
+        yield data[start : start + READ_CHUNK_BYTES]
+
+
+async def main(args: argparse.Namespace) -> None:
+    client: AsyncIOMotorClient = AsyncIOMotorClient(settings.MONGODB_URI)
+    database = f"{settings.MONGODB_DB}_bench"
+    engine = AIOEngine(client=client, database=database)
+    await engine.configure_database([Item])
+    data = ndjson(args.rows)
+    try:
+        for ordered in (False, True):
+            for batch_size in args.batch_sizes:
+                await engine.get_collection(Item).delete_many({})
+                start = time.perf_counter()
+                report = await import_items(
+                    engine,
+                    ndjson_rows(chunks(data)),
+                    owner_id=ObjectId(),
+                    ordered=ordered,
+                    batch_size=batch_size,
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{'ordered' if ordered else 'unordered':<10} "
+                    f"batch={batch_size:<6} inserted={report.inserted:<8} "
+                    f"{elapsed:7.2f}s {report.inserted / elapsed:10.0f} rows/s"
+                )
+    finally:
+        await client.drop_database(database)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    asyncio.run(main(parser.parse_args()))
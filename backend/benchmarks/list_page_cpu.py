@@ -0,0 +1,127 @@
+"""
+CPU time per `GET /items/` page: the raw-projection path of `read_items`
+against the previous path that hydrated every document into an `Item`, copied
+it into an `ItemPublicFields` and let FastAPI validate `ItemsPublic` again.
+
+Both routes run in-process through the ASGI app with an in-memory engine that
+returns the same documents, so the difference is the per-row model work:
+
+    python -m benchmarks.list_page_cpu --limit 100 --iterations 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any
+
+import httpx
+from fastapi import Depends, FastAPI
+from odmantic import AIOEngine, ObjectId
+
+from app.api.deps import get_current_auth_user, get_db
+from app.api.pagination import fetch_page
+from app.api.routes import items
+from app.models import AuthUser, Item, ItemPublicFields, ItemsPublic
+
+
+class InMemoryCursor:
+    def __init__(self, docs: list[dict[str, Any]]) -> None:
+        self.docs = docs
+
+    def sort(self, *args: Any) -> "InMemoryCursor":
+        return self
+
+    def skip(self, skip: int) -> "InMemoryCursor":
+        return self
+
+    def limit(self, limit: int) -> "InMemoryCursor":
+        self.docs = self.docs[:limit]
+        return self
+
+    async def to_list(self, length: int | None) -> list[dict[str, Any]]:
+        return self.docs
+
+
+class InMemoryCollection:
+    def __init__(self, docs: list[dict[str, Any]]) -> None:
+        self.docs = docs
+
+    def find(self, query: Any, projection: dict[str, Any] | None = None) -> Any:
+        docs = self.docs
+        if projection:
+            keep = {"_id", *projection}
+            docs = [{k: v for k, v in doc.items() if k in keep} for doc in docs]
+        return InMemoryCursor(docs)
+
+
+class InMemoryEngine:
+    def __init__(self, docs: list[dict[str, Any]]) -> None:
+        self.collection = InMemoryCollection(docs)
+
+    def get_collection(self, model: Any) -> InMemoryCollection:
+        return self.collection
+
+
+async def read_items_models(
+    engine: AIOEngine = Depends(get_db), limit: int = 100
+) -> ItemsPublic:
+    # read_items before the raw-projection fast path
+    page = await fetch_page(
+        engine, Item, {}, skip=0, limit=limit, after=None, count="none"
+    )
+    items_public = [
+        ItemPublicFields(**Item.model_validate_doc(doc).dict())
+        for doc in page.docs
+    ]
+    return ItemsPublic(
+        items=items_public,
+        count=page.count,
+        count_mode=page.count_mode,
+        next_cursor=page.next_cursor,
+    )
+
+
+async def run(client: httpx.AsyncClient, url: str, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        response = await client.get(url)
+        response.raise_for_status()
+    return time.process_time() - start
+
+
+async def main(args: argparse.Namespace) -> None:
+    owner_id = ObjectId()
+    docs = [
+        Item(
+            title=f"item {i}", description="x" * 64, owner_id=owner_id
+        ).model_dump_doc()
+        for i in range(args.limit + 1)
+    ]
+    app = FastAPI()
+    app.include_router(items.router, prefix="/items")
+    app.get("/models", response_model=ItemsPublic)(read_items_models)
+    engine = InMemoryEngine(docs)
+    app.dependency_overrides[get_db] = lambda: engine
+    app.dependency_overrides[get_current_auth_user] = lambda: AuthUser(
+        id=owner_id, is_active=True, is_superuser=True
+    )
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, url in (("models", "/models"), ("raw", "/items/")):
+            url = f"{url}?limit={args.limit}&count=none"
+            await run(client, url, min(100, args.iterations))  # warm-up
+            elapsed = await run(client, url, args.iterations)
+            print(
+                f"{label:<7} {elapsed / args.iterations * 1000:8.3f} ms CPU "
+                f"per {args.limit}-item page"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2_000)
+    asyncio.run(main(parser.parse_args()))
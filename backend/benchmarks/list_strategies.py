@@ -0,0 +1,103 @@
+"""
+Compare the list-query strategies of `fetch_page` (one `$facet` aggregation vs
+page query and count sent concurrently vs the old sequential find + count) as
+the collection grows.
+
+It needs a reachable MongoDB (MONGODB_URI from the settings) and writes to a
+scratch database named after MONGODB_DB with a `_bench` suffix, which is
+dropped at the end:
+
+    python -m benchmarks.list_strategies --sizes 1000 10000 100000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from odmantic import AIOEngine, ObjectId
+
+from app.api.pagination import fetch_page
+from app.core.config import settings
+from app.models import Item
+
+
+async def seed(engine: AIOEngine, owner_id: ObjectId, size: int) -> None:
+    collection = engine.get_collection(Item)
+    existing = await collection.count_documents({})
+    batch = []
+    for i in range(existing, size):
+        batch.append(
+            {"title": f"item {i}", "description": "x" * 64, "owner_id": owner_id}
+        )
+        if len(batch) == 5000:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+async def timed(func: Callable[[], Awaitable[Any]], rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(args: argparse.Namespace) -> None:
+    client: AsyncIOMotorClient = AsyncIOMotorClient(settings.MONGODB_URI)
+    database = f"{settings.MONGODB_DB}_bench"
+    engine = AIOEngine(client=client, database=database)
+    await engine.configure_database([Item])
+    owner_id = ObjectId()
+    query = {"owner_id": owner_id}
+
+    async def sequential() -> None:
+        await engine.find(Item, query, sort=Item.id, limit=args.limit + 1)
+        await engine.count(Item, query)
+
+    strategies: dict[str, Callable[[], Awaitable[Any]]] = {
+        "sequential": sequential,
+        **{
+            strategy: (
+                lambda strategy=strategy: fetch_page(
+                    engine,
+                    Item,
+                    query,
+                    skip=0,
+                    limit=args.limit,
+                    after=None,
+                    count="exact",
+                    strategy=strategy,
+                )
+            )
+            for strategy in ("facet", "gather")
+        },
+    }
+    try:
+        for size in sorted(args.sizes):
+            await seed(engine, owner_id, size)
+            for name, func in strategies.items():
+                await timed(func, 2)  # warm-up
+                samples = await timed(func, args.rounds)
+                print(
+                    f"size={size:<9} {name:<11} "
+                    f"median={statistics.median(samples) * 1000:8.2f}ms "
+                    f"max={max(samples) * 1000:8.2f}ms"
+                )
+    finally:
+        await client.drop_database(database)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,159 @@
+"""
+Latency of legitimate logins during a credential stuffing attack, with the
+login rate limiter disabled and enabled.
+
+The login route runs in-process through the ASGI app, with real bcrypt hashes
+and an in-memory engine that knows every email. `--attackers` clients send
+logins with wrong passwords for random accounts from one IP, while a
+stream of legitimate users log in from their own IPs. The attempts the limiter
+lets through still cost bcrypt time, `--ip-limit` sets how many per window:
+
+    python -m benchmarks.login_attack --duration 20 --attackers 32 --ip-limit 10
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.deps import get_db
+from app.api.responses import FastJSONResponse
+from app.api.routes import login
+from app.core.config import settings
+from app.core.ratelimit import RateLimited, rate_limiter
+from app.core.security import (
+    PasswordHashingUnavailable,
+    get_password_hash,
+    password_hasher,
+)
+from app.main import password_hashing_unavailable_handler, rate_limited_handler
+from app.models import User
+
+PASSWORD = "correct horse battery staple"
+
+
+class InMemoryCollection:
+    def __init__(self, doc: dict[str, Any]) -> None:
+        self.doc = doc
+
+    async def find_one(self, query: dict[str, Any], *args: Any) -> dict[str, Any]:
+        return {**self.doc, "email": query["email"]}
+
+
+class InMemoryEngine:
+    def __init__(self, user: User) -> None:
+        self.collection = InMemoryCollection(user.model_dump_doc())
+
+    def get_collection(self, model: Any) -> InMemoryCollection:
+        return self.collection
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def attack(client: httpx.AsyncClient, stop: asyncio.Event) -> dict[int, int]:
+    statuses: dict[int, int] = {}
+    while not stop.is_set():
+        response = await client.post(
+            "/login/access-token",
+            data={"username": f"{uuid.uuid4().hex}@example.com", "password": "x"},
+        )
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return statuses
+
+
+async def legitimate(app: FastAPI, duration: float) -> tuple[list[float], int]:
+    # Users each logging in once, from their own IP
+    samples, failed = [], 0
+    deadline = time.perf_counter() + duration
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        ip = f"10.0.{n // 250}.{n % 250}"
+        transport = httpx.ASGITransport(app=app, client=(ip, 5000))
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            start = time.perf_counter()
+            response = await client.post(
+                "/login/access-token",
+                data={"username": f"user{n}@example.com", "password": PASSWORD},
+            )
+        if response.status_code == 200:
+            samples.append(time.perf_counter() - start)
+        else:
+            failed += 1
+        await asyncio.sleep(0.1)
+    return samples, failed
+
+
+async def run(app: FastAPI, args: argparse.Namespace, enabled: bool) -> None:
+    settings.RATE_LIMIT_ENABLED = enabled
+    rate_limiter.clear()
+    attacker = httpx.ASGITransport(app=app, client=("203.0.113.7", 4000))
+    async with httpx.AsyncClient(transport=attacker, base_url="http://bench") as bad:
+        stop = asyncio.Event()
+        attackers = [
+            asyncio.create_task(attack(bad, stop)) for _ in range(args.attackers)
+        ]
+        samples, failed = await legitimate(app, args.duration)
+        stop.set()
+        statuses: dict[int, int] = {}
+        for result in await asyncio.gather(*attackers):
+            for status, n in result.items():
+                statuses[status] = statuses.get(status, 0) + n
+
+    label = "limiter on" if enabled else "limiter off"
+    if samples:
+        print(
+            f"{label:<12} legitimate n={len(samples):<4} failed={failed:<4} "
+            f"p50={statistics.median(samples) * 1000:7.1f}ms "
+            f"p99={percentile(samples, 99) * 1000:7.1f}ms"
+        )
+    else:
+        print(f"{label:<12} legitimate n=0    failed={failed}")
+    print(f"{'':<12} attack responses by status: {dict(sorted(statuses.items()))}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    user = User(email="user@example.com", hashed_password=get_password_hash(PASSWORD))
+    engine = InMemoryEngine(user)
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.include_router(login.router)
+    app.dependency_overrides[get_db] = lambda: engine
+    app.add_exception_handler(
+        RateLimited, rate_limited_handler  # type: ignore[arg-type]
+    )
+    app.add_exception_handler(
+        PasswordHashingUnavailable,
+        password_hashing_unavailable_handler,  # type: ignore[arg-type]
+    )
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(logging.ERROR)
+    settings.RATE_LIMIT_BACKEND = "memory"
+    settings.RATE_LIMIT_LOGIN_PER_IP = args.ip_limit
+    try:
+        for enabled in (False, True):
+            await run(app, args, enabled)
+    finally:
+        password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--attackers", type=int, default=32)
+    parser.add_argument(
+        "--ip-limit", type=int, default=settings.RATE_LIMIT_LOGIN_PER_IP
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Measure `/items/` latency while a storm of logins hits the same backend.
+
+Run it against a running backend (for example `fastapi run app/main.py` or the
+Docker stack) once with the default settings and once with the hashing pool
+tuned, and compare the p99 of both phases:
+
+    python -m benchmarks.login_storm --base-url http://localhost:8000/api/v1 \
+        --username admin@example.com --password changethis
+
+The first phase measures `/items/` alone, the second one measures it while
+`--login-concurrency` clients keep calling `/login/access-token`. With bcrypt on
+the event loop the second p99 grows by hundreds of milliseconds; with the
+worker pool it should stay close to the baseline.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label: str, samples: list[float], rejected: int = 0) -> None:
+    print(
+        f"{label:<14} n={len(samples):<6} "
+        f"p50={statistics.median(samples) * 1000:7.1f}ms "
+        f"p99={percentile(samples, 99) * 1000:7.1f}ms "
+        f"max={max(samples) * 1000:7.1f}ms"
+        + (f" rejected={rejected}" if rejected else "")
+    )
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> httpx.Response:
+    return await client.post(
+        "/login/access-token", data={"username": username, "password": password}
+    )
+
+
+async def poll_items(
+    client: httpx.AsyncClient, headers: dict[str, str], duration: float
+) -> list[float]:
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/items/", headers=headers)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def login_storm(
+    client: httpx.AsyncClient,
+    username: str,
+    password: str,
+    stop: asyncio.Event,
+    counters: dict[str, int],
+) -> None:
+    while not stop.is_set():
+        response = await login(client, username, password)
+        if response.status_code == 503:
+            counters["rejected"] += 1
+        else:
+            counters["accepted"] += 1
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        response = await login(client, args.username, args.password)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        report("baseline", await poll_items(client, headers, args.duration))
+
+        stop = asyncio.Event()
+        counters = {"accepted": 0, "rejected": 0}
+        storm = [
+            asyncio.create_task(
+                login_storm(client, args.username, args.password, stop, counters)
+            )
+            for _ in range(args.login_concurrency)
+        ]
+        samples = await poll_items(client, headers, args.duration)
+        stop.set()
+        await asyncio.gather(*storm)
+        report("login storm", samples, counters["rejected"])
+        print(f"logins completed during storm: {counters['accepted']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--username", default="admin@example.com")
+    parser.add_argument("--password", default="changethis")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
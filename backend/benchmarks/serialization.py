@@ -0,0 +1,96 @@
+"""
+CPU time to serialize the public models (`ItemsPublic`, `UsersPublic`) through
+a route, for Starlette's JSONResponse with response_model validation (the
+previous default), FastJSONResponse with validation (the current default) and
+`model_response`, which skips the validation.
+
+Routes run in-process through the ASGI app and return prebuilt models, so the
+numbers are the response handling alone:
+
+    python -m benchmarks.serialization --rows 100 --iterations 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from odmantic import ObjectId
+from pydantic import BaseModel
+
+from app.api.responses import FastJSONResponse, model_response
+from app.models import ItemPublicFields, ItemsPublic, UserPublicFields, UsersPublic
+
+
+def add_routes(app: FastAPI, name: str, model: BaseModel) -> None:
+    response_model = type(model)
+
+    @app.get(f"/{name}/json", response_model=response_model, response_class=JSONResponse)
+    async def json_route() -> Any:
+        return model
+
+    @app.get(f"/{name}/orjson", response_model=response_model)
+    async def orjson_route() -> Any:
+        return model
+
+    @app.get(f"/{name}/model_response", response_model=response_model)
+    async def model_response_route() -> Any:
+        return model_response(model)
+
+
+async def run(client: httpx.AsyncClient, url: str, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        response = await client.get(url)
+        response.raise_for_status()
+    return time.process_time() - start
+
+
+async def main(args: argparse.Namespace) -> None:
+    owner_id = ObjectId()
+    models = {
+        "items": ItemsPublic(
+            items=[
+                ItemPublicFields(
+                    title=f"item {i}", description="x" * 64, owner_id=owner_id
+                )
+                for i in range(args.rows)
+            ],
+            count=args.rows,
+        ),
+        "users": UsersPublic(
+            data=[
+                UserPublicFields(email=f"user{i}@example.com", public_id=ObjectId())
+                for i in range(args.rows)
+            ],
+            count=args.rows,
+        ),
+    }
+    app = FastAPI(default_response_class=FastJSONResponse)
+    for name, model in models.items():
+        add_routes(app, name, model)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in models:
+            for variant in ("json", "orjson", "model_response"):
+                url = f"/{name}/{variant}"
+                await run(client, url, min(100, args.iterations))  # warm-up
+                elapsed = await run(client, url, args.iterations)
+                print(
+                    f"{name:<6} {variant:<15} "
+                    f"{elapsed / args.iterations * 1000:8.3f} ms CPU "
+                    f"per {args.rows}-row response"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2_000)
+    asyncio.run(main(parser.parse_args()))